@@ -0,0 +1,110 @@
+"""
+Benchmark: image upload size and latency per preprocessing profile
+
+For each image model in AVAILABLE_MODELS this compares the old fixed
+1024 px path with the model's own preprocessing profile. It reports the
+base64 payload size, client-side preparation time, the upload time at a
+given bandwidth and the time the server needs to decode the payload, which
+together make up the end-to-end latency that depends on the profile.
+
+Usage:
+    python bench/bench_image_profiles.py [--mbps 20] [--runs 5] [image ...]
+"""
+
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from PIL import Image
+
+from utils.image_io import DEFAULT_IMAGE_PROFILE, encode_for_profile
+
+
+def make_sample_images(directory: str):
+    """Write synthetic photo-like test images of typical camera sizes."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for width, height in [(4032, 3024), (1920, 1080), (800, 600)]:
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+        noise = rng.normal(0, 12, size=(height, width, 3))
+        pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+        path = os.path.join(directory, f"sample_{width}x{height}.jpg")
+        Image.fromarray(pixels).save(path, quality=92)
+        paths.append(path)
+    return paths
+
+
+def measure(path: str, profile: dict, mbps: float, runs: int) -> dict:
+    """Measure payload size and per-stage latency for one image and profile."""
+    prep_times, decode_times = [], []
+    payload = b""
+    for _ in range(runs):
+        start = time.perf_counter()
+        payload = base64.b64encode(encode_for_profile(path, profile))
+        prep_times.append(time.perf_counter() - start)
+
+        # What the inference server does before running the model
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(base64.b64decode(payload))) as img:
+            img.convert("RGB").load()
+        decode_times.append(time.perf_counter() - start)
+
+    prep = statistics.median(prep_times)
+    upload = len(payload) * 8 / (mbps * 1_000_000)
+    server_decode = statistics.median(decode_times)
+    return {
+        "bytes": len(payload),
+        "prep_ms": prep * 1000,
+        "upload_ms": upload * 1000,
+        "decode_ms": server_decode * 1000,
+        "total_ms": (prep + upload + server_decode) * 1000,
+    }
+
+
+def main():
+    """Run the benchmark and print a table."""
+    from gui.app import AVAILABLE_MODELS
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("images", nargs="*", help="Images to use (default: synthetic samples)")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Upload bandwidth in Mbit/s")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    profiles = {"fixed-1024": DEFAULT_IMAGE_PROFILE}
+    for name, info in AVAILABLE_MODELS.items():
+        if info.get("input_type") == "image" and info.get("preprocessing"):
+            profiles[info["id"]] = info["preprocessing"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = args.images or make_sample_images(tmp)
+        print(f"Upload bandwidth: {args.mbps:g} Mbit/s, median of {args.runs} runs\n")
+        print(f"{'Image':<26}{'Profile':<22}{'Payload':>10}{'Prep':>9}"
+              f"{'Upload':>9}{'Decode':>9}{'Total':>9}")
+        print("-" * 94)
+        for path in images:
+            baseline = None
+            for name, profile in profiles.items():
+                m = measure(path, profile, args.mbps, args.runs)
+                baseline = baseline or m
+                print(f"{os.path.basename(path):<26}{name:<22}{m['bytes'] / 1024:>8.0f}KB"
+                      f"{m['prep_ms']:>7.1f}ms{m['upload_ms']:>7.1f}ms{m['decode_ms']:>7.1f}ms"
+                      f"{m['total_ms']:>7.1f}ms"
+                      + ("" if m is baseline else
+                         f"  ({baseline['bytes'] / m['bytes']:.1f}x smaller,"
+                         f" {baseline['total_ms'] / m['total_ms']:.1f}x faster)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Benchmark: logging overhead per HFClient.query
+
+Calls HFClient.query in mock mode (no network, so only the decorators and
+their logging run) with a short text and with a ~200 KB base64 image
+payload, under several logging setups:
+
+- legacy: the previous api_call_logger (eager f-strings, including the
+  debug-level "Args:" line) with a synchronous handler, as basicConfig set up
+- sync handler: the current decorators with a synchronous handler
+- queue: setup_logging (QueueHandler, formatting and I/O on the listener)
+- queue + JSON, queue + 10% sampling of utils.decorators, and WARNING level
+
+Records go to a file in a temporary directory, and in the last column to
+a slow stream (0.2 ms per write, like a busy terminal or a full pipe).
+Times are wall time per call on the calling thread, which is what a request
+pays; in this tight loop the listener thread also competes for the GIL,
+which a request waiting on the network would not notice.
+
+Usage:
+    python bench/bench_logging.py [--calls 20000]
+"""
+
+import argparse
+import base64
+import functools
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.hf_client import HFClient
+from utils.logging_setup import TEXT_FORMAT, dropped_records, setup_logging, shutdown_logging
+
+legacy_logger = logging.getLogger("utils.decorators")
+
+
+def legacy_api_call_logger(func):
+    """api_call_logger as it was before the logging setup moved to the application."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        func_name = func.__name__
+        legacy_logger.info(f"🔵 Starting API call: {func_name}")
+        legacy_logger.debug(f"   Args: {args}, Kwargs: {kwargs}")
+        start_time = time.time()
+        try:
+            result = func(*args, **kwargs)
+            elapsed = time.time() - start_time
+            legacy_logger.info(f"✅ API call {func_name} completed in {elapsed:.2f}s")
+            return result
+        except Exception as e:
+            elapsed = time.time() - start_time
+            legacy_logger.error(f"❌ API call {func_name} failed after {elapsed:.2f}s: {str(e)}")
+            raise
+    return wrapper
+
+
+class SlowStream(io.StringIO):
+    """A stream that takes 0.2 ms per write."""
+
+    def write(self, text):
+        time.sleep(0.0002)
+        return len(text)
+
+
+def sync_logging(filename=None, stream=None):
+    """What logging.basicConfig(level=INFO) set up, writing to a file or stream."""
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.FileHandler(filename, encoding="utf-8") if filename else logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    return handler
+
+
+def per_call_us(query, client, input_data, calls):
+    """Mean microseconds per call on the calling thread."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        query(client, "bench-model", input_data, "text-classification")
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    client = HFClient(api_key="bench", mock_mode=True)
+    # HFClient.query is profiled(log_call(retry(query))): rebuild it with the old logger
+    current = HFClient.query
+    legacy = legacy_api_call_logger(HFClient.query.__wrapped__.__wrapped__)
+    inputs = {
+        "text": "I love programming with AI!",
+        "image": base64.b64encode(os.urandom(150_000)).decode(),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.log")
+        setups = [
+            ("legacy (eager f-strings, sync)", legacy, lambda out: sync_logging(**out)),
+            ("sync handler", current, lambda out: sync_logging(**out)),
+            ("queue", current, lambda out: setup_logging("INFO", False, {}, **out)),
+            ("queue + JSON", current, lambda out: setup_logging("INFO", True, {}, **out)),
+            ("queue + 10% sampling", current,
+             lambda out: setup_logging("INFO", False, {"utils.decorators": 0.1}, **out)),
+            ("queue, WARNING level", current, lambda out: setup_logging("WARNING", False, {}, **out)),
+        ]
+        columns = [("text", inputs["text"], {"filename": path}),
+                   ("image", inputs["image"], {"filename": path}),
+                   ("text, slow sink", inputs["text"], {"stream": SlowStream()})]
+        print(f"{'setup (us/call)':<32}" + "".join(f"{name:>18}" for name, _, _ in columns))
+        for name, query, setup in setups:
+            row = []
+            for _, data, out in columns:
+                handler = setup(out)
+                row.append(per_call_us(query, client, data, args.calls))
+                dropped = dropped_records()
+                if isinstance(handler, logging.Handler):
+                    logging.getLogger().removeHandler(handler)
+                    handler.close()
+                else:
+                    shutdown_logging()
+            note = f"  ({dropped} records dropped at the slow sink)" if dropped else ""
+            print(f"{name:<32}" + "".join(f"{value:>18.1f}" for value in row) + note)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
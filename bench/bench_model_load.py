@@ -0,0 +1,107 @@
+"""
+Startup benchmark: cold model load time and memory
+
+Compares loading each local model from the project model store the usual way
+(transformers from_pretrained) with the memory-mapped safetensors path of
+ModelStore. Every measurement runs in a fresh Python process so that nothing
+is already imported or cached in memory.
+
+Usage:
+    python bench/bench_model_load.py            # populates the store if needed
+    python bench/bench_model_load.py gpt2:text-generation
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DEFAULT_MODELS = [
+    ("microsoft/resnet-50", "image-classification"),
+    ("gpt2", "text-generation"),
+]
+
+
+def rss_mb() -> float:
+    """Return the current resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode: str, model_id: str, pipeline: str) -> None:
+    """Load one model in this (fresh) process and print the metrics as JSON."""
+    import torch  # import cost is not part of the load time
+    import transformers  # noqa: F401
+
+    from models.model_store import ModelStore, _AUTO_CLASSES
+
+    store = ModelStore()
+    before = rss_mb()
+    start = time.perf_counter()
+    if mode == "mmap":
+        model = store.load_model(model_id, pipeline)
+    else:
+        auto_class = getattr(transformers, _AUTO_CLASSES[pipeline])
+        model = auto_class.from_pretrained(store.path_for(model_id), local_files_only=True)
+    load_time = time.perf_counter() - start
+    after_load = rss_mb()
+
+    # One forward pass touches every weight page
+    with torch.no_grad():
+        if pipeline == "image-classification":
+            model(pixel_values=torch.zeros(1, 3, 224, 224))
+        else:
+            model(input_ids=torch.zeros(1, 8, dtype=torch.long))
+    print(json.dumps({
+        "load_s": load_time,
+        "rss_before_mb": before,
+        "rss_after_load_mb": after_load,
+        "rss_after_forward_mb": rss_mb(),
+    }))
+
+
+def measure(mode: str, model_id: str, pipeline: str) -> dict:
+    """Run child() in a subprocess and return its metrics."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, model_id, pipeline],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv):
+    """Benchmark the requested (or default) models."""
+    from models.model_store import ModelStore
+
+    models = [tuple(arg.split(":", 1)) for arg in argv] or DEFAULT_MODELS
+    store = ModelStore()
+
+    print(f"{'Model':<22}{'Mode':<14}{'Load (s)':>10}{'RSS +load':>12}{'RSS +fwd':>12}")
+    print("-" * 70)
+    for model_id, pipeline in models:
+        if not store.has(model_id):
+            store.populate(model_id, pipeline)
+        for mode in ("transformers", "mmap"):
+            m = measure(mode, model_id, pipeline)
+            print(f"{model_id:<22}{mode:<14}{m['load_s']:>10.2f}"
+                  f"{m['rss_after_load_mb'] - m['rss_before_mb']:>10.0f}MB"
+                  f"{m['rss_after_forward_mb'] - m['rss_before_mb']:>10.0f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        child(*sys.argv[2:])
+        sys.exit(0)
+    sys.exit(main(sys.argv[1:]))
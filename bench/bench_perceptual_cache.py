@@ -0,0 +1,141 @@
+"""
+Benchmark: perceptual-hash dedup cache
+
+1. Lookup latency with one million cached hashes, for near-duplicate hits
+   and for misses.
+2. Dedup hit rate on re-encoded/resized copies of synthetic images, and the
+   false-positive rate on unrelated images, for aHash, dHash and pHash.
+
+Usage:
+    python bench/bench_perceptual_cache.py [--entries 1000000] [--threshold 6]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from utils.perceptual_hash import HASH_FUNCTIONS, PerceptualHashCache
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_lookup(entries: int, threshold: int, queries: int = 2000):
+    """Measure lookup latency on a cache filled with random hashes."""
+    rng = random.Random(0)
+    cache = PerceptualHashCache(threshold=threshold, max_entries=entries)
+    hashes = [rng.getrandbits(64) for _ in range(entries)]
+    start = time.perf_counter()
+    for value in hashes:
+        cache.add_hash(value, None)
+    fill = time.perf_counter() - start
+
+    def near(value):
+        for bit in rng.sample(range(64), rng.randint(0, threshold)):
+            value ^= 1 << bit
+        return value
+
+    print(f"Filled {entries:,} entries in {fill:.1f}s (threshold {threshold})")
+    for name, make in [("near-duplicate", lambda: near(rng.choice(hashes))),
+                       ("miss", lambda: rng.getrandbits(64))]:
+        timings, found = [], 0
+        for _ in range(queries):
+            value = make()
+            t0 = time.perf_counter()
+            found += cache.lookup_hash(value) is not None
+            timings.append((time.perf_counter() - t0) * 1e6)
+        print(f"  {name:<15} mean {statistics.mean(timings):8.1f} us   "
+              f"p99 {percentile(timings, 99):8.1f} us   found {found}/{queries}")
+
+
+def synthetic_image(rng: np.random.Generator, size=(640, 480)) -> Image.Image:
+    """A smooth random image with a few shapes, standing in for a photo."""
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width] / max(size)
+    channels = []
+    for _ in range(3):
+        fx, fy, phase = rng.uniform(1, 6, size=3)
+        channels.append(np.sin(fx * x * np.pi + phase) * np.cos(fy * y * np.pi))
+    pixels = (np.stack(channels, axis=-1) + 1) * 127.5
+    for _ in range(4):
+        x0, y0 = rng.integers(0, width - 100), rng.integers(0, height - 100)
+        pixels[y0:y0 + rng.integers(40, 100), x0:x0 + rng.integers(40, 100)] = rng.uniform(0, 255, 3)
+    return Image.fromarray(pixels.astype(np.uint8))
+
+
+def variants(img: Image.Image):
+    """Typical near-duplicate copies of an image."""
+    def encoded(image, **options):
+        buffer = io.BytesIO()
+        image.save(buffer, **options)
+        buffer.seek(0)
+        return buffer
+
+    width, height = img.size
+    yield "jpeg q50", encoded(img, format="JPEG", quality=50)
+    yield "resize 50%", encoded(img.resize((width // 2, height // 2)), format="PNG")
+    yield "resize 25% q70", encoded(img.resize((width // 4, height // 4)), format="JPEG", quality=70)
+    yield "brightness +10%", encoded(ImageEnhance.Brightness(img).enhance(1.1), format="PNG")
+    yield "crop 2%", encoded(img.crop((width // 50, height // 50, width, height)), format="PNG")
+
+
+def bench_hit_rate(threshold: int, images: int = 100):
+    """Measure dedup hit rate and false positives for each hash function."""
+    rng = np.random.default_rng(1)
+    originals = [synthetic_image(rng) for _ in range(images)]
+    unrelated = [synthetic_image(rng) for _ in range(images)]
+
+    def png(image):
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        buffer.seek(0)
+        return buffer
+
+    print(f"\nDedup on {images} images x 5 variants (threshold {threshold})")
+    for method in HASH_FUNCTIONS:
+        cache = PerceptualHashCache(threshold=threshold, method=method)
+        for i, img in enumerate(originals):
+            cache.add_hash(cache.hash_image(png(img)), i)
+        per_variant = {}
+        hash_times = []
+        for i, img in enumerate(originals):
+            for name, data in variants(img):
+                t0 = time.perf_counter()
+                value = cache.hash_image(data)
+                hash_times.append((time.perf_counter() - t0) * 1000)
+                match = cache.lookup_hash(value)
+                per_variant.setdefault(name, []).append(match is not None and match[1] == i)
+        false_positives = sum(cache.lookup(png(img))[1] is not None for img in unrelated)
+        overall = sum(sum(v) for v in per_variant.values()) / sum(len(v) for v in per_variant.values())
+        detail = ", ".join(f"{name} {sum(v) / len(v):.0%}" for name, v in per_variant.items())
+        print(f"  {method:<6} hit rate {overall:6.1%}   false positives "
+              f"{false_positives}/{images}   hash {statistics.mean(hash_times):.2f} ms")
+        print(f"         {detail}")
+
+
+def main():
+    """Run both benchmarks."""
+    parser = argparse.ArgumentParser(description="Perceptual-hash dedup cache benchmark")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--threshold", type=int, default=6)
+    args = parser.parse_args()
+    bench_lookup(args.entries, args.threshold)
+    bench_hit_rate(args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark: per-item versus vectorized post-processing of logits
+
+Compares, on random logits, the per-item path (softmax of one row, a dict
+per label, sort, format) against classify_logits, which handles the whole
+batch with one softmax and an argpartition top-k. Runs the 2-label
+sentiment shape and the 1000-label image-classification shape.
+
+Usage:
+    python bench/bench_postprocess.py [--batch 64]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from models.hf_client import HFClient
+from models.postprocess import classify_logits
+from models.results import ClassificationResult, ImageClassificationResult
+
+
+def per_item(client, logits, id2label, k, image):
+    """Post-process row by row, the way the pipelines and formatters did."""
+    responses = []
+    for row in logits:
+        exp = np.exp(row - row.max())
+        probs = exp / exp.sum()
+        predictions = [{"label": id2label[i], "score": float(p)} for i, p in enumerate(probs)]
+        if image:
+            responses.append(client._format_image_output(predictions))
+        else:
+            predictions.sort(key=lambda x: x['score'], reverse=True)
+            responses.append({"status": "success", "data": {
+                "predictions": predictions[:k] if k else predictions,
+                "top_prediction": predictions[0]['label'],
+                "confidence": predictions[0]['score'],
+            }})
+    return responses
+
+
+def vectorized(client, logits, id2label, k, image):
+    """Post-process the whole batch with classify_logits."""
+    result_type = ImageClassificationResult if image else ClassificationResult
+    results = classify_logits(logits, id2label, k, result_type=result_type)
+    return [client._success(result) for result in results]
+
+
+def timed(func, runs):
+    """Return the median duration of func() in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Logits post-processing benchmark")
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    client = HFClient(mock_mode=True)
+    compact = HFClient(mock_mode=True, compact_results=True)
+    rng = np.random.default_rng(0)
+    cases = [
+        ("sentiment (2 labels)", 2, None, False),
+        ("image (1000 labels, top 5)", 1000, 5, True),
+    ]
+    print(f"Batch of {args.batch}, median of {args.runs} runs\n")
+    print(f"{'case':<30}{'per-item ms':>13}{'vectorized ms':>15}{'compact ms':>12}{'speedup':>9}")
+    for name, classes, k, image in cases:
+        logits = rng.standard_normal((args.batch, classes)).astype(np.float32) * 3
+        id2label = {i: f"LABEL_{i}" for i in range(classes)}
+
+        old = per_item(client, logits, id2label, k, image)
+        new = vectorized(client, logits, id2label, k, image)
+        for a, b in zip(old, new):
+            assert a["data"]["top_prediction"] == b["data"]["top_prediction"]
+
+        old_ms = timed(lambda: per_item(client, logits, id2label, k, image), args.runs)
+        new_ms = timed(lambda: vectorized(client, logits, id2label, k, image), args.runs)
+        compact_ms = timed(lambda: vectorized(compact, logits, id2label, k, image), args.runs)
+        print(f"{name:<30}{old_ms:>13.3f}{new_ms:>15.3f}{compact_ms:>12.3f}{old_ms / compact_ms:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark: client-side rate limiting against a throttling server
+
+Starts a local HTTP server that allows --limit requests per second (a token
+bucket of one second's burst) and answers 429 with Retry-After beyond that.
+Several threads then send requests through HFClient with and without a
+RateLimiter, and the achieved throughput, 429 count and wait metrics are
+printed. The limiter starts above the server's limit to show adaptation.
+
+Usage:
+    python bench/bench_rate_limiter.py [--limit 20] [--requests 300] [--threads 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.endpoint_pool import EndpointPool
+from models.hf_client import HFClient
+from models.rate_limiter import RateLimiter
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers like a classification endpoint, or 429 when over the limit."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            server.tokens = min(server.limit, server.tokens + (now - server.last) * server.limit)
+            server.last = now
+            allowed = server.tokens >= 1
+            if allowed:
+                server.tokens -= 1
+                server.accepted += 1
+            else:
+                server.rejected += 1
+        if not allowed:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+        time.sleep(0.005)
+        body = json.dumps([{"label": "POSITIVE", "score": 0.9}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(client, requests_count, threads):
+    """Send requests concurrently and return (seconds, errors)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(
+            lambda _: client.send_payload("bench-model", {"inputs": "hi"}, "text-classification"),
+            range(requests_count)))
+    errors = sum(r.get("status") != "success" for r in results)
+    return time.perf_counter() - start, errors
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Rate limiter benchmark")
+    parser.add_argument("--limit", type=float, default=20.0, help="Server limit in requests/s")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    server.lock = threading.Lock()
+    server.limit = args.limit
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/models/{{model_id}}"
+
+    print(f"Server limit {args.limit:.0f} req/s, {args.requests} requests from {args.threads} threads\n")
+    for name, limiter in [("no limiter", None),
+                          ("rate limiter", RateLimiter(rate=args.limit * 1.5, burst=1,
+                                                       max_rate=args.limit * 1.5))]:
+        server.tokens, server.last = args.limit, time.monotonic()
+        server.accepted = server.rejected = 0
+        client = HFClient(api_key="bench", endpoint_pools={"bench-model": EndpointPool([url])},
+                          rate_limiter=limiter)
+        seconds, errors = run(client, args.requests, args.threads)
+        print(f"{name}: {seconds:.1f}s, {(args.requests - errors) / seconds:.1f} successful req/s, "
+              f"{errors} failed calls, {server.rejected} 429s from the server")
+        if limiter is not None:
+            stats = limiter.stats()["api-key"]
+            print(f"  final rate {stats['rate']:.1f}/s, max queue depth {stats['max_queue_depth']}, "
+                  f"mean wait {stats['mean_wait_ms']:.0f} ms, p95 wait {stats['p95_wait_ms']:.0f} ms")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
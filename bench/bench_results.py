@@ -0,0 +1,102 @@
+"""
+Benchmark: slotted result objects versus nested response dicts
+
+Formats synthetic 1000-class image-classification responses the old way
+(full sort, nested dicts, pre-formatted all_predictions strings) and through
+HFClient with compact_results, then compares formatting throughput and the
+memory retained when many results are kept for a batch job.
+
+Usage:
+    python bench/bench_results.py [--results 100000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.hf_client import HFClient
+
+CLASSES = 1000
+
+
+def legacy_format(response):
+    """The dict-based image formatting used before the result types."""
+    results = sorted(response, key=lambda x: x.get('score', 0), reverse=True)[:5]
+    return {
+        "status": "success",
+        "data": {
+            "predictions": results,
+            "top_prediction": results[0]['label'],
+            "confidence": results[0]['score'],
+            "all_predictions": [f"{pred['label']} ({pred['score']:.2%})" for pred in results],
+        },
+    }
+
+
+def make_responses(count: int, seed: int = 0):
+    """Random raw API responses with CLASSES labels each."""
+    rng = random.Random(seed)
+    labels = [f"class_{i}" for i in range(CLASSES)]
+    return [[{"label": label, "score": rng.random()} for label in labels] for _ in range(count)]
+
+
+def throughput(format_func, responses):
+    """Return formatted results per second."""
+    start = time.perf_counter()
+    for response in responses:
+        format_func(response)
+    return len(responses) / (time.perf_counter() - start)
+
+
+def retained_bytes(format_func, response, count: int):
+    """Memory held by count formatted results (the raw response is shared)."""
+    gc.collect()
+    tracemalloc.start()
+    kept = [format_func(response) for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Result object benchmark")
+    parser.add_argument("--results", type=int, default=100_000, help="Results kept in memory")
+    parser.add_argument("--responses", type=int, default=2_000, help="Responses formatted for throughput")
+    args = parser.parse_args()
+
+    client = HFClient(mock_mode=True)
+    compact = HFClient(mock_mode=True, compact_results=True)
+    variants = [
+        ("nested dicts (sorted)", legacy_format),
+        ("dicts via to_dict (heap)", client._format_image_output),
+        ("slotted (compact_results)", compact._format_image_output),
+    ]
+
+    # Same top 5 from every formatter
+    sample = make_responses(1, seed=1)[0]
+    expected = legacy_format(sample)["data"]
+    for _, format_func in variants[1:]:
+        assert format_func(sample)["data"] == expected
+
+    responses = make_responses(args.responses)
+    single = responses[0]
+    print(f"{CLASSES} classes per response; memory for {args.results:,} stored results\n")
+    print(f"{'variant':<28}{'results/s':>12}{'retained MB':>14}{'bytes/result':>14}")
+    for name, format_func in variants:
+        rate = throughput(format_func, responses)
+        held = retained_bytes(format_func, single, args.results)
+        print(f"{name:<28}{rate:>12,.0f}{held / 2**20:>14.1f}{held / args.results:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
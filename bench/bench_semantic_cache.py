@@ -0,0 +1,103 @@
+"""
+Benchmark: semantic cache lookup cost versus inference cost
+
+Fills a SemanticCache with 100k entries and measures the cost of a lookup
+(normalization, embedding and the cosine top-1 search) against running the
+sentiment model itself. Embedding and inference use the local model (from
+the model store or the Hugging Face cache); with --no-model only the
+search over the embedding matrix is measured.
+
+Usage:
+    python bench/bench_semantic_cache.py [--entries 100000] [--no-model]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from models.semantic_cache import SemanticCache, normalize_text
+
+MODEL_ID = "distilbert-base-uncased-finetuned-sst-2-english"
+SAMPLES = [
+    "I love this new feature, it's amazing!",
+    "  i LOVE this new feature -- it's amazing  ",
+    "This is the worst update ever.",
+    "Order #12345 has shipped, thanks for shopping with us!",
+    "Order #67890 has shipped, thanks for shopping with us!",
+]
+
+
+def timed(func, runs: int):
+    """Return the median duration of func() in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Semantic cache benchmark")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--no-model", action="store_true", help="Only time the matrix search")
+    args = parser.parse_args()
+
+    client = None
+    dim = 768
+    if not args.no_model:
+        from models.local_client import LocalClient
+        from models.model_store import ModelStore
+
+        client = LocalClient(model_store=ModelStore())
+        embed = lambda texts: client.embed(MODEL_ID, texts)
+        dim = embed(["warm up"]).shape[1]
+    else:
+        rng = np.random.default_rng(0)
+        embed = lambda texts: rng.standard_normal((len(texts), dim)).astype(np.float32)
+
+    cache = SemanticCache(embed, max_entries=args.entries)
+    rng = np.random.default_rng(1)
+    filler = rng.standard_normal((args.entries, dim)).astype(np.float32)
+    filler /= np.linalg.norm(filler, axis=1, keepdims=True)
+    start = time.perf_counter()
+    for i in range(args.entries):
+        cache.add(f"filler {i}", None, filler[i])
+    print(f"Filled {args.entries:,} entries of dim {dim} in {time.perf_counter() - start:.1f}s\n")
+
+    query = filler[123]
+    search_ms = timed(lambda: int(np.argmax(cache._matrix[:len(cache)] @ query)), args.runs)
+    print(f"{'cosine top-1 search':<28}{search_ms:>9.3f} ms")
+    print(f"{'normalize_text':<28}{timed(lambda: normalize_text(SAMPLES[1]), args.runs):>9.3f} ms")
+
+    if client is None:
+        return 0
+
+    text = normalize_text(SAMPLES[0])
+    embed_ms = timed(lambda: embed([text]), args.runs)
+    lookup_ms = timed(lambda: cache.lookup(normalize_text(SAMPLES[2])), args.runs)
+    infer_ms = timed(lambda: client.query(MODEL_ID, SAMPLES[0], "text-classification"), args.runs)
+    print(f"{'embedding (encoder only)':<28}{embed_ms:>9.3f} ms")
+    print(f"{'full lookup (miss)':<28}{lookup_ms:>9.3f} ms")
+    print(f"{'inference (classification)':<28}{infer_ms:>9.3f} ms")
+    print(f"\nA hit saves {infer_ms - lookup_ms:.2f} ms; a miss costs an extra {lookup_ms:.2f} ms")
+
+    cache.add(normalize_text(SAMPLES[0]), "cached")
+    for sample in SAMPLES[1:]:
+        _, match = cache.lookup(normalize_text(sample))
+        similarity = f"{match[0]:.3f}" if match else "-"
+        print(f"  {'hit ' if match else 'miss'} {similarity:>6}  {sample!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
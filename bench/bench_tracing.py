@@ -0,0 +1,134 @@
+"""
+Benchmark: cost of request tracing and an example trace
+
+Measures the per-span cost with tracing off (the default) and on, then the
+end-to-end cost on HFClient.query against a local stand-in server, and
+prints the span tree of one pipelined ImageModel batch so it is easy to see
+where a request spends its time.
+
+Usage:
+    python bench/bench_tracing.py [--calls 20000] [--queries 300]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+from models.endpoint_pool import EndpointPool
+from models.hf_client import HFClient
+from models.image_model import ImageModel
+from utils import tracing
+
+
+class ClassifierHandler(BaseHTTPRequestHandler):
+    """Answers every POST like a classification endpoint after 2 ms."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.002)
+        body = json.dumps([{"label": "POSITIVE", "score": 0.9},
+                           {"label": "NEGATIVE", "score": 0.1}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def span_cost(calls):
+    """Nanoseconds per empty span."""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        with tracing.span("bench"):
+            pass
+    return (time.perf_counter_ns() - start) / calls
+
+
+def query_latency(client, queries):
+    """Mean milliseconds per HFClient.query."""
+    start = time.perf_counter()
+    for _ in range(queries):
+        client.query("bench-model", "hello", "text-classification")
+    return (time.perf_counter() - start) * 1000 / queries
+
+
+def print_tree(spans):
+    """Print spans as an indented tree with durations."""
+    children = defaultdict(list)
+    for s in spans:
+        children[s.parent_id].append(s)
+
+    def show(s, depth):
+        status = "" if s.status == "ok" else f"  [{s.status}]"
+        print(f"  {'  ' * depth}{s.name:<{40 - 2 * depth}} {s.duration_ms:8.2f} ms{status}")
+        for child in sorted(children[s.span_id], key=lambda c: c.start_ns):
+            show(child, depth + 1)
+
+    for root in children[None]:
+        show(root, 0)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="Tracing overhead benchmark")
+    parser.add_argument("--calls", type=int, default=20000, help="Spans for the per-span cost")
+    parser.add_argument("--queries", type=int, default=300, help="HFClient.query calls per run")
+    args = parser.parse_args()
+    # Keep the per-call INFO logging out of the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    tracing.configure(None)
+    off = span_cost(args.calls)
+    tracing.configure(tracing.MemoryExporter())
+    on = span_cost(args.calls)
+    print(f"Per span: {off:.0f} ns with tracing off, {on:.0f} ns with tracing on\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ClassifierHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/models/{{model_id}}"
+    client = HFClient(api_key="bench", endpoint_pools={"bench-model": EndpointPool([url])})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_file = os.path.join(tmp, "traces.jsonl")
+        for name, exporter in [("tracing off", None),
+                               ("tracing on (JSONL)", tracing.JsonlExporter(trace_file)),
+                               ("tracing on (OTLP/JSON)", tracing.OtlpJsonExporter(trace_file))]:
+            tracing.configure(exporter)
+            query_latency(client, 20)  # warm up the connection
+            print(f"HFClient.query, {name}: {query_latency(client, args.queries):.3f} ms/call")
+        tracing.flush()
+
+        paths = []
+        for i in range(3):
+            path = os.path.join(tmp, f"image_{i}.jpg")
+            Image.new("RGB", (1600, 1200), (40 * i, 90, 160)).save(path)
+            paths.append(path)
+        exporter = tracing.MemoryExporter()
+        tracing.configure(exporter)
+        model = ImageModel(client, "bench-model", cache_size=0)
+        model.process_batch(paths)
+        tracing.flush()
+        print("\nTrace of ImageModel.process_batch over 3 images:")
+        print_tree(exporter.spans)
+
+    tracing.configure(None)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+Open-loop load generator with latency percentiles
+
+Sends requests at a target arrival rate, constant or Poisson, whether or not
+earlier requests have finished, the way independent users do. A closed loop
+(N threads each waiting for its previous answer) slows down with the server
+and so never shows the queue building up. Latency is measured from each
+request's scheduled send time, so time spent waiting for a free client
+thread counts as well.
+
+The traffic is a mix of the models in AVAILABLE_MODELS, using each model's
+example input (a generated photo for image models), sent to one of:
+
+- client: HFClient.query, including image preprocessing and formatting
+- model: the model classes' process_input (SentimentModel, TextModel, ImageModel)
+- http: bare POSTs of the prepared payloads to the endpoint URL
+
+Without --url the requests go to a stand-in server started in-process that
+serves --server-workers requests at a time with a fixed service time per
+model kind, so it has a known capacity. Each load step records an HDR-style
+latency histogram (log-linear buckets, under 1% error), error counts and
+the achieved throughput. A sweep over several rates reports the knee: the
+highest offered rate before throughput falls behind or p99 latency takes
+off.
+
+Usage:
+    python bench/loadgen.py [--target client|model|http] [--rates 20,40,80 | --sweep 20:200:20]
+                            [--arrivals poisson|constant] [--duration 5] [--url URL]
+                            [--mix "Sentiment Analysis=2,Image Recognition=1"] [--json FILE]
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from PIL import Image
+
+from gui.app import AVAILABLE_MODELS
+from models.endpoint_pool import EndpointPool
+from models.hf_client import HFClient
+from models.image_model import ImageModel
+from models.text_model import SentimentModel, TextModel
+from utils.image_io import encode_for_profile
+
+TARGETS = ("client", "model", "http")
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Stand-in server service times in seconds
+SERVICE_TIMES = {"text-classification": 0.010, "text-generation": 0.030, "image-classification": 0.040}
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram.
+
+    Values are recorded in microseconds into log-linear buckets: exact below
+    128 us, then 64 buckets per power of two, so any recorded value is known
+    to within 1% whatever its magnitude. Memory stays small for any number
+    of samples and histograms from several threads or steps can be merged.
+    """
+
+    SUB_BITS = 7
+    SUB_COUNT = 1 << SUB_BITS
+    HALF_COUNT = SUB_COUNT // 2
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < cls.SUB_COUNT:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return cls.SUB_COUNT + (shift - 1) * cls.HALF_COUNT + (value >> shift) - cls.HALF_COUNT
+
+    @classmethod
+    def _value(cls, index: int) -> int:
+        """Midpoint of a bucket."""
+        if index < cls.SUB_COUNT:
+            return index
+        shift, top = divmod(index - cls.SUB_COUNT, cls.HALF_COUNT)
+        shift += 1
+        return ((top + cls.HALF_COUNT) << shift) + (1 << (shift - 1))
+
+    def record(self, seconds: float) -> None:
+        """Record one latency."""
+        value = max(0, int(seconds * 1e6))
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_us += value
+            if value > self.max_us:
+                self.max_us = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add another histogram's samples to this one."""
+        with self._lock:
+            self.counts.update(other.counts)
+            self.count += other.count
+            self.total_us += other.total_us
+            self.max_us = max(self.max_us, other.max_us)
+
+    def percentile_ms(self, percentile: float) -> float:
+        """Latency in milliseconds at or below which the given share of samples lies."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(self.count * percentile / 100 + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def mean_ms(self) -> float:
+        """Mean latency in milliseconds."""
+        return self.total_us / self.count / 1000 if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        """Percentile spectrum for the JSON report."""
+        spectrum = [50, 75, 90, 95, 99, 99.5, 99.9, 99.99]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean_ms(), 3),
+            "max_ms": self.max_us / 1000,
+            "percentiles_ms": {str(p): round(self.percentile_ms(p), 3) for p in spectrum},
+        }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers like an Inference API endpoint with a fixed capacity."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        model_id = self.path.split("/models/", 1)[-1]
+        pipeline = self.server.pipelines.get(model_id, "text-classification")
+        with self.server.capacity:
+            time.sleep(SERVICE_TIMES[pipeline] * self.server.service_scale)
+        if pipeline == "text-generation":
+            output = [{"generated_text": "Once upon a time in a digital world, the load test ended."}]
+        else:
+            output = [{"label": f"LABEL_{i}", "score": round(0.9 / (i + 1), 4)} for i in range(5)]
+        body = json.dumps(output).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog deep enough for bursts of connections."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def start_stand_in(workers, service_scale):
+    """Start the stand-in server; returns (server, URL template)."""
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.capacity = threading.Semaphore(workers)
+    server.service_scale = service_scale
+    server.pipelines = {info["id"]: info["pipeline"] for info in AVAILABLE_MODELS.values()}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/models/{{model_id}}"
+
+
+def parse_mix(spec):
+    """Parse "Model Name=weight,..." into {name: weight} (default: every model equally)."""
+    if not spec:
+        return {name: 1.0 for name in AVAILABLE_MODELS}
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in AVAILABLE_MODELS:
+            raise SystemExit(f"Unknown model {name!r} (choose from {', '.join(AVAILABLE_MODELS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_rates(args):
+    """Offered rates in requests per second from --rates or --sweep."""
+    if args.rates:
+        return [float(rate) for rate in args.rates.split(",")]
+    start, stop, step = (float(part) for part in args.sweep.split(":"))
+    rates = []
+    while start <= stop + 1e-9:
+        rates.append(start)
+        start += step
+    return rates
+
+
+def build_senders(target, url, mix, image_path):
+    """
+    Return {model name: callable} sending that model's example input.
+
+    Each callable returns the response (a result dict, or a requests
+    Response for the http target); see outcome().
+    """
+    senders = {}
+    if target == "http":
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=256)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        headers = HFClient(api_key=os.getenv("HF_API_KEY") or "loadgen").headers
+    else:
+        client = HFClient(api_key=os.getenv("HF_API_KEY") or "loadgen")
+        if url:
+            for info in AVAILABLE_MODELS.values():
+                client.set_endpoint_pool(info["id"], EndpointPool([url]))
+
+    for name in mix:
+        info = AVAILABLE_MODELS[name]
+        is_image = info["input_type"] == "image"
+        example = image_path if is_image else info["example"]
+        if target == "client":
+            senders[name] = (lambda model_id=info["id"], data=example, pipeline=info["pipeline"],
+                             profile=info.get("preprocessing"):
+                             client.query(model_id, data, pipeline, profile))
+        elif target == "model":
+            if is_image:
+                model = ImageModel(client, info["id"], cache_size=0,
+                                   preprocessing=info.get("preprocessing"))
+            elif info["pipeline"] == "text-classification":
+                model = SentimentModel(client, info["id"])
+            else:
+                model = TextModel(client, info["id"])
+            senders[name] = (lambda model=model, data=example:
+                             model.process_input(data))
+        else:
+            inputs = (base64.b64encode(encode_for_profile(image_path, info.get("preprocessing"))).decode()
+                      if is_image else example)
+            body = json.dumps({"inputs": inputs})
+            endpoint = (url or "https://api-inference.huggingface.co/models/{model_id}").format(
+                model_id=info["id"])
+            senders[name] = (lambda endpoint=endpoint, body=body:
+                             session.post(endpoint, data=body, headers=headers, timeout=30))
+    return senders
+
+
+def outcome(response):
+    """Return (succeeded, error reason) for a sender's response."""
+    if isinstance(response, requests.Response):
+        return response.ok, f"HTTP {response.status_code}"
+    return response.get("status") == "success", response.get("error") or "error response"
+
+
+def run_step(senders, mix, rate, duration, arrivals, workers, rng):
+    """
+    Offer load at one rate for duration seconds and wait for the answers.
+
+    Returns:
+        Dict with the histogram, counts, achieved throughput and how far
+        behind schedule the generator itself fell
+    """
+    histogram = LatencyHistogram()
+    per_model = {name: LatencyHistogram() for name in mix}
+    errors: Counter = Counter()
+    names, weights = list(mix), list(mix.values())
+    lock = threading.Lock()
+    done = {"ok": 0, "last": 0.0}
+
+    def send(name, scheduled):
+        try:
+            ok, reason = outcome(senders[name]())
+        except Exception as e:
+            ok, reason = False, type(e).__name__
+        finished = time.perf_counter()
+        latency = finished - scheduled
+        histogram.record(latency)
+        per_model[name].record(latency)
+        with lock:
+            if ok:
+                done["ok"] += 1
+            else:
+                errors[f"{name}: {reason}"] += 1
+            done["last"] = max(done["last"], finished)
+
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="loadgen")
+    sent, max_lag, offset = 0, 0.0, 0.0
+    start = time.perf_counter()
+    while True:
+        offset += rng.expovariate(rate) if arrivals == "poisson" else 1.0 / rate
+        if offset >= duration:
+            break
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        executor.submit(send, rng.choices(names, weights)[0], scheduled)
+        sent += 1
+    executor.shutdown(wait=True)
+    elapsed = max(duration, done["last"] - start)
+    return {
+        "offered_per_s": rate,
+        "sent": sent,
+        "ok": done["ok"],
+        "errors": dict(errors),
+        "error_rate": (sent - done["ok"]) / sent if sent else 0.0,
+        "achieved_per_s": done["ok"] / elapsed,
+        "elapsed_s": elapsed,
+        "generator_max_lag_ms": max_lag * 1000,
+        "latency": histogram,
+        "per_model": per_model,
+    }
+
+
+def find_knee(steps, throughput_ratio=0.9, latency_factor=3.0, max_error_rate=0.01):
+    """
+    Return the highest offered rate the target kept up with, or None.
+
+    A step is past the knee when its achieved throughput is below
+    throughput_ratio of the offered rate, its p99 is more than
+    latency_factor times the first step's, or more than max_error_rate of
+    its requests failed.
+    """
+    if not steps:
+        return None
+    base_p99 = steps[0]["latency"].percentile_ms(99) or 1e-3
+    knee = None
+    for step in steps:
+        if (step["achieved_per_s"] < throughput_ratio * step["offered_per_s"]
+                or step["latency"].percentile_ms(99) > latency_factor * base_p99
+                or step["error_rate"] > max_error_rate):
+            break
+        knee = step["offered_per_s"]
+    return knee
+
+
+def main():
+    """Run the load steps and print the results."""
+    parser = argparse.ArgumentParser(description="Open-loop load generator")
+    parser.add_argument("--target", choices=TARGETS, default="client")
+    parser.add_argument("--rates", help="Comma-separated offered rates in requests/s")
+    parser.add_argument("--sweep", default="20:200:20", help="START:STOP:STEP rates (default 20:200:20)")
+    parser.add_argument("--arrivals", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per load step")
+    parser.add_argument("--mix", help='Model weights, e.g. "Sentiment Analysis=2,Image Recognition=1"')
+    parser.add_argument("--url", help="Endpoint URL template with {model_id} (default: local stand-in server)")
+    parser.add_argument("--image", help="Image sent to image models (default: a generated 640x480 JPEG)")
+    parser.add_argument("--workers", type=int, default=256, help="Client threads for requests in flight")
+    parser.add_argument("--server-workers", type=int, default=4, help="Stand-in server concurrency")
+    parser.add_argument("--service-scale", type=float, default=1.0, help="Multiplier on stand-in service times")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the per-step results and histograms to this file")
+    args = parser.parse_args()
+    # Keep the per-call logging out of the measurement; failures are counted in the report
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    mix = parse_mix(args.mix)
+    rates = parse_rates(args)
+    rng = random.Random(args.seed)
+    server, url = (None, args.url) if args.url else start_stand_in(args.server_workers, args.service_scale)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = args.image
+        if not image_path:
+            image_path = os.path.join(tmp, "loadgen.jpg")
+            Image.new("RGB", (640, 480), (30, 120, 200)).save(image_path, quality=90)
+        senders = build_senders(args.target, url, mix, image_path)
+        for name in mix:  # warm up connections and lazy imports
+            senders[name]()
+
+        total = sum(mix.values())
+        print(f"Target {args.target} at {url if args.url else f'stand-in server ({args.server_workers} workers)'}, "
+              f"{args.arrivals} arrivals, {args.duration:g}s per step")
+        print("Mix: " + ", ".join(f"{name} {weight / total:.0%}" for name, weight in mix.items()) + "\n")
+        header = (f"{'offered/s':>10}{'achieved/s':>12}{'errors':>8}"
+                  + "".join(f"{f'p{p:g} ms':>11}" for p in PERCENTILES) + f"{'max ms':>11}")
+        print(header)
+        steps = []
+        for rate in rates:
+            step = run_step(senders, mix, rate, args.duration, args.arrivals, args.workers, rng)
+            steps.append(step)
+            latency = step["latency"]
+            print(f"{rate:>10.1f}{step['achieved_per_s']:>12.1f}{step['error_rate']:>8.1%}"
+                  + "".join(f"{latency.percentile_ms(p):>11.1f}" for p in PERCENTILES)
+                  + f"{latency.max_us / 1000:>11.1f}"
+                  + (f"  (generator {step['generator_max_lag_ms']:.0f} ms behind)"
+                     if step["generator_max_lag_ms"] > 50 else ""))
+            for reason, count in step["errors"].items():
+                print(f"{'':>10}  {count} x {reason}")
+
+    knee = find_knee(steps)
+    if knee is None:
+        print("\nKnee: below the lowest offered rate")
+    elif knee == steps[-1]["offered_per_s"]:
+        print(f"\nKnee: not reached up to {knee:g} req/s")
+    else:
+        print(f"\nKnee: about {knee:g} req/s (the next step fell behind, "
+              f"its p99 rose over 3x or more than 1% of requests failed)")
+
+    if args.json:
+        report = {
+            "target": args.target,
+            "arrivals": args.arrivals,
+            "duration_s": args.duration,
+            "mix": mix,
+            "knee_per_s": knee,
+            "steps": [dict(step, latency=step["latency"].to_dict(),
+                           per_model={name: h.to_dict() for name, h in step["per_model"].items()})
+                      for step in steps],
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+    if server is not None:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
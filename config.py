@@ -1,9 +1,6 @@
 import os
-<<<<<<< HEAD
 import json
 from pathlib import Path
-=======
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if present
@@ -11,7 +8,6 @@ load_dotenv()
 
 class Config:
     """Handles configuration and API key management."""
-<<<<<<< HEAD
     
     CONFIG_FILE = "config.json"
     
@@ -28,10 +24,3 @@ class Config:
         # Try environment variable first
         return os.getenv("HF_API_KEY")
 
-=======
-
-    @staticmethod
-    def get_hf_api_key():
-        # Fallback to demo/public access if key not found
-        return os.getenv("HF_API_KEY", None)
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
@@ -1,5 +1,4 @@
 """
-<<<<<<< HEAD
 GUI implementation for the AI Model interface using Tkinter.
 
 This module demonstrates various OOP concepts:
@@ -8,9 +7,6 @@ This module demonstrates various OOP concepts:
 3. Encapsulation: Through proper class structure and private methods
 4. Polymorphism: In model implementations
 5. Method overriding: In specialized model classes
-=======
-GUI implementation for the AI Model interface.
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
 """
 
 import os
@@ -19,15 +15,23 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import tkinter as tk
-<<<<<<< HEAD
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from models.text_model import TextModel
 from models.image_model import ImageModel
 from models.hf_client import HFClient
+from models.scheduler import RequestScheduler, INTERACTIVE, BATCH
+from utils import profiling, tracing
+from utils.pipeline import Stage, StageError, StreamingPipeline
+from utils.text_io import CHUNK, DEFAULT_UNIT_CHARS, LINE, iter_units, read_chunks
+from utils.logging_setup import setup_logging
+from models.warmup import WarmupManager, READY, FAILED
 from config import Config
 from PIL import Image, ImageTk
 import io
 import json
+import queue
+import threading
+import time
 
 # Available models configuration
 AVAILABLE_MODELS = {
@@ -47,7 +51,14 @@ AVAILABLE_MODELS = {
         "input_type": "image",
         "output_type": "text",
         "example": "path/to/image.jpg",
-        "pipeline": "image-classification"
+        "pipeline": "image-classification",
+        # ResNet resizes to 256 and center crops 224; anything larger is wasted upload
+        "preprocessing": {
+            "size": 256,
+            "mode": "shortest_edge",
+            "format": "JPEG",
+            "quality": 90
+        }
     },
     "Text Generation": {
         "id": "gpt2",
@@ -59,13 +70,16 @@ AVAILABLE_MODELS = {
         "pipeline": "text-generation"
     }
 }
-=======
-from tkinter import ttk, scrolledtext
-from models.text_model import TextModel
-from models.image_model import ImageModel
-from PIL import Image, ImageTk
-import io
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
+
+# Text files: characters shown in the input preview, and polling interval of the loaders
+PREVIEW_CHARS = 200_000
+POLL_MS = 50
+# Processing a text file: requests in flight, queued inputs/results, results shown per poll
+FILE_WORKERS = 4
+FILE_QUEUE_SIZE = 16
+RESULTS_PER_POLL = 200
+# Oldest result lines are dropped beyond this many
+MAX_OUTPUT_LINES = 10_000
 
 class AIModelGUI:
     """A GUI interface for interacting with AI models."""
@@ -73,40 +87,42 @@ class AIModelGUI:
     def __init__(self, root=None):
         """Initialize the GUI with text and image model capabilities."""
         self.root = root if root else tk.Tk()
-<<<<<<< HEAD
         self.root.title("Tkinter AI GUI")
         self.root.geometry("1200x800")
         
+        # Record request traces when HF_TRACE_FILE is set, profile when HF_PROFILE is set
+        tracing.configure_from_env()
+        profiling.configure_from_env()
+        self._reported_profile = None
+        
+        # Text file shown in the input area, its loader and any file being processed
+        self._loaded_file = None
+        self._text_loader = None
+        self._file_job = None
+        
         # Initialize HF client
-        self.client = HFClient(mock_mode=False)  # Set to True for testing without API
+        self.api_client = HFClient(mock_mode=False)  # Set to True for testing without API
+        
+        # Requests from this window are sent ahead of background work
+        self.client = RequestScheduler(self.api_client)
+        
+        # Preload models in the background so the first request is not cold
+        self.warmup = WarmupManager(self.client, AVAILABLE_MODELS).start()
         
         # Initialize variables
         self.current_model = tk.StringVar(value="Sentiment Analysis")
         self.input_type = tk.StringVar(value="text")
         self.status_var = tk.StringVar(value="Ready")
+        self.readiness_var = tk.StringVar(value="")
         
         # Create main menu
         self._create_menu()
         
         # Setup the GUI components
-=======
-        self.root.title("AI Model Interface")
-        self.root.geometry("800x600")
-        
-        # Initialize HF client with mock mode for testing
-        from models.hf_client import HFClient
-        client = HFClient(mock_mode=True)
-        
-        # Initialize models with specific model IDs
-        self.text_model = TextModel(client, "gpt2")  # Example model ID
-        self.image_model = ImageModel(client, "stable-diffusion-v1-5")  # Example model ID
-        
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
         self._setup_gui()
     
     def _setup_gui(self):
         """Set up the GUI components."""
-<<<<<<< HEAD
         # Create main sections
         top_frame = ttk.Frame(self.root)
         top_frame.pack(fill='x', padx=10, pady=5)
@@ -199,24 +215,11 @@ class AIModelGUI:
         status_bar = ttk.Frame(self.root)
         status_bar.pack(fill='x', side='bottom', padx=10, pady=5)
         ttk.Label(status_bar, textvariable=self.status_var).pack(side='left')
+        ttk.Label(status_bar, textvariable=self.readiness_var).pack(side='right')
         
         # Update initial model information
         self._update_model_info()
-=======
-        # Create notebook for tabs
-        notebook = ttk.Notebook(self.root)
-        notebook.pack(fill='both', expand=True, padx=10, pady=5)
-        
-        # Text model tab
-        text_frame = ttk.Frame(notebook)
-        notebook.add(text_frame, text='Text Model')
-        self._setup_text_tab(text_frame)
-        
-        # Image model tab
-        image_frame = ttk.Frame(notebook)
-        notebook.add(image_frame, text='Image Model')
-        self._setup_image_tab(image_frame)
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
+        self._refresh_readiness()
     
     def _setup_text_tab(self, parent):
         """Set up the text model interface tab."""
@@ -296,7 +299,6 @@ class AIModelGUI:
                 self.image_output.delete("1.0", tk.END)
                 self.image_output.insert(tk.END, f"Error: {str(e)}")
     
-<<<<<<< HEAD
     def _create_menu(self):
         """Create the main menu bar."""
         menubar = tk.Menu(self.root)
@@ -306,6 +308,11 @@ class AIModelGUI:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Load Input", command=self._browse_input)
+        file_menu.add_command(label="Process Loaded File Line by Line",
+                              command=lambda: self._process_file(LINE))
+        file_menu.add_command(label="Process Loaded File in Chunks",
+                              command=lambda: self._process_file(CHUNK))
+        file_menu.add_command(label="Stop Processing File", command=self._stop_file_processing)
         file_menu.add_command(label="Save Output", command=self._save_output)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
@@ -322,6 +329,15 @@ class AIModelGUI:
         menubar.add_cascade(label="Settings", menu=settings_menu)
         settings_menu.add_command(label="Configure API Key", command=self._configure_api_key)
         
+        # Tools menu
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        tools_menu.add_command(label=f"Profile Next {profiling.DEFAULT_REQUESTS} Requests (cProfile)",
+                               command=lambda: self._start_profiling(profiling.CPROFILE))
+        tools_menu.add_command(label=f"Profile Next {profiling.DEFAULT_REQUESTS} Requests (Sampling + Memory)",
+                               command=lambda: self._start_profiling(profiling.SAMPLE, memory=True))
+        tools_menu.add_command(label="Stop Profiling and Save", command=self._stop_profiling)
+        
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
@@ -329,6 +345,26 @@ class AIModelGUI:
         help_menu.add_command(label="Documentation", command=self._show_docs)
         help_menu.add_command(label="Get API Key", command=self._show_api_help)
 
+    def _start_profiling(self, mode: str, memory: bool = False):
+        """Profile the next requests made from this window."""
+        session = profiling.start_profiling(mode, memory=memory)
+        self.status_var.set(f"🔬 Profiling the next {session.requests} requests ({mode})")
+
+    def _stop_profiling(self):
+        """Stop profiling and show where the results were written."""
+        paths = profiling.stop_profiling()
+        if paths:
+            messagebox.showinfo("Profiling Results", "Profile written to:\n" + "\n".join(paths))
+        else:
+            messagebox.showinfo("Profiling Results", "No profiling results to save.")
+
+    def _check_profiling(self):
+        """Report a profiling session that finished after its last request."""
+        session = profiling.current_session()
+        if session is not None and session.paths and session is not self._reported_profile:
+            self._reported_profile = session
+            self.status_var.set(f"🔬 Profile written to {os.path.dirname(session.paths[0])}")
+
     def _update_input_guidance(self):
         """Update the input guidance and example based on selected model."""
         model_info = AVAILABLE_MODELS[self.current_model.get()]
@@ -380,6 +416,15 @@ class AIModelGUI:
 • Decorators: Used for logging and caching"""
         self.oop_text.insert(tk.END, oop_text)
 
+    def _refresh_readiness(self):
+        """Show per-model warm-up state in the status bar (polled with after())."""
+        icons = {READY: "✅", FAILED: "❌"}
+        status = self.warmup.status()
+        self.readiness_var.set("  ".join(
+            f"{name}: {icons.get(record['state'], '⏳')}" for name, record in status.items()
+        ))
+        self.root.after(1000, self._refresh_readiness)
+
     def _browse_input(self):
         """Open file browser for input selection."""
         if self.input_type.get() == "image":
@@ -392,9 +437,212 @@ class AIModelGUI:
             file_path = filedialog.askopenfilename(
                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
             if file_path:
-                with open(file_path, 'r') as file:
-                    self.input_text.delete("1.0", tk.END)
-                    self.input_text.insert(tk.END, file.read())
+                self._load_text_file(file_path)
+
+    def _load_text_file(self, file_path: str):
+        """Show a text file in the input area, read in chunks on a background thread.
+        
+        Only the first PREVIEW_CHARS characters are shown; larger files can be
+        processed in full with _process_file.
+        """
+        if self._text_loader is not None:
+            self._text_loader.set()
+        stop = threading.Event()
+        chunks = queue.Queue()  # holds at most PREVIEW_CHARS characters
+        self._text_loader = stop
+        self._loaded_file = None
+        self.input_text.delete("1.0", tk.END)
+        self.status_var.set(f"⏳ Loading {os.path.basename(file_path)}...")
+        
+        def read():
+            loaded = 0
+            try:
+                for chunk in read_chunks(file_path):
+                    if stop.is_set():
+                        return
+                    chunks.put(("text", chunk[:PREVIEW_CHARS - loaded]))
+                    loaded += len(chunk)
+                    if loaded >= PREVIEW_CHARS:
+                        chunks.put(("done", True))
+                        return
+                chunks.put(("done", False))
+            except OSError as e:
+                chunks.put(("error", e))
+        
+        threading.Thread(target=read, name="text-loader", daemon=True).start()
+        self.root.after(POLL_MS, self._show_loaded_text, file_path, stop, chunks)
+
+    def _show_loaded_text(self, file_path: str, stop: threading.Event, chunks: queue.Queue):
+        """Insert the chunks read so far into the input area (polled with after())."""
+        if stop.is_set():
+            return
+        while True:
+            try:
+                kind, value = chunks.get_nowait()
+            except queue.Empty:
+                self.root.after(POLL_MS, self._show_loaded_text, file_path, stop, chunks)
+                return
+            if kind == "text":
+                self.input_text.insert(tk.END, value)
+                continue
+            self._text_loader = None
+            if kind == "error":
+                self.status_var.set("❌ Error occurred")
+                messagebox.showerror("Error", f"Could not read {file_path}: {value}")
+                return
+            self._loaded_file = file_path
+            name = os.path.basename(file_path)
+            if not value:
+                self.status_var.set(f"📄 Loaded {name}")
+                return
+            size_mb = os.path.getsize(file_path) / 1e6
+            self.status_var.set(f"📄 Showing the first {PREVIEW_CHARS:,} characters of {name} ({size_mb:.1f} MB)")
+            answer = messagebox.askyesnocancel(
+                "Large File",
+                f"{name} ({size_mb:.1f} MB) is too large to send as one input.\n\n"
+                f"Process the whole file with {self.current_model.get()}?\n\n"
+                f"Yes: line by line\n"
+                f"No: in chunks of about {DEFAULT_UNIT_CHARS:,} characters\n"
+                f"Cancel: only preview it"
+            )
+            if answer is not None:
+                self._process_file(LINE if answer else CHUNK)
+            return
+
+    def _process_file(self, mode: str):
+        """Run the selected model over the loaded text file, line by line or in chunks.
+        
+        The file is read lazily and the inputs go through a bounded pipeline
+        (FILE_WORKERS requests in flight at batch priority, so clicks on Run
+        Model are still served first). Results stream into the output area.
+        """
+        if not self._loaded_file:
+            messagebox.showwarning("No File Loaded", "Load a text file with Browse or File > Load Input first.")
+            return
+        model_name = self.current_model.get()
+        model_info = AVAILABLE_MODELS[model_name]
+        if model_info["input_type"] != "text":
+            messagebox.showwarning("Text Model Required", f"{model_name} does not take text input.")
+            return
+        if self.warmup.state(model_name) not in (READY, FAILED):
+            messagebox.showinfo(
+                "Model Warming Up",
+                f"{model_name} is still loading. Please try again in a moment."
+            )
+            return
+        
+        file_path = self._loaded_file
+        try:
+            # Fail now rather than from the pipeline's feed thread if the file went away
+            with open(file_path, "rb"):
+                pass
+        except OSError as e:
+            self.status_var.set("❌ Error occurred")
+            messagebox.showerror("Error", f"Error reading file: {e}")
+            return
+        
+        self._stop_file_processing()
+        stop = threading.Event()
+        results = queue.Queue(maxsize=RESULTS_PER_POLL)
+        self._file_job = stop
+        self.output_text.delete("1.0", tk.END)
+        self.status_var.set(f"⏳ Processing {os.path.basename(file_path)} by {mode}...")
+        
+        def put(message):
+            # Blocks while the output area is behind, which holds back the pipeline
+            while not stop.is_set():
+                try:
+                    results.put(message, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def send(unit):
+            number, text = unit
+            return number, self.client.query(
+                model_id=model_info["id"],
+                input_data=text,
+                pipeline=model_info["pipeline"],
+                priority=BATCH
+            )
+        
+        def run():
+            pipeline = StreamingPipeline([Stage("query", send, workers=FILE_WORKERS)],
+                                         queue_size=FILE_QUEUE_SIZE)
+            start = time.perf_counter()
+            try:
+                with tracing.span("gui.process_file", model=model_info["id"], mode=mode):
+                    for _, outcome in pipeline.run(iter_units(file_path, mode)):
+                        if not put(("result", outcome)):
+                            return
+            except OSError as e:
+                put(("error", e))
+                return
+            put(("done", time.perf_counter() - start))
+        
+        threading.Thread(target=run, name="file-processor", daemon=True).start()
+        progress = {"mode": mode, "done": 0, "failed": 0}
+        self.root.after(POLL_MS, self._show_file_results, stop, results, progress)
+
+    def _show_file_results(self, stop: threading.Event, results: queue.Queue, progress: dict):
+        """Append the results received so far to the output area (polled with after())."""
+        if stop.is_set():
+            return
+        lines, finished = [], None
+        for _ in range(RESULTS_PER_POLL):
+            try:
+                kind, value = results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "result":
+                line, ok = self._format_unit_result(progress["mode"], value)
+                lines.append(line)
+                progress["done"] += 1
+                progress["failed"] += not ok
+            else:
+                finished = (kind, value)
+                break
+        if lines:
+            self.output_text.insert(tk.END, "\n".join(lines) + "\n")
+            excess = int(self.output_text.index("end-1c").split(".")[0]) - MAX_OUTPUT_LINES
+            if excess > 0:
+                self.output_text.delete("1.0", f"{excess + 1}.0")
+            self.output_text.see(tk.END)
+        
+        counts = f"{progress['done']:,} {progress['mode']}s processed, {progress['failed']:,} failed"
+        if finished is None:
+            self.status_var.set(f"⏳ {counts}...")
+            self.root.after(POLL_MS, self._show_file_results, stop, results, progress)
+            return
+        self._file_job = None
+        kind, value = finished
+        if kind == "error":
+            self.status_var.set(f"❌ Error reading file after {counts}")
+            messagebox.showerror("Error", f"Error reading file: {value}")
+        else:
+            self.status_var.set(f"✅ {counts} in {value:.1f}s")
+        self._check_profiling()
+
+    def _format_unit_result(self, mode: str, outcome) -> tuple:
+        """Format the result for one line or chunk of a file as (output line, succeeded)."""
+        if isinstance(outcome, StageError):
+            return f"Error: {outcome.error}", False
+        number, result = outcome
+        label = f"{mode.capitalize()} {number}"
+        if result.get("status") != "success":
+            return f"{label}: Error: {result.get('message', 'Unknown error occurred')}", False
+        data = result.get("data", {})
+        if "top_prediction" in data:
+            return f"{label}: {data['top_prediction']} ({data['confidence']:.2%})", True
+        return f"{label}: {data.get('output', 'No output available')}", True
+
+    def _stop_file_processing(self):
+        """Stop processing a text file; requests already sent still complete."""
+        if self._file_job is not None:
+            self._file_job.set()
+            self._file_job = None
+            self.status_var.set("⏹ File processing stopped")
 
     def _save_output(self):
         """Save the output to a file."""
@@ -407,6 +655,11 @@ class AIModelGUI:
 
     def _clear_input(self):
         """Clear the input and output areas."""
+        if self._text_loader is not None:
+            self._text_loader.set()
+            self._text_loader = None
+        self._stop_file_processing()
+        self._loaded_file = None
         self.input_text.delete("1.0", tk.END)
         self.output_text.delete("1.0", tk.END)
         self.status_var.set("Ready")
@@ -465,17 +718,28 @@ class AIModelGUI:
             # Validate input type
             if not self._validate_input(input_text, model_info['input_type']):
                 return
+            
+            # Do not send traffic to a model that is still warming up
+            if self.warmup.state(model_name) not in (READY, FAILED):
+                messagebox.showinfo(
+                    "Model Warming Up",
+                    f"{model_name} is still loading. Please try again in a moment."
+                )
+                return
                 
             # Update status
             self.status_var.set("⏳ Processing...")
             self.root.update()  # Force GUI update
             
-            # Process input through client
-            result = self.client.query(
-                model_id=model_info["id"],
-                input_data=input_text,
-                pipeline=model_info["pipeline"]
-            )
+            # Process input through client (one trace per click)
+            with tracing.span("gui.run_model", model=model_info["id"], button=model_num):
+                result = self.client.query(
+                    model_id=model_info["id"],
+                    input_data=input_text,
+                    pipeline=model_info["pipeline"],
+                    preprocessing=model_info.get("preprocessing"),
+                    priority=INTERACTIVE
+                )
             
             # Format and display result
             self.output_text.delete("1.0", tk.END)
@@ -484,6 +748,7 @@ class AIModelGUI:
             
             # Update status
             self.status_var.set("✅ Processing complete")
+            self._check_profiling()
                 
         except Exception as e:
             error_msg = str(e)
@@ -537,7 +802,7 @@ in their respective sections."""
         ttk.Label(dialog, text="Enter your Hugging Face API key:").pack(padx=20, pady=(20,5))
         
         # API key entry
-        key_var = tk.StringVar(value=self.client.api_key or "")
+        key_var = tk.StringVar(value=self.api_client.api_key or "")
         key_entry = ttk.Entry(dialog, textvariable=key_var, width=50)
         key_entry.pack(padx=20, pady=5)
         
@@ -553,8 +818,8 @@ in their respective sections."""
             api_key = key_var.get().strip()
             if api_key:
                 Config.save_api_key(api_key)
-                self.client.api_key = api_key
-                self.client.headers["Authorization"] = f"Bearer {api_key}"
+                self.api_client.api_key = api_key
+                self.api_client.headers["Authorization"] = f"Bearer {api_key}"
                 messagebox.showinfo("Success", "API key saved successfully!")
                 dialog.destroy()
             else:
@@ -585,7 +850,7 @@ Your key will be saved securely in your config file."""
     def run(self):
         """Start the GUI application."""
         # Check for API key on startup
-        if not self.client.api_key:
+        if not self.api_client.api_key:
             result = messagebox.askyesno(
                 "API Key Required",
                 "A Hugging Face API key is required to use the models. Would you like to configure it now?"
@@ -593,13 +858,26 @@ Your key will be saved securely in your config file."""
             if result:
                 self._configure_api_key()
         
-=======
-    def run(self):
-        """Start the GUI application."""
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
         self.root.mainloop()
 
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Tkinter AI GUI")
+    parser.add_argument("--profile", choices=profiling.MODES,
+                        help="Profile the first requests with cProfile or the sampling profiler")
+    parser.add_argument("--profile-requests", type=int, default=profiling.DEFAULT_REQUESTS,
+                        help="Number of requests to profile")
+    parser.add_argument("--profile-dir", default=profiling.DEFAULT_OUTPUT_DIR,
+                        help="Directory for the profile files")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Also take tracemalloc snapshots around image preprocessing")
+    args = parser.parse_args()
+    
+    # Log records are written by a background thread (see utils.logging_setup)
+    setup_logging()
     app = AIModelGUI()
+    if args.profile:
+        profiling.start_profiling(args.profile, requests=args.profile_requests,
+                                  output_dir=args.profile_dir, memory=args.profile_memory)
     app.run()
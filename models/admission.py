@@ -0,0 +1,254 @@
+"""
+Admission control and load shedding for HIT137 Assignment 3
+
+Under overload it is better to turn some requests away at once than to
+queue everything and let every caller time out. AdmissionController limits
+the calls running per model and queues the rest briefly; the queue is
+managed with CoDel (Controlled Delay):
+
+- Queueing delay below `target` is fine, however long the queue.
+- If the delay stays above `target` for a whole `interval`, the queue is
+  standing rather than absorbing a burst: requests are shed at the head at
+  a rate that rises with sqrt(drops) until the delay falls below target.
+- While shedding, new arrivals that would have to queue are rejected
+  immediately, as are arrivals when the queue is full or when the caller's
+  deadline leaves no time to wait.
+
+Rejected calls get an "overloaded" error dict (see overloaded_error) instead
+of the model result. Models are protected with the admission_controlled
+decorator and BaseModel.set_admission_controller; RequestScheduler uses the
+same CoDel logic on its queues.
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from utils.deadline import remaining
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed by admission control."""
+
+
+def overloaded_error(model_id: Optional[str], message: str, retry_after: float = 1.0) -> Dict[str, Any]:
+    """Return the error dict for a request turned away under overload."""
+    return {
+        "status": "error",
+        "model": model_id,
+        "error": "Overloaded",
+        "message": message,
+        "retry_after": retry_after,
+    }
+
+
+class CoDel:
+    """
+    CoDel drop decisions for one queue.
+
+    Attributes:
+        target: Acceptable standing queueing delay in seconds
+        interval: Seconds the delay must stay above target before shedding
+    """
+
+    def __init__(self, target_ms: float = 50.0, interval_ms: float = 500.0):
+        """
+        Initialize the state.
+
+        Args:
+            target_ms: Acceptable standing queueing delay in milliseconds
+            interval_ms: Time the delay must stay above target before shedding
+        """
+        self.target = target_ms / 1000
+        self.interval = interval_ms / 1000
+        self.dropping = False
+        self.drops = 0
+        self._first_above = 0.0
+        self._drop_next = 0.0
+        self._count = 0
+
+    def _above_target(self, sojourn: float, now: float) -> bool:
+        """True once the delay has been above target for a full interval."""
+        if sojourn < self.target:
+            self._first_above = 0.0
+            return False
+        if not self._first_above:
+            self._first_above = now + self.interval
+            return False
+        return now >= self._first_above
+
+    def should_drop(self, sojourn: float, now: float = None) -> bool:
+        """
+        Decide whether to shed a request leaving the queue (caller serializes calls).
+
+        Args:
+            sojourn: Seconds the request spent queued
+            now: time.monotonic() value (default: now)
+        """
+        now = now if now is not None else time.monotonic()
+        above = self._above_target(sojourn, now)
+        if self.dropping:
+            if not above:
+                self.dropping = False
+                return False
+            if now >= self._drop_next:
+                self._count += 1
+                self._drop_next += self.interval / math.sqrt(self._count)
+                self.drops += 1
+                return True
+            return False
+        if above:
+            self.dropping = True
+            # Resume near the previous drop rate if we were shedding recently
+            recent = now - self._drop_next < 16 * self.interval
+            self._count = max(1, self._count - 2) if recent else 1
+            self._drop_next = now + self.interval / math.sqrt(self._count)
+            self.drops += 1
+            return True
+        return False
+
+
+class _ModelState:
+    """Admission state of one model."""
+
+    def __init__(self, target_ms: float, interval_ms: float, lock: threading.Lock):
+        self.cond = threading.Condition(lock)  # waiters of this model only
+        self.in_flight = 0
+        self.waiting = 0
+        self.codel = CoDel(target_ms, interval_ms)
+        self.admitted = 0
+        self.rejected = 0
+
+
+class AdmissionController:
+    """
+    Per-model concurrency limit with a CoDel-managed wait queue.
+
+    Attributes:
+        max_in_flight: Calls allowed to run at once per model
+        max_queue: Calls allowed to wait per model before rejecting outright
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_queue: int = 32,
+                 target_ms: float = 50.0, interval_ms: float = 500.0):
+        """
+        Initialize the controller.
+
+        Args:
+            max_in_flight: Calls allowed to run at once per model
+            max_queue: Calls allowed to wait per model before rejecting outright
+            target_ms: CoDel target queueing delay in milliseconds
+            interval_ms: CoDel interval in milliseconds
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.target_ms = target_ms
+        self.interval_ms = interval_ms
+        self._states: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model_id: str) -> _ModelState:
+        state = self._states.get(model_id)
+        if state is None:
+            state = self._states[model_id] = _ModelState(self.target_ms, self.interval_ms, self._lock)
+        return state
+
+    def _reject(self, state: _ModelState, reason: str) -> None:
+        state.rejected += 1
+        raise Overloaded(reason)
+
+    def enter(self, model_id: str) -> None:
+        """
+        Wait for a slot to run a call on model_id.
+
+        Raises:
+            Overloaded: If the call is shed
+        """
+        with self._lock:
+            state = self._state(model_id)
+            if state.in_flight < self.max_in_flight and not state.waiting:
+                state.codel.should_drop(0.0)  # an empty queue ends a shedding episode
+                state.in_flight += 1
+                state.admitted += 1
+                return
+            if state.waiting >= self.max_queue:
+                self._reject(state, f"{model_id} is overloaded: queue full")
+            if state.codel.dropping:
+                self._reject(state, f"{model_id} is overloaded: shedding load")
+            left = remaining()
+            if left is not None and left <= 0:
+                self._reject(state, f"{model_id} is overloaded: no time left to queue")
+
+            start = time.monotonic()
+            state.waiting += 1
+            try:
+                while state.in_flight >= self.max_in_flight:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        if state.in_flight < self.max_in_flight:
+                            state.cond.notify()  # pass on a wake-up meant for this waiter
+                        self._reject(state, f"{model_id} is overloaded: deadline passed while queued")
+                    state.cond.wait(timeout=left)
+            finally:
+                state.waiting -= 1
+            now = time.monotonic()
+            if state.codel.should_drop(now - start, now):
+                state.cond.notify()  # the freed slot goes to the next waiter
+                self._reject(state, f"{model_id} is overloaded: queueing delay "
+                                    f"{(now - start) * 1000:.0f} ms above target")
+            state.in_flight += 1
+            state.admitted += 1
+
+    def exit(self, model_id: str) -> None:
+        """Release the slot taken by enter()."""
+        with self._lock:
+            state = self._states[model_id]
+            state.in_flight -= 1
+            state.cond.notify()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return in-flight, queue and shedding counters per model."""
+        with self._lock:
+            return {
+                model_id: {
+                    "in_flight": state.in_flight,
+                    "waiting": state.waiting,
+                    "admitted": state.admitted,
+                    "rejected": state.rejected,
+                    "shedding": state.codel.dropping,
+                }
+                for model_id, state in self._states.items()
+            }
+
+
+def admission_controlled(func: Callable) -> Callable:
+    """
+    Guard a model method with the model's admission controller.
+
+    Does nothing until BaseModel.set_admission_controller has been called.
+    Shed calls return overloaded_error(...) instead of running. The time
+    spent waiting for a slot is traced as an "admission.enter" span.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        controller = getattr(self, "_admission", None)
+        if controller is None:
+            return func(self, *args, **kwargs)
+        try:
+            with span("admission.enter", model=self._model_id):
+                controller.enter(self._model_id)
+        except Overloaded as e:
+            logger.warning(str(e))
+            return overloaded_error(self._model_id, str(e))
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            controller.exit(self._model_id)
+
+    return wrapper
@@ -9,7 +9,7 @@ Team: Mission, Rohan, Millan, Dipak
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class BaseModel(ABC):
@@ -24,6 +24,8 @@ class BaseModel(ABC):
     Attributes:
         _client: HuggingFace API client (protected)
         _model_id: Model identifier (protected)
+        _timeout: Default per-call deadline in seconds, None for no deadline (protected)
+        _admission: Optional AdmissionController guarding process_input (protected)
     """
     
     def __init__(self, client, model_id: str):
@@ -36,6 +38,8 @@ class BaseModel(ABC):
         """
         self._client = client
         self._model_id = model_id
+        self._timeout: Optional[float] = None
+        self._admission = None
     
     @abstractmethod
     def process_input(self, input_data: Any) -> Dict[str, Any]:
@@ -44,6 +48,10 @@ class BaseModel(ABC):
         
         This is an abstract method that must be implemented by subclasses.
         Each model type (text, image) will have its own implementation.
+        Implementations are wrapped with utils.decorators.with_deadline, so
+        callers may pass timeout=<seconds> to bound the whole call, and with
+        models.admission.admission_controlled, so calls may be shed under
+        overload with an "Overloaded" error dict.
         
         Args:
             input_data: The input to process (type varies by model)
@@ -65,6 +73,24 @@ class BaseModel(ABC):
         """
         return self._model_id
     
+    def set_timeout(self, timeout: Optional[float]) -> None:
+        """
+        Set the default per-call deadline.
+        
+        Args:
+            timeout: Seconds a call may take, including retries (None disables it)
+        """
+        self._timeout = timeout
+    
+    def set_admission_controller(self, controller) -> None:
+        """
+        Guard process_input with an admission controller.
+        
+        Args:
+            controller: AdmissionController (may be shared by several models), or None
+        """
+        self._admission = controller
+    
     def _validate_input(self, input_data: Any) -> bool:
         """
         Validate input data (protected method).
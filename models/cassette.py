@@ -0,0 +1,244 @@
+"""
+Record/replay HTTP cassettes for HIT137 Assignment 3
+
+A Cassette sits in HFClient's place of the HTTP call. In record mode each
+request goes to the real endpoint and the response (status code, body, a
+few headers) is appended to the cassette file together with how long it
+took. In replay mode nothing is sent: the recorded response is returned
+after the recorded latency, optionally scaled, so end-to-end performance
+runs are realistic and repeatable without network access.
+
+- Requests are matched on model ID, pipeline and a SHA-256 of the JSON
+  payload, so the same input replays its own answer whatever endpoint it
+  was recorded from. The payload itself is not stored, which keeps
+  cassettes of image traffic small; a ".gz" path is gzip-compressed.
+- Each recording is appended and the file closed again (in a .gz file as
+  its own gzip member), so a cassette is complete whenever the process
+  stops. A line cut short by a crash is skipped on replay.
+- When a request was recorded several times, replays cycle through the
+  recordings in order, keeping the recorded latency spread.
+- A replayed latency longer than the request timeout (capped by the
+  call's deadline) sleeps for the timeout and raises ReadTimeout, as the
+  real request would. A request with no recording raises CassetteMiss, a
+  RequestException, so callers report it like a failed request.
+
+HFClient uses the cassette passed to it or, without one, the cassette
+described by the environment (cassette_from_env):
+
+    HF_CASSETTE: Cassette file path (unset: no cassette)
+    HF_CASSETTE_MODE: "replay" (default) or "record"
+    HF_CASSETTE_LATENCY_SCALE: Multiplier on replayed latencies (default 1, 0 for none)
+
+Example:
+    client = HFClient(cassette=Cassette("runs/api.jsonl.gz", mode=RECORD))
+    ...  # run the workload against the live API once
+    client = HFClient(cassette=Cassette("runs/api.jsonl.gz", latency_scale=0.5))
+"""
+
+import gzip
+import hashlib
+import http
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+MODES = (RECORD, REPLAY)
+
+# Response headers kept in the cassette (used by the rate limiter)
+_KEPT_HEADERS = ("Content-Type", "Retry-After", "X-RateLimit-Limit",
+                 "X-RateLimit-Remaining", "X-RateLimit-Reset")
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """No recorded response matches a request in replay mode."""
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """Return the SHA-256 (hex) of a payload's canonical JSON."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _open(path: str, mode: str):
+    """Open a cassette file as text, gzip-compressed if the path ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """
+    Records HTTP responses to a file or replays them from it.
+
+    Attributes:
+        path: Cassette file
+        mode: "record" or "replay"
+        latency_scale: Multiplier on replayed latencies (0 replays instantly)
+        hits: Requests answered from the cassette
+        misses: Requests with no matching recording
+        recorded: Responses recorded
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, latency_scale: float = 1.0):
+        """
+        Initialize the cassette.
+
+        Args:
+            path: Cassette file (appended to when recording)
+            mode: "record" or "replay"
+            latency_scale: Multiplier on replayed latencies (0 replays instantly)
+
+        Raises:
+            ValueError: If the mode is unknown or latency_scale is negative
+            FileNotFoundError: If a cassette to replay does not exist
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode} (expected one of {', '.join(MODES)})")
+        if latency_scale < 0:
+            raise ValueError("Latency scale cannot be negative")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._entries: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._next: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._load()
+
+    def _load(self) -> None:
+        """Read the recordings from the cassette file."""
+        with _open(self.path, "r") as f:
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping a truncated recording in %s", self.path)
+                        continue
+                    key = (entry["model"], entry["pipeline"], entry["payload"])
+                    self._entries.setdefault(key, []).append(entry)
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                logger.warning("%s ends in an incomplete gzip member; replaying the recordings before it",
+                               self.path)
+        logger.info("Loaded %d recordings of %d requests from %s",
+                    sum(map(len, self._entries.values())), len(self._entries), self.path)
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: float,
+             model_id: str, pipeline: str) -> requests.Response:
+        """
+        POST a payload, recording the response or replaying a recorded one.
+
+        Args:
+            url: Endpoint URL
+            headers: Request headers
+            payload: JSON request body
+            timeout: Request timeout in seconds
+            model_id: Model the request is for (part of the match key)
+            pipeline: Pipeline of the request (part of the match key)
+
+        Returns:
+            The live or replayed response
+
+        Raises:
+            CassetteMiss: If replaying and no recording matches
+            requests.exceptions.RequestException: If the request fails or times out
+        """
+        key = (model_id, pipeline, payload_hash(payload))
+        if self.mode == REPLAY:
+            return self._replay(key, url, timeout)
+        start = time.perf_counter()
+        response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+        self._record(key, response, (time.perf_counter() - start) * 1000)
+        return response
+
+    def _replay(self, key: Tuple[str, str, str], url: str, timeout: float) -> requests.Response:
+        """Return the next recording for a key after its (scaled) latency."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {key[0]} ({key[1]}), "
+                                   f"payload {key[2][:12]}, in {self.path}")
+            index = self._next.get(key, 0)
+            self._next[key] = (index + 1) % len(entries)
+            self.hits += 1
+        entry = entries[index]
+        delay = entry["ms"] / 1000 * self.latency_scale
+        if delay > timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.ReadTimeout(
+                f"Replayed response from {url} takes {delay:.1f}s (timeout {timeout:.1f}s)")
+        time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        try:
+            response.reason = http.HTTPStatus(entry["status"]).phrase
+        except ValueError:
+            # Non-standard code (e.g. a proxy's 599)
+            response.reason = ""
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        response.encoding = "utf-8"
+        response.url = url
+        response._content = entry["body"].encode("utf-8")
+        return response
+
+    def _record(self, key: Tuple[str, str, str], response: requests.Response, elapsed_ms: float) -> None:
+        """Append a response to the cassette file."""
+        entry = {
+            "model": key[0],
+            "pipeline": key[1],
+            "payload": key[2],
+            "status": response.status_code,
+            "ms": round(elapsed_ms, 1),
+            "headers": {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers},
+            "body": response.text,
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _open(self.path, "a") as f:
+                f.write(line)
+            self._entries.setdefault(key, []).append(entry)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cassette's counters."""
+        return {
+            "path": self.path,
+            "mode": self.mode,
+            "requests": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """Return the cassette described by HF_CASSETTE* (None when HF_CASSETTE is unset)."""
+    path = os.getenv("HF_CASSETTE")
+    if not path:
+        return None
+    return Cassette(
+        path,
+        mode=os.getenv("HF_CASSETTE_MODE", REPLAY).lower(),
+        latency_scale=float(os.getenv("HF_CASSETTE_LATENCY_SCALE", "1")),
+    )
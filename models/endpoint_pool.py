@@ -0,0 +1,266 @@
+"""
+Endpoint pools for HIT137 Assignment 3
+
+An EndpointPool spreads the requests for one model across several inference
+endpoints (dedicated Inference Endpoints, local replicas behind an HTTP
+server, or the public Inference API). It provides:
+
+- weighted round-robin or least-outstanding-requests selection
+- passive health checks: endpoints that fail several times in a row are
+  ejected for a while (longer after each repeated ejection)
+- per-endpoint latency tracking (EWMA and the last latency)
+
+HFClient takes one pool per model ID and reports the routing decision in
+the "routing" field of each response.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+HF_INFERENCE_API = "https://api-inference.huggingface.co/models/{model_id}"
+
+WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+
+
+class LatencyWindow:
+    """
+    Sliding window of recent latencies for percentile estimates.
+
+    Attributes:
+        min_samples: Samples needed before percentile() returns a value
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        """
+        Initialize the window.
+
+        Args:
+            size: Number of most recent latencies kept
+            min_samples: Samples needed before percentile() returns a value
+        """
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, latency_ms: float) -> None:
+        """Record one latency in milliseconds."""
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the pct-th percentile in milliseconds, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class Endpoint:
+    """
+    One inference endpoint and its health and latency statistics.
+
+    Attributes:
+        url: Endpoint URL; "{model_id}" is replaced by the model ID
+        name: Name shown in routing metadata (defaults to the URL)
+        weight: Relative share of traffic
+        headers: Extra HTTP headers for this endpoint (e.g. its own token)
+    """
+
+    def __init__(self, url: str, *, name: str = None, weight: float = 1.0,
+                 headers: Dict[str, str] = None):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Endpoint URL; "{model_id}" is replaced by the model ID
+            name: Name shown in routing metadata (defaults to the URL)
+            weight: Relative share of traffic (must be positive)
+            headers: Extra HTTP headers for this endpoint
+        """
+        if weight <= 0:
+            raise ValueError("Endpoint weight must be positive")
+        self.url = url
+        self.name = name or url
+        self.weight = weight
+        self.headers = headers or {}
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.latency_ewma_ms: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.latencies = LatencyWindow()
+        self._current_weight = 0.0  # smooth weighted round-robin state
+
+    def url_for(self, model_id: str) -> str:
+        """Return the request URL for a model."""
+        return self.url.format(model_id=model_id)
+
+    def is_ejected(self, now: float = None) -> bool:
+        """Return True while the endpoint is ejected."""
+        return (now or time.monotonic()) < self.ejected_until
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the endpoint's counters."""
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected": self.is_ejected(),
+            "latency_ewma_ms": self.latency_ewma_ms,
+            "last_latency_ms": self.last_latency_ms,
+            "p95_ms": self.latencies.percentile(95),
+        }
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.name!r}, weight={self.weight})"
+
+
+class EndpointPool:
+    """
+    Selects endpoints for a model and tracks their health.
+
+    Usage:
+        pool = EndpointPool(["https://a.endpoints.example/", "http://localhost:8080/"])
+        endpoint = pool.acquire()
+        try:
+            ...  # send the request to endpoint.url_for(model_id)
+            pool.release(endpoint, latency_ms, ok=True)
+        except Exception:
+            pool.release(endpoint, latency_ms, ok=False)
+
+    Attributes:
+        strategy: "least_outstanding" or "weighted_round_robin"
+        max_failures: Consecutive failures before an endpoint is ejected
+        ejection_time: Seconds of the first ejection (doubled on each repeat)
+        max_ejection_time: Upper bound on the ejection time
+        latency_alpha: Smoothing factor of the latency EWMA
+    """
+
+    def __init__(self, endpoints: Sequence[Union[str, Endpoint]], *,
+                 strategy: str = LEAST_OUTSTANDING, max_failures: int = 3,
+                 ejection_time: float = 30.0, max_ejection_time: float = 300.0,
+                 latency_alpha: float = 0.2):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints: Endpoints or endpoint URLs
+            strategy: "least_outstanding" or "weighted_round_robin"
+            max_failures: Consecutive failures before an endpoint is ejected
+            ejection_time: Seconds of the first ejection (doubled on each repeat)
+            max_ejection_time: Upper bound on the ejection time
+            latency_alpha: Smoothing factor of the latency EWMA
+        """
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        if strategy not in (LEAST_OUTSTANDING, WEIGHTED_ROUND_ROBIN):
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.endpoints: List[Endpoint] = [
+            e if isinstance(e, Endpoint) else Endpoint(e) for e in endpoints
+        ]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.latency_alpha = latency_alpha
+        self._lock = threading.Lock()
+
+    def _healthy(self, now: float, exclude: Optional[Endpoint] = None) -> List[Endpoint]:
+        """Endpoints that are not ejected; all of them if every one is (panic mode)."""
+        endpoints = [e for e in self.endpoints if e is not exclude] or self.endpoints
+        healthy = [e for e in endpoints if not e.is_ejected(now)]
+        if healthy:
+            return healthy
+        # Never refuse traffic outright: try the endpoint that comes back first.
+        return [min(endpoints, key=lambda e: e.ejected_until)]
+
+    def _weighted_round_robin(self, candidates: List[Endpoint]) -> Endpoint:
+        """Smooth weighted round-robin (spreads heavy endpoints evenly)."""
+        total = 0.0
+        best = None
+        for endpoint in candidates:
+            endpoint._current_weight += endpoint.weight
+            total += endpoint.weight
+            if best is None or endpoint._current_weight > best._current_weight:
+                best = endpoint
+        best._current_weight -= total
+        return best
+
+    @staticmethod
+    def _least_outstanding(candidates: List[Endpoint]) -> Endpoint:
+        """Fewest outstanding requests per unit of weight; ties go to the faster endpoint."""
+        return min(candidates, key=lambda e: (
+            e.outstanding / e.weight,
+            e.latency_ewma_ms if e.latency_ewma_ms is not None else 0.0,
+        ))
+
+    def acquire(self, exclude: Optional[Endpoint] = None) -> Endpoint:
+        """
+        Select an endpoint and count the request as outstanding on it.
+
+        Args:
+            exclude: Endpoint to avoid if any other is available (e.g. for a hedged request)
+        """
+        with self._lock:
+            candidates = self._healthy(time.monotonic(), exclude)
+            if self.strategy == WEIGHTED_ROUND_ROBIN:
+                endpoint = self._weighted_round_robin(candidates)
+            else:
+                endpoint = self._least_outstanding(candidates)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency_ms: float, ok: Optional[bool]) -> None:
+        """
+        Record the outcome of a request sent to an endpoint.
+
+        Args:
+            endpoint: Endpoint returned by acquire()
+            latency_ms: Request latency in milliseconds
+            ok: False if the endpoint failed (connection error, timeout or 5xx),
+                None if the request never reached it (only the outstanding count changes)
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok is None:
+                return
+            endpoint.last_latency_ms = latency_ms
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                endpoint.latencies.add(latency_ms)
+                if endpoint.latency_ewma_ms is None:
+                    endpoint.latency_ewma_ms = latency_ms
+                else:
+                    endpoint.latency_ewma_ms += self.latency_alpha * (latency_ms - endpoint.latency_ewma_ms)
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                duration = min(self.max_ejection_time, self.ejection_time * 2 ** endpoint.ejections)
+                endpoint.ejections += 1
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_until = time.monotonic() + duration
+                logger.warning("Ejecting endpoint %s for %.0fs after %d consecutive failures",
+                               endpoint.name, duration, self.max_failures)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return the statistics of every endpoint."""
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
@@ -1,33 +1,76 @@
 import requests
-<<<<<<< HEAD
 import logging
 from config import Config
+from utils.deadline import DeadlineExceeded, remaining, timeout_for
 from utils.decorators import retry_on_failure, log_call
+from utils.image_io import encode_for_profile
+from utils.profiling import profiled, track_memory
+from utils.tracing import add_event, span
+from models.cassette import Cassette, CassetteMiss, cassette_from_env
+from models.endpoint_pool import HF_INFERENCE_API, Endpoint, EndpointPool, LatencyWindow
+from models.rate_limiter import RateLimiter
+from models.results import ClassificationResult, ImageClassificationResult, ModelResponse, TextResult
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Dict, Any, Optional
-from PIL import Image
-import io
 import base64
+import contextvars
+import threading
+import time
 
 logger = logging.getLogger(__name__)
-=======
-from config import Config
-from utils.decorators import retry_on_failure, log_call
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
+
+# Upper bound on one HTTP attempt; a call's deadline can only shorten it
+REQUEST_TIMEOUT = 30
+# 429 responses re-queued on the rate limiter before giving up
+MAX_THROTTLED_RETRIES = 5
+
+
+def _request_error(e: requests.exceptions.RequestException) -> Dict[str, Any]:
+    """Error response for a failed request, with the HTTP status when the server answered."""
+    error = {
+        "status": "error",
+        "message": f"API request failed: {str(e)}"
+    }
+    if getattr(e, "response", None) is not None:
+        # e.g. 503 while the model is still loading
+        error["status_code"] = e.response.status_code
+    return error
+
 
 class HFClient:
     """Encapsulates Hugging Face API interaction with error handling."""
 
-    def __init__(self, model_id: str = None, *, api_key: str = None, mock_mode: bool = False):
+    # Threads shared by the in-flight primaries and hedges of hedged requests
+    HEDGE_WORKERS = 16
+
+    def __init__(self, model_id: str = None, *, api_key: str = None, mock_mode: bool = False,
+                 compact_results: bool = False, endpoint_pools: Dict[str, EndpointPool] = None,
+                 hedge_requests: bool = False, rate_limiter: RateLimiter = None,
+                 cassette: Cassette = None):
         """Initialize the HuggingFace API client.
         
         Args:
             model_id: The ID of the model to use
             api_key: Optional API key to use (overrides config)
             mock_mode: If True, operate in mock mode (no actual API calls)
+            compact_results: If True, return slotted ModelResponse objects instead of dicts
+            endpoint_pools: Optional EndpointPool per model ID (default: the public Inference API)
+            hedge_requests: If True, duplicate requests slower than the model's p95 latency
+            rate_limiter: Optional RateLimiter for this API key (share it between clients using the key)
+            cassette: Optional Cassette recording or replaying the HTTP requests (default: HF_CASSETTE)
         """
         self.mock_mode = mock_mode
         self.model_id = model_id
-<<<<<<< HEAD
+        self.compact_results = compact_results
+        self.endpoint_pools: Dict[str, EndpointPool] = dict(endpoint_pools or {})
+        self.hedge_requests = hedge_requests
+        self.rate_limiter = rate_limiter
+        self.cassette = cassette if cassette is not None else cassette_from_env()
+        self.hedged = 0
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_busy = 0
+        self._hedge_lock = threading.Lock()
         
         # Get API key from config or parameter
         self.api_key = api_key or Config.get_hf_api_key()
@@ -42,133 +85,314 @@ class HFClient:
         # Remove None values from headers
         self.headers = {k: v for k, v in self.headers.items() if v is not None}
 
-    def _prepare_image_input(self, image_path: str) -> str:
-        """Prepare image for API input by converting to base64."""
+    def _prepare_image_input(self, image_path: str, profile: Optional[Dict[str, Any]] = None) -> str:
+        """Prepare image for API input by resizing it to the model's profile and converting to base64.
+        
+        Args:
+            image_path: Path to the image file
+            profile: Preprocessing profile of the model (default: fit in 1024 px, JPEG)
+        """
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if needed
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                # Resize if too large
-                if max(img.size) > 1024:
-                    img.thumbnail((1024, 1024))
-                # Convert to bytes
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='JPEG')
-                img_byte_arr = img_byte_arr.getvalue()
-                return base64.b64encode(img_byte_arr).decode('utf-8')
+            with span("HFClient.prepare_image_input", path=image_path) as prep_span, \
+                    track_memory("HFClient.prepare_image_input"):
+                img_bytes = encode_for_profile(image_path, profile)
+                prep_span.set_attribute("bytes", len(img_bytes))
+                return base64.b64encode(img_bytes).decode('utf-8')
         except Exception as e:
-            logger.error(f"Error preparing image: {str(e)}")
+            logger.error("Error preparing image: %s", e)
             raise ValueError(f"Failed to process image: {str(e)}")
 
+    def _success(self, result: Any) -> Any:
+        """Wrap a result object in a success response.
+        
+        Returns a ModelResponse when compact_results is set, otherwise the
+        plain {"status": "success", "data": {...}} dict.
+        """
+        if self.compact_results:
+            return ModelResponse("success", result)
+        return {
+            "status": "success",
+            "data": result.to_dict()
+        }
+
     def _format_text_output(self, response: list) -> Dict[str, Any]:
         """Format text classification output."""
         try:
             # Handle different response formats
             if isinstance(response, list):
                 if len(response) > 0:
-                    if isinstance(response[0], dict):
+                    if isinstance(response[0], dict) and "generated_text" in response[0]:
+                        # Text generation output
+                        result = TextResult(response[0]["generated_text"])
+                    elif isinstance(response[0], dict):
                         # Classification results
-                        results = sorted(response[0], key=lambda x: x.get('score', 0), reverse=True)
-                        formatted = {
-                            "predictions": results,
-                            "top_prediction": results[0]['label'],
-                            "confidence": results[0]['score']
-                        }
+                        result = ClassificationResult.from_predictions(response)
                     else:
-                        formatted = {"output": str(response[0])}
+                        result = TextResult(str(response[0]))
                 else:
-                    formatted = {"output": "No results returned"}
+                    result = TextResult("No results returned")
             else:
-                formatted = {"output": str(response)}
+                result = TextResult(str(response))
                 
-            return {
-                "status": "success",
-                "data": formatted
-            }
+            return self._success(result)
         except Exception as e:
-            logger.error(f"Error formatting text output: {str(e)}")
+            logger.error("Error formatting text output: %s", e)
             return {
                 "status": "error",
                 "message": f"Failed to format output: {str(e)}"
             }
 
     def _format_image_output(self, response: list) -> Dict[str, Any]:
-        """Format image classification output."""
+        """Format image classification output (top 5, selected with a heap)."""
         try:
             if isinstance(response, list):
                 # Classification results
-                results = sorted(response, key=lambda x: x.get('score', 0), reverse=True)[:5]
-                formatted = {
-                    "predictions": results,
-                    "top_prediction": results[0]['label'],
-                    "confidence": results[0]['score'],
-                    "all_predictions": [
-                        f"{pred['label']} ({pred['score']:.2%})"
-                        for pred in results
-                    ]
-                }
+                result = ImageClassificationResult.from_predictions(response, k=5)
             else:
-                formatted = {"output": str(response)}
+                result = TextResult(str(response))
                 
-            return {
-                "status": "success",
-                "data": formatted
-            }
+            return self._success(result)
         except Exception as e:
-            logger.error(f"Error formatting image output: {str(e)}")
+            logger.error("Error formatting image output: %s", e)
             return {
                 "status": "error",
                 "message": f"Failed to format output: {str(e)}"
             }
 
-    @log_call
-    @retry_on_failure(retries=3, delay=2)
-    def query(self, model_id: str, input_data: str, pipeline: str) -> Dict[str, Any]:
-        """Send query to Hugging Face model and return structured response.
+    def set_endpoint_pool(self, model_id: str, pool: Optional[EndpointPool]) -> None:
+        """Route a model's requests through an endpoint pool (None restores the Inference API)."""
+        if pool is None:
+            self.endpoint_pools.pop(model_id, None)
+        else:
+            self.endpoint_pools[model_id] = pool
+
+    def _format_response(self, output: Any, pipeline: str) -> Dict[str, Any]:
+        """Format raw API output based on pipeline type."""
+        with span("HFClient.format_response", pipeline=pipeline):
+            if pipeline == "image-classification":
+                return self._format_image_output(output)
+            return self._format_text_output(output)
+
+    def _post_payload(self, model_id: str, payload: Dict[str, Any], pipeline: str) -> Dict[str, Any]:
+        """POST a prepared payload to the Inference API and format the response.
+        
+        Models with an endpoint pool are sent to the endpoint the pool selects,
+        and the response gets a "routing" entry describing that choice. With
+        hedge_requests the payload may be sent twice (see _hedged_send).
+        
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+            DeadlineExceeded: If the call's deadline has passed
+        """
+        pool = self.endpoint_pools.get(model_id)
+        if self.hedge_requests:
+            return self._hedged_send(model_id, payload, pipeline, pool)
+        return self._send(model_id, payload, pipeline, pool, pool.acquire() if pool else None)
+
+    def _send(self, model_id: str, payload: Dict[str, Any], pipeline: str,
+              pool: Optional[EndpointPool], endpoint: Optional[Endpoint]) -> Dict[str, Any]:
+        """Send one HTTP attempt, with its timeout capped by the call's deadline."""
+        if endpoint is None:
+            url, headers = HF_INFERENCE_API.format(model_id=model_id), self.headers
+        else:
+            url, headers = endpoint.url_for(model_id), {**self.headers, **endpoint.headers}
+        start = time.perf_counter()
+        # None until the endpoint answers or fails: client-side aborts (deadline,
+        # rate limiter, cassette miss) say nothing about the endpoint's health
+        ok = None
+        with span("http.post", model=model_id, url=url) as http_span:
+            if endpoint is not None:
+                http_span.set_attribute("endpoint", endpoint.name)
+            if self.cassette is not None:
+                http_span.set_attribute("cassette", self.cassette.mode)
+            try:
+                for attempt in range(MAX_THROTTLED_RETRIES + 1):
+                    if self.rate_limiter is not None:
+                        # Queue for a token instead of sending into a 429
+                        with span("rate_limiter.acquire", model=model_id):
+                            self.rate_limiter.acquire(model_id)
+                        start = time.perf_counter()
+                    timeout = timeout_for(REQUEST_TIMEOUT)
+                    try:
+                        if self.cassette is not None:
+                            response = self.cassette.post(url, headers, payload, timeout, model_id, pipeline)
+                        else:
+                            response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+                    except CassetteMiss:
+                        raise
+                    except requests.exceptions.RequestException:
+                        ok = False  # connection error or timeout
+                        raise
+                    if self.rate_limiter is None:
+                        break
+                    self.rate_limiter.update(model_id, response.status_code, response.headers)
+                    if response.status_code != 429:
+                        break
+                    http_span.add_event("throttled", attempt=attempt)
+                http_span.set_attribute("http.status_code", response.status_code)
+                # Client errors (4xx) say nothing about the endpoint's health
+                ok = response.status_code < 500
+                response.raise_for_status()
+                output = response.json()
+            finally:
+                latency_ms = (time.perf_counter() - start) * 1000
+                if endpoint is not None:
+                    pool.release(endpoint, latency_ms, ok)
+                    if ok is False:
+                        logger.warning("Endpoint %s failed for %s", endpoint.name, model_id)
+        self._latency_window(model_id).add(latency_ms)
+        
+        result = self._format_response(output, pipeline)
+        if endpoint is not None:
+            result["routing"] = {
+                "endpoint": endpoint.name,
+                "strategy": pool.strategy,
+                "latency_ms": latency_ms,
+                "endpoint_latency_ewma_ms": endpoint.latency_ewma_ms,
+                "healthy_endpoints": sum(not e.is_ejected() for e in pool.endpoints),
+            }
+        return result
+
+    def _latency_window(self, model_id: str) -> LatencyWindow:
+        """Return the recent-latency window of a model."""
+        with self._hedge_lock:
+            window = self._latencies.get(model_id)
+            if window is None:
+                window = self._latencies[model_id] = LatencyWindow()
+            return window
+
+    def _hedged_send(self, model_id: str, payload: Dict[str, Any], pipeline: str,
+                     pool: Optional[EndpointPool]) -> Dict[str, Any]:
+        """Send a request and, if it is slower than the model's p95, a duplicate.
+        
+        The duplicate goes to a different endpoint of the pool when there is
+        one. The first successful answer wins; the other attempt is cancelled
+        if it has not started, otherwise its result is discarded (a blocking
+        HTTP request cannot be interrupted, but its timeout is bounded by the
+        deadline). No hedge is sent before 20 latencies have been observed,
+        when the deadline leaves no time for it, or when all HEDGE_WORKERS
+        threads are busy: an attempt never waits in the executor's queue
+        behind other requests, it runs on the caller's thread instead.
+        """
+        delay_ms = self._latency_window(model_id).percentile(95)
+        primary = pool.acquire() if pool else None
+        left = remaining()
+        if (delay_ms is None or (left is not None and left * 1000 <= delay_ms)
+                or not self._reserve_hedge_worker()):
+            return self._send(model_id, payload, pipeline, pool, primary)
+        first = self._submit_hedged(model_id, payload, pipeline, pool, primary)
+        done, _ = wait([first], timeout=delay_ms / 1000)
+        if done or not self._reserve_hedge_worker():
+            return first.result()
+        
+        with self._hedge_lock:
+            self.hedged += 1
+        backup = pool.acquire(exclude=primary) if pool else None
+        hedge = self._submit_hedged(model_id, payload, pipeline, pool, backup)
+        attempts = {first: "primary", hedge: "hedge"}
+        endpoints = {first: primary, hedge: backup}
+        logger.debug("Hedging request to %s after %.0f ms (p95)", model_id, delay_ms)
+        add_event("hedge", delay_ms=delay_ms)
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for other in pending:
+                    # An attempt cancelled before it started never releases its endpoint
+                    if other.cancel() and pool is not None:
+                        pool.release(endpoints[other], 0.0, None)
+                add_event("hedge.winner", winner=attempts[future])
+                result["hedge"] = {"winner": attempts[future], "delay_ms": delay_ms}
+                return result
+        raise error
+
+    def _reserve_hedge_worker(self) -> bool:
+        """Claim a free hedge thread for one attempt; False if all are busy."""
+        with self._hedge_lock:
+            if self._hedge_busy >= self.HEDGE_WORKERS:
+                return False
+            self._hedge_busy += 1
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.HEDGE_WORKERS,
+                                                          thread_name_prefix="hedge")
+            return True
+
+    def _release_hedge_worker(self, _future: Future) -> None:
+        """Return the hedge thread claimed for an attempt once it finishes or is cancelled."""
+        with self._hedge_lock:
+            self._hedge_busy -= 1
+
+    def _submit_hedged(self, model_id: str, payload: Dict[str, Any], pipeline: str,
+                       pool: Optional[EndpointPool], endpoint: Optional[Endpoint]) -> Future:
+        """Run one attempt on a hedge thread reserved with _reserve_hedge_worker."""
+        context = contextvars.copy_context()
+        future = self._hedge_executor.submit(context.run, self._send, model_id, payload,
+                                             pipeline, pool, endpoint)
+        future.add_done_callback(self._release_hedge_worker)
+        return future
+
+    @profiled
+    def send_payload(self, model_id: str, payload: Dict[str, Any], pipeline: str) -> Dict[str, Any]:
+        """Send an already prepared payload (e.g. a base64 image) and return structured response.
+        
+        Lets callers such as the ImageModel batch pipeline run image preparation
+        and network I/O as separate stages.
         
         Args:
             model_id: The ID of the model to use
-            input_data: The input text or image path
-            pipeline: The type of pipeline to use (e.g., "text-classification", "image-classification")
+            payload: Request body, e.g. {"inputs": image_b64}
+            pipeline: The type of pipeline to use
         
         Returns:
             Dict containing the response with proper formatting
         """
-=======
-        if model_id:
-            self.api_url = f"https://api-inference.huggingface.co/models/{model_id}"
-        self.api_key = api_key or Config.get_hf_api_key()
-        self.headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        if self.mock_mode:
+            return self.query(model_id, payload.get("inputs"), "text-classification")
+        try:
+            return self._post_payload(model_id, payload, pipeline)
+        except DeadlineExceeded as e:
+            logger.error("API request to %s ran out of time", model_id)
+            return {
+                "status": "error",
+                "error": "DeadlineExceeded",
+                "message": f"API request failed: {str(e)}"
+            }
+        except requests.exceptions.RequestException as e:
+            logger.error("API request failed: %s", e)
+            return _request_error(e)
+        except Exception as e:
+            logger.error("Error processing query: %s", e)
+            return {
+                "status": "error",
+                "message": f"Error processing query: {str(e)}"
+            }
 
+    @profiled
     @log_call
     @retry_on_failure(retries=3, delay=2)
-    def query(self, model_id_or_payload: str | dict, payload: dict = None):
-        """Send input payload to Hugging Face model and return structured response.
+    def query(self, model_id: str, input_data: str, pipeline: str,
+              preprocessing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send query to Hugging Face model and return structured response.
         
-        This method accepts two calling conventions:
-        1. query(payload_dict) - Use the model ID from initialization
-        2. query(model_id, payload_dict) - Override the model ID for this call
+        Args:
+            model_id: The ID of the model to use
+            input_data: The input text or image path
+            pipeline: The type of pipeline to use (e.g., "text-classification", "image-classification")
+            preprocessing: Optional image preprocessing profile from AVAILABLE_MODELS
         
-        In mock mode, returns a simulated response without making an actual API call.
+        Returns:
+            Dict containing the response with proper formatting
         """
-        # Handle both calling conventions
-        if isinstance(model_id_or_payload, str):
-            # Called as query(model_id, payload)
-            model_id = model_id_or_payload
-            if payload is None:
-                raise ValueError("Payload is required when providing model_id")
-        else:
-            # Called as query(payload)
-            model_id = self.model_id
-            payload = model_id_or_payload
-
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
         if self.mock_mode:
             return {
                 "status": "success",
                 "data": {
-<<<<<<< HEAD
                     "model": model_id,
                     "predictions": [
                         {"label": "MOCK_LABEL", "score": 0.95},
@@ -183,53 +407,31 @@ class HFClient:
             # Prepare the payload based on pipeline type
             if pipeline == "image-classification":
                 # Handle image input
-                image_b64 = self._prepare_image_input(input_data)
+                image_b64 = self._prepare_image_input(input_data, preprocessing)
                 payload = {"inputs": image_b64}
             else:
                 # Handle text input
                 payload = {"inputs": input_data}
 
-            # Make API request
-            api_url = f"https://api-inference.huggingface.co/models/{model_id}"
-            response = requests.post(api_url, headers=self.headers, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            # Format the response based on pipeline type
-            if pipeline == "image-classification":
-                return self._format_image_output(response.json())
-            else:
-                return self._format_text_output(response.json())
+            # Make API request and format the response
+            return self._post_payload(model_id, payload, pipeline)
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {str(e)}")
+        except DeadlineExceeded as e:
+            logger.error("API request to %s ran out of time", model_id)
             return {
                 "status": "error",
+                "error": "DeadlineExceeded",
                 "message": f"API request failed: {str(e)}"
             }
+        except requests.exceptions.RequestException as e:
+            logger.error("API request failed: %s", e)
+            return _request_error(e)
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
+            logger.error("Error processing query: %s", e)
             return {
                 "status": "error",
                 "message": f"Error processing query: {str(e)}"
             }
-=======
-                    "model": model_id or self.model_id or "mock-model",
-                    "input": payload.get("inputs", ""),
-                    "output": "[Mock Response] " + str(payload.get("inputs", ""))
-                }
-            }
-            
-        if not model_id:
-            raise ValueError("Model ID must be provided either during initialization or in the query call")
-            
-        api_url = f"https://api-inference.huggingface.co/models/{model_id}"
-        try:
-            response = requests.post(api_url, headers=self.headers, json=payload, timeout=30)
-            response.raise_for_status()
-            return {"success": True, "data": response.json()}
-        except requests.exceptions.RequestException as e:
-            return {"success": False, "error": str(e)}
->>>>>>> 7c3ea09b9e1745bb2cf9407e30a0ef94b5d9ada2
 
 
 # Example usage
@@ -9,27 +9,152 @@ Team: Mission, Rohan, Millan, Dipak
 """
 
 from models.base_model import BaseModel
-from typing import Dict, Any
+from models.admission import admission_controlled
+from utils.image_io import ImageInput, encode_for_profile
+from utils.perceptual_hash import PerceptualHashCache
+from utils.pipeline import StreamingPipeline, Stage, StageError
+from utils.decorators import with_deadline
+from utils.profiling import profiled, track_memory
+from utils.tracing import span, traced
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 import logging
 import base64
+import copy
+import io
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Default workers per stage for batch operations
+DEFAULT_CONCURRENCY = {
+    "read": 2,
+    "encode": max(1, (os.cpu_count() or 2) // 2),
+    "upload": 4,
+}
+
+
+def _encode_image(item: tuple) -> Any:
+    """Decode, resize and base64-encode an image (module level so it can run in a process pool).
+    
+    Args:
+        item: (content_hash, data, profile) where data is an ImageInput or raw
+            bytes, or an already cached response that is passed through
+    
+    Returns:
+        (content_hash, image_b64), or the cached response
+    """
+    if isinstance(item, dict):
+        return item
+    content_hash, data, profile = item
+    with track_memory("ImageModel.encode_image"):
+        if isinstance(data, ImageInput):
+            with data:
+                encoded = encode_for_profile(data.reader(), profile)
+        else:
+            encoded = encode_for_profile(io.BytesIO(data), profile)
+    return content_hash, base64.b64encode(encoded).decode("utf-8")
+
 
 class ImageModel(BaseModel):
     """
     Image classification/analysis model.
     
     Inherits from BaseModel and overrides process_input for image-specific processing.
+    Results are cached by the SHA-256 of the file contents, so the same image
+    is only sent once even under different paths. An optional perceptual-hash
+    cache also catches re-encoded or resized copies.
     """
     
-    def process_input(self, image_path: str) -> Dict[str, Any]:
+    PIPELINE = "image-classification"
+    
+    def __init__(self, client, model_id: str, cache_size: int = 128,
+                 perceptual_cache: Optional[PerceptualHashCache] = None,
+                 preprocessing: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the image model.
+        
+        Args:
+            client: HuggingFace API client instance
+            model_id: The model identifier from HuggingFace
+            cache_size: Number of results cached by content hash (0 disables)
+            perceptual_cache: Optional near-duplicate cache consulted before querying
+            preprocessing: Upload preprocessing profile of the model (the
+                "preprocessing" entry in AVAILABLE_MODELS; default: fit in 1024 px)
+        """
+        super().__init__(client, model_id)
+        self._preprocessing = preprocessing
+        self._cache_size = cache_size
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Batch workers look up and store results concurrently
+        self._result_lock = threading.Lock()
+        self._perceptual_cache = perceptual_cache
+    
+    def _perceptual_lookup(self, image: ImageInput, image_path: str):
+        """
+        Look an image up in the perceptual-hash cache.
+        
+        Returns:
+            (perceptual hash or None, cached result copy or None)
+        """
+        if self._perceptual_cache is None:
+            return None, None
+        try:
+            value, match = self._perceptual_cache.lookup(image.reader())
+        except Exception as e:
+            logger.warning("Perceptual hashing failed for %s: %s", image_path, e)
+            return None, None
+        if match is None:
+            return value, None
+        distance, cached = match
+        logger.debug("Near-duplicate hit for %s (distance %d)", image_path, distance)
+        result = copy.deepcopy(cached)
+        result["image_path"] = image_path
+        result["cached"] = True
+        result["dedup_distance"] = distance
+        return value, result
+    
+    def _store_perceptual(self, value: Optional[int], response: Dict[str, Any]) -> None:
+        """Add a successful result to the perceptual-hash cache."""
+        if value is not None and response.get("status") == "success":
+            self._perceptual_cache.add_hash(value, copy.deepcopy(response))
+    
+    def _cached_result(self, content_hash: str, image_path: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for an image, if any."""
+        with self._result_lock:
+            cached = self._result_cache.get(content_hash)
+            if cached is None:
+                return None
+            self._result_cache.move_to_end(content_hash)
+        logger.debug("Cache hit for image %s", image_path)
+        result = copy.deepcopy(cached)
+        result["image_path"] = image_path
+        result["cached"] = True
+        return result
+    
+    def _store_result(self, content_hash: str, response: Dict[str, Any]) -> None:
+        """Cache a successful result under the image content hash."""
+        if self._cache_size <= 0 or response.get("status") != "success":
+            return
+        stored = copy.deepcopy(response)
+        with self._result_lock:
+            self._result_cache[content_hash] = stored
+            self._result_cache.move_to_end(content_hash)
+            while len(self._result_cache) > self._cache_size:
+                self._result_cache.popitem(last=False)
+    
+    @profiled
+    @traced
+    @with_deadline
+    @admission_controlled
+    def process_input(self, image_path: str, preprocessing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process image input through the model.
         
         Args:
             image_path: Path to the image file
+            preprocessing: Image preprocessing profile for the upload (default: the model's)
             
         Returns:
             Dict with status, model, and outputs
@@ -52,31 +177,48 @@ class ImageModel(BaseModel):
                 "message": f"Image file not found: {image_path}"
             }
         
+        # Local clients decode the file straight to a tensor (no base64)
+        if hasattr(self._client, "classify_images"):
+            return self.process_batch([image_path])[0]
+        
+        if preprocessing is None:
+            preprocessing = self._preprocessing
         try:
-            logger.info(f"Processing image with model: {self._model_id}")
-            
-            # Read image file
-            with open(image_path, "rb") as f:
-                image_data = f.read()
-            
-            # Encode image to base64
-            image_b64 = base64.b64encode(image_data).decode()
+            logger.info("Processing image with model: %s", self._model_id)
             
-            # Prepare payload
-            payload = {"inputs": image_b64}
+            # Map the image file once (large files are not copied into memory);
+            # hashing, the cache lookups and the upload encode all read the mapping.
+            with span("ImageModel.read_image", path=image_path) as read_span, \
+                    ImageInput(image_path) as image:
+                content_hash = image.content_hash
+                cached = self._cached_result(content_hash, image_path)
+                if cached is None:
+                    perceptual, cached = self._perceptual_lookup(image, image_path)
+                read_span.set_attribute("cache.hit", cached is not None)
+                if cached is not None:
+                    return cached
+                if hasattr(self._client, "send_payload"):
+                    _, image_b64 = _encode_image((content_hash, image, preprocessing))
             
-            # Query the model through the client
-            response = self._client.query(self._model_id, payload)
+            if hasattr(self._client, "send_payload"):
+                response = self._client.send_payload(self._model_id, {"inputs": image_b64}, self.PIPELINE)
+            else:
+                # Clients without send_payload read and encode the file themselves
+                response = self._client.query(self._model_id, image_path, self.PIPELINE,
+                                              preprocessing=preprocessing)
             
             # Add image-specific metadata
             if response.get("status") == "success":
                 response["input_type"] = "image"
                 response["image_path"] = image_path
+                response["content_hash"] = content_hash
+                self._store_result(content_hash, response)
+                self._store_perceptual(perceptual, response)
             
             return response
             
         except Exception as e:
-            logger.error(f"Error processing image: {str(e)}")
+            logger.error("Error processing image: %s", e)
             return {
                 "status": "error",
                 "model": self._model_id,
@@ -84,6 +226,184 @@ class ImageModel(BaseModel):
                 "message": str(e)
             }
     
+    @traced
+    @with_deadline
+    def process_batch(self, image_paths: List[str], preprocessing: Optional[Dict[str, Any]] = None,
+                      concurrency: Optional[Dict[str, int]] = None,
+                      use_processes: bool = False, batch_size: int = 16) -> List[Dict[str, Any]]:
+        """
+        Process several images and return all results.
+        
+        See process_stream for the arguments.
+        
+        Returns:
+            List of dicts with status, model, and outputs, in input order
+        """
+        return list(self.process_stream(image_paths, preprocessing, concurrency,
+                                        use_processes, batch_size))
+    
+    def process_stream(self, image_paths: Iterable[str], preprocessing: Optional[Dict[str, Any]] = None,
+                       concurrency: Optional[Dict[str, int]] = None,
+                       use_processes: bool = False, batch_size: int = 16) -> Iterator[Dict[str, Any]]:
+        """
+        Process a stream of images, yielding results in input order.
+        
+        With a remote client the work is pipelined: file reads, decode/resize/
+        encode and uploads run as separate stages with bounded queues between
+        them, so they overlap and memory stays flat for any number of inputs.
+        With a local client (LocalClient) images are classified in batches.
+        
+        Args:
+            image_paths: Paths to the image files (consumed lazily)
+            preprocessing: Image preprocessing profile for uploads (default: the model's)
+            concurrency: Workers per stage, keys "read", "encode" and "upload"
+            use_processes: Run the encode stage in a process pool
+            batch_size: Images per batch for local clients
+            
+        Yields:
+            Dicts with status, model, and outputs
+        """
+        if hasattr(self._client, "classify_images"):
+            yield from self._stream_local(image_paths, batch_size)
+            return
+        if not hasattr(self._client, "send_payload"):
+            for path in image_paths:
+                yield self.process_input(path, preprocessing)
+            return
+        
+        workers = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        if preprocessing is None:
+            preprocessing = self._preprocessing
+        
+        def read(image_path):
+            self._check_path(image_path)
+            image = ImageInput(image_path)
+            cached = self._cached_result(image.content_hash, image_path)
+            if cached is None:
+                perceptual, cached = self._perceptual_lookup(image, image_path)
+                perceptual_hashes[image.content_hash] = perceptual
+            if cached is not None:
+                image.close()
+                return cached
+            if use_processes:
+                # Memory maps cannot be sent to another process
+                with image:
+                    return image.content_hash, bytes(image.buffer), preprocessing
+            return image.content_hash, image, preprocessing
+        
+        def upload(item):
+            if isinstance(item, dict):
+                return item
+            content_hash, image_b64 = item
+            response = self._client.send_payload(
+                self._model_id, {"inputs": image_b64}, "image-classification"
+            )
+            response["content_hash"] = content_hash
+            return response
+        
+        pipeline = StreamingPipeline([
+            Stage("read", read, workers["read"]),
+            Stage("encode", _encode_image, workers["encode"], processes=use_processes),
+            Stage("upload", upload, workers["upload"]),
+        ], queue_size=2 * max(workers.values()))
+        
+        paths: Dict[int, str] = {}
+        perceptual_hashes: Dict[str, Optional[int]] = {}
+        
+        def remember(paths_iter):
+            for index, path in enumerate(paths_iter):
+                paths[index] = path
+                yield path
+        
+        logger.info("Processing image stream with model: %s", self._model_id)
+        for index, response in pipeline.run(remember(image_paths)):
+            image_path = paths.pop(index)
+            if isinstance(response, StageError):
+                response = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": str(type(response.error).__name__),
+                    "message": str(response.error)
+                }
+            elif response.get("status") == "success" and not response.get("cached"):
+                response["input_type"] = "image"
+                response["image_path"] = image_path
+                self._store_result(response["content_hash"], response)
+                self._store_perceptual(perceptual_hashes.pop(response["content_hash"], None), response)
+            yield response
+        self._pipeline_stats = pipeline.stats()
+    
+    def pipeline_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get per-stage utilization of the last pipelined batch.
+        
+        Returns:
+            Dict of stage name to statistics (see StreamingPipeline.stats)
+        """
+        return getattr(self, "_pipeline_stats", {})
+    
+    def _check_path(self, image_path: str) -> None:
+        """
+        Raise if an image path is empty or does not exist.
+        
+        Raises:
+            ValueError: If the path is empty
+            FileNotFoundError: If the file does not exist
+        """
+        if not self._validate_input(image_path):
+            raise ValueError("Image path cannot be empty")
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+    
+    def _stream_local(self, image_paths: Iterable[str], batch_size: int) -> Iterator[Dict[str, Any]]:
+        """Classify images with a local client, batch_size images at a time."""
+        chunk: List[str] = []
+        for image_path in image_paths:
+            chunk.append(image_path)
+            if len(chunk) == batch_size:
+                yield from self._classify_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._classify_chunk(chunk)
+    
+    def _classify_chunk(self, image_paths: List[str]) -> List[Dict[str, Any]]:
+        """Classify one batch of images with a local client."""
+        results: List[Dict[str, Any]] = [None] * len(image_paths)
+        valid = []
+        for i, image_path in enumerate(image_paths):
+            try:
+                self._check_path(image_path)
+                valid.append(i)
+            except (ValueError, FileNotFoundError) as e:
+                results[i] = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": "Invalid input" if isinstance(e, ValueError) else "File not found",
+                    "message": str(e)
+                }
+        
+        try:
+            logger.info("Processing %d images with model: %s", len(valid), self._model_id)
+            responses = self._client.classify_images(
+                self._model_id, [image_paths[i] for i in valid]
+            )
+            for i, response in zip(valid, responses):
+                if response.get("status") == "success":
+                    response["input_type"] = "image"
+                    response["image_path"] = image_paths[i]
+                results[i] = response
+        except Exception as e:
+            logger.error("Error processing image batch: %s", e)
+            for i in valid:
+                results[i] = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": str(type(e).__name__),
+                    "message": str(e)
+                }
+        
+        return results
+    
     def _validate_input(self, image_path: str) -> bool:
         """
         Validate image file path.
@@ -100,6 +420,6 @@ class ImageModel(BaseModel):
         # Check file extension
         valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
         if not any(image_path.lower().endswith(ext) for ext in valid_extensions):
-            logger.warning(f"Unusual image extension: {image_path}")
+            logger.warning("Unusual image extension: %s", image_path)
         
         return True
\ No newline at end of file
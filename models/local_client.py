@@ -0,0 +1,480 @@
+"""
+Local inference client for HIT137 Assignment 3
+
+This module runs Hugging Face pipelines in-process instead of calling the
+hosted Inference API. It exposes the same query interface as HFClient so the
+models and the GUI can use either backend.
+Demonstrates inheritance and method overriding.
+"""
+
+import copy
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence, Union
+
+from models.hf_client import HFClient
+from models.model_store import ModelStore
+from models.postprocess import classify_logits
+from models.prefix_cache import PrefixCache
+from models.results import ClassificationResult, ImageClassificationResult
+from utils.decorators import log_call
+from utils.profiling import profiled, track_memory
+
+logger = logging.getLogger(__name__)
+
+
+def _as_dynamic_cache(past: Any) -> Any:
+    """Convert legacy tuple key/values (GPT-2) to a croppable DynamicCache."""
+    if hasattr(past, "crop"):
+        return past
+    from transformers import DynamicCache
+    return DynamicCache.from_legacy_cache(past)
+
+
+def _for_model(model: Any, past: Any) -> Any:
+    """Return past in the format the model accepts (legacy tuples if needed)."""
+    if getattr(model, "_supports_cache_class", False):
+        return past
+    return past.to_legacy_cache()
+
+
+def _stop_index(text: str, stop: Sequence[str]) -> int:
+    """Return the index of the earliest stop sequence in text, or -1."""
+    hits = [text.find(s) for s in stop if s and s in text]
+    return min(hits) if hits else -1
+
+
+def _past_nbytes(past: Any) -> int:
+    """Return the memory used by a DynamicCache."""
+    tensors = list(past.key_cache) + list(past.value_cache)
+    return sum(t.element_size() * t.nelement() for t in tensors)
+
+
+class LocalClient(HFClient):
+    """
+    Runs models locally through transformers pipelines.
+
+    Inherits the output formatting helpers from HFClient and overrides query
+    so that inference happens on this machine. Pipelines are loaded lazily on
+    first use and kept for the lifetime of the client.
+
+    Attributes:
+        device: Torch device index passed to transformers (-1 for CPU)
+        prefix_cache: Optional PrefixCache reused across text-generation calls
+        max_new_tokens: Tokens generated per text-generation request
+        model_store: Optional ModelStore used for offline, memory-mapped loading
+        _pipelines: Loaded pipelines keyed by (model_id, pipeline) (protected)
+    """
+
+    def __init__(self, model_id: str = None, *, api_key: str = None,
+                 mock_mode: bool = False, device: int = -1,
+                 prefix_cache: PrefixCache = None, max_new_tokens: int = 50,
+                 model_store: ModelStore = None, compact_results: bool = False):
+        """Initialize the local client.
+
+        Args:
+            model_id: Default model ID (kept for parity with HFClient)
+            api_key: Optional Hugging Face token used for gated model downloads
+            mock_mode: If True, operate in mock mode (no models are loaded)
+            device: Torch device index, -1 for CPU
+            prefix_cache: Optional PrefixCache for prompt key/value reuse
+            max_new_tokens: Tokens generated per text-generation request
+            model_store: Optional ModelStore; models found there load offline
+            compact_results: If True, return slotted ModelResponse objects instead of dicts
+        """
+        super().__init__(model_id, api_key=api_key, mock_mode=mock_mode,
+                         compact_results=compact_results)
+        self.device = device
+        self.prefix_cache = prefix_cache
+        self.max_new_tokens = max_new_tokens
+        self.model_store = model_store
+        self._pipelines: Dict[tuple, Any] = {}
+        self._load_lock = threading.Lock()
+
+    def load(self, model_id: str, pipeline: str) -> Any:
+        """Load (or return the already loaded) pipeline for a model.
+
+        Args:
+            model_id: The ID of the model to load
+            pipeline: The transformers task name (e.g., "text-classification")
+
+        Returns:
+            The transformers pipeline object
+        """
+        key = (model_id, pipeline)
+        with self._load_lock:
+            if key not in self._pipelines and self.model_store and self.model_store.has(model_id):
+                logger.info("Loading %s from model store", model_id)
+                self._pipelines[key] = self.model_store.load_pipeline(
+                    model_id, pipeline, device=self.device
+                )
+            if key not in self._pipelines:
+                from transformers import pipeline as hf_pipeline
+
+                logger.info("Loading local pipeline %s for %s", pipeline, model_id)
+                self._pipelines[key] = hf_pipeline(
+                    pipeline, model=model_id, device=self.device, token=self.api_key
+                )
+            return self._pipelines[key]
+
+    def loaded_pipelines(self) -> Dict[tuple, Any]:
+        """Return a copy of the loaded pipelines keyed by (model_id, pipeline)."""
+        with self._load_lock:
+            return dict(self._pipelines)
+
+    def _run_pipeline(self, model_id: str, input_data: Any, pipeline: str) -> Any:
+        """Run the raw pipeline for one input and return its native output."""
+        pipe = self.load(model_id, pipeline)
+        if pipeline == "text-classification":
+            return pipe(input_data, top_k=None)
+        if pipeline == "image-classification":
+            return pipe(input_data, top_k=5)
+        if pipeline == "text-generation" and self.prefix_cache is not None:
+            return self._generate_with_prefix_cache(pipe, input_data)
+        return pipe(input_data, max_new_tokens=self.max_new_tokens)
+
+    def _generate_with_prefix_cache(self, pipe: Any, prompt: str) -> list:
+        """Generate text, reusing cached key/values for the prompt prefix.
+
+        The longest block-aligned prefix of the prompt is looked up in the
+        prefix cache; only the remaining tokens are run through the model.
+        The block-aligned prompt prefix is cached for later requests.
+        """
+        import torch
+
+        model, tokenizer = pipe.model, pipe.tokenizer
+        cache = self.prefix_cache
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        ids = inputs["input_ids"][0].tolist()
+
+        # Keep at least one uncached token so generate has something to run.
+        aligned = (len(ids) - 1) // cache.block_size * cache.block_size
+        past = None
+        if aligned:
+            cached_len, cached = cache.lookup(ids, max_tokens=aligned)
+            with torch.no_grad():
+                if cached is None:
+                    past = _as_dynamic_cache(
+                        model(inputs["input_ids"][:, :aligned], use_cache=True).past_key_values
+                    )
+                else:
+                    past = copy.deepcopy(cached)
+                    past.crop(cached_len)
+                    if cached_len < aligned:
+                        past = _as_dynamic_cache(model(
+                            inputs["input_ids"][:, cached_len:aligned],
+                            past_key_values=_for_model(model, past),
+                            use_cache=True,
+                        ).past_key_values)
+            if cached is None or cached_len < aligned:
+                cache.insert(ids[:aligned], past, _past_nbytes(past))
+                # generate() extends the cache in place, so hand it a private copy
+                # (on a full hit past is already the copy made from the cached value).
+                past = copy.deepcopy(past)
+            past = _for_model(model, past)
+
+        with torch.no_grad():
+            output_ids = model.generate(
+                **inputs,
+                past_key_values=past,
+                max_new_tokens=self.max_new_tokens,
+                pad_token_id=tokenizer.eos_token_id,
+            )
+        return [{"generated_text": tokenizer.decode(output_ids[0], skip_special_tokens=True)}]
+
+    def _format_local_output(self, pipeline: str, output: Any) -> Dict[str, Any]:
+        """Format raw pipeline output into the HFClient response shape."""
+        if pipeline == "image-classification":
+            return self._format_image_output(output)
+        if pipeline == "text-classification":
+            return self._success(ClassificationResult.from_predictions(output))
+        if isinstance(output, list) and output and isinstance(output[0], dict):
+            output = [output[0].get("generated_text", output[0])]
+        return self._format_text_output(output)
+
+    @profiled
+    @log_call
+    def query(self, model_id: str, input_data: Any, pipeline: str,
+              preprocessing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run a model locally and return a structured response.
+
+        Args:
+            model_id: The ID of the model to use
+            input_data: The input text or image path
+            pipeline: The type of pipeline to use (e.g., "text-classification", "image-classification")
+            preprocessing: Accepted for HFClient parity; local models use their own processor
+
+        Returns:
+            Dict containing the response with proper formatting
+        """
+        if self.mock_mode:
+            return {
+                "status": "success",
+                "data": {
+                    "model": model_id,
+                    "predictions": [
+                        {"label": "MOCK_LABEL", "score": 0.95},
+                        {"label": "MOCK_LABEL_2", "score": 0.05}
+                    ],
+                    "top_prediction": "MOCK_LABEL",
+                    "confidence": 0.95
+                }
+            }
+
+        try:
+            if pipeline == "text-classification" and isinstance(input_data, str):
+                return self._classify_texts(model_id, [input_data], None)[0]
+            output = self._run_pipeline(model_id, input_data, pipeline)
+            return self._format_local_output(pipeline, output)
+        except Exception as e:
+            logger.error("Local inference failed: %s", e)
+            return {
+                "status": "error",
+                "message": f"Local inference failed: {str(e)}"
+            }
+
+    @log_call
+    def generate_batch(self, model_id: str, prompts: List[str],
+                       max_new_tokens: Union[int, List[int]] = None,
+                       stop: Union[List[str], List[List[str]]] = None) -> List[Dict[str, Any]]:
+        """Generate continuations for several prompts in one batched pass.
+
+        Prompts are left-padded with an attention mask and decoded together.
+        Each sequence stops on its own once it reaches its max_new_tokens or
+        produces one of its stop sequences; the batch ends when all have stopped.
+
+        Args:
+            model_id: The ID of the text-generation model to use
+            prompts: Prompts to continue
+            max_new_tokens: One limit for all prompts or one per prompt
+            stop: Stop sequences shared by all prompts or one list per prompt
+
+        Returns:
+            One structured response per prompt, in input order
+        """
+        if self.mock_mode:
+            return [
+                {"status": "success", "data": {"output": f"[Mock Response] {p}"}}
+                for p in prompts
+            ]
+        if not prompts:
+            return []
+
+        limits = max_new_tokens if max_new_tokens is not None else self.max_new_tokens
+        if isinstance(limits, int):
+            limits = [limits] * len(prompts)
+        stops = stop or []
+        if not stops or isinstance(stops[0], str):
+            stops = [list(stops)] * len(prompts)
+
+        try:
+            texts = self._generate_batch(model_id, prompts, limits, stops)
+        except Exception as e:
+            logger.error("Local batch generation failed: %s", e)
+            error = {
+                "status": "error",
+                "message": f"Local batch generation failed: {str(e)}"
+            }
+            return [dict(error) for _ in prompts]
+        return [self._format_text_output([text]) for text in texts]
+
+    def _generate_batch(self, model_id: str, prompts: List[str],
+                        limits: List[int], stops: List[List[str]]) -> List[str]:
+        """Run left-padded batched generation and return the full texts."""
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        pipe = self.load(model_id, "text-generation")
+        model, tokenizer = pipe.model, pipe.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"
+
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+        prompt_len = inputs["input_ids"].shape[1]
+        limit_tensor = torch.tensor(limits, device=model.device)
+
+        class _PerSequenceStop(StoppingCriteria):
+            """Marks each row done at its own token limit or stop sequence."""
+
+            def __call__(self, input_ids, scores, **kwargs):
+                generated = input_ids.shape[1] - prompt_len
+                done = generated >= limit_tensor
+                for row, row_stops in enumerate(stops):
+                    if row_stops and not done[row]:
+                        tail = tokenizer.decode(input_ids[row, prompt_len:],
+                                                skip_special_tokens=True)
+                        done[row] = _stop_index(tail, row_stops) >= 0
+                return done
+
+        with torch.no_grad():
+            output_ids = model.generate(
+                **inputs,
+                max_new_tokens=max(limits),
+                pad_token_id=tokenizer.pad_token_id,
+                stopping_criteria=StoppingCriteriaList([_PerSequenceStop()]),
+            )
+
+        texts = []
+        for row, prompt in enumerate(prompts):
+            new_ids = output_ids[row, prompt_len:prompt_len + limits[row]]
+            completion = tokenizer.decode(new_ids, skip_special_tokens=True)
+            cut = _stop_index(completion, stops[row])
+            if cut >= 0:
+                completion = completion[:cut]
+            texts.append(prompt + completion)
+        return texts
+
+    def classify_images(self, model_id: str, image_paths: List[str],
+                        top_k: int = 5) -> List[Dict[str, Any]]:
+        """Classify image files without any JPEG or base64 round trip.
+
+        Each file is decoded once, straight to a NumPy array at the model
+        input resolution. The normalized arrays are stacked into one batch
+        that is handed to the model as a tensor sharing the same memory.
+        Every response carries per-stage timings in milliseconds under
+        "timings" (decode and preprocess are per image, the rest per batch).
+
+        Args:
+            model_id: The ID of the image-classification model to use
+            image_paths: Paths of the images to classify
+            top_k: Number of predictions to return per image
+
+        Returns:
+            One structured response per image, in input order
+        """
+        if self.mock_mode:
+            return [self.query(model_id, path, "image-classification") for path in image_paths]
+        if not image_paths:
+            return []
+        try:
+            return self._classify_images(model_id, image_paths, top_k)
+        except Exception as e:
+            logger.error("Local image classification failed: %s", e)
+            return [{
+                "status": "error",
+                "message": f"Local image classification failed: {str(e)}"
+            } for _ in image_paths]
+
+    def _classify_images(self, model_id: str, image_paths: List[str],
+                         top_k: int) -> List[Dict[str, Any]]:
+        """Decode, normalize and classify a batch of images."""
+        import numpy as np
+        import torch
+        from utils.image_io import decode_to_array, image_geometry, image_resample
+
+        pipe = self.load(model_id, "image-classification")
+        model, processor = pipe.model, pipe.image_processor
+        resize_short, (height, width) = image_geometry(processor)
+        resample = image_resample(processor)
+        scale = np.float32(getattr(processor, "rescale_factor", 1 / 255))
+        mean = np.asarray(getattr(processor, "image_mean", [0.0, 0.0, 0.0]), dtype=np.float32)
+        std = np.asarray(getattr(processor, "image_std", [1.0, 1.0, 1.0]), dtype=np.float32)
+
+        batch = np.empty((len(image_paths), 3, height, width), dtype=np.float32)
+        decode_ms = []
+        preprocess_ms = []
+        with track_memory("LocalClient.image_preprocess"):
+            for i, path in enumerate(image_paths):
+                start = time.perf_counter()
+                pixels = decode_to_array(path, resize_short, (height, width), resample)
+                decoded = time.perf_counter()
+                # HWC uint8 -> normalized CHW float32, written straight into the batch
+                np.multiply(pixels.transpose(2, 0, 1), scale, out=batch[i], casting="unsafe")
+                batch[i] -= mean[:, None, None]
+                batch[i] /= std[:, None, None]
+                decode_ms.append((decoded - start) * 1000)
+                preprocess_ms.append((time.perf_counter() - decoded) * 1000)
+
+        start = time.perf_counter()
+        pixel_values = torch.from_numpy(batch).to(model.device)
+        with torch.no_grad():
+            logits = model(pixel_values=pixel_values).logits
+        inferred = time.perf_counter()
+        results = classify_logits(logits.float().cpu().numpy(), model.config.id2label, top_k,
+                                  result_type=ImageClassificationResult)
+        responses = [self._success(result) for result in results]
+        done = time.perf_counter()
+
+        for i, response in enumerate(responses):
+            response["timings"] = {
+                "decode_ms": decode_ms[i],
+                "preprocess_ms": preprocess_ms[i],
+                "inference_ms": (inferred - start) * 1000,
+                "postprocess_ms": (done - inferred) * 1000,
+                "batch_size": len(image_paths),
+            }
+        return responses
+
+    def classify_texts(self, model_id: str, texts: List[str],
+                       top_k: int = None) -> List[Dict[str, Any]]:
+        """Classify several texts in one padded forward pass.
+
+        Logits for the whole batch go through classify_logits, so softmax,
+        top-k and label lookup run once per batch instead of per text.
+
+        Args:
+            model_id: The ID of the text-classification model to use
+            texts: Texts to classify
+            top_k: Number of predictions per text (None keeps all labels)
+
+        Returns:
+            One structured response per text, in input order
+        """
+        if self.mock_mode:
+            return [self.query(model_id, text, "text-classification") for text in texts]
+        if not texts:
+            return []
+        try:
+            return self._classify_texts(model_id, texts, top_k)
+        except Exception as e:
+            logger.error("Local text classification failed: %s", e)
+            return [{
+                "status": "error",
+                "message": f"Local text classification failed: {str(e)}"
+            } for _ in texts]
+
+    def _classify_texts(self, model_id: str, texts: List[str],
+                        top_k: Optional[int]) -> List[Dict[str, Any]]:
+        """Tokenize, run and post-process a batch of texts."""
+        import torch
+
+        pipe = self.load(model_id, "text-classification")
+        model, tokenizer = pipe.model, pipe.tokenizer
+        inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(model.device)
+        with torch.no_grad():
+            logits = model(**inputs).logits
+        # Same activation choice as the transformers text-classification pipeline
+        config = model.config
+        multi_label = config.problem_type == "multi_label_classification" or config.num_labels == 1
+        results = classify_logits(logits.float().cpu().numpy(), config.id2label, top_k,
+                                  activation="sigmoid" if multi_label else "softmax")
+        return [self._success(result) for result in results]
+
+    def embed(self, model_id: str, texts: List[str],
+              pipeline: str = "text-classification") -> Any:
+        """Embed texts with the encoder of a local model.
+
+        Uses the attention-mask weighted mean of the base model's last hidden
+        state (for the sentiment model, the distilbert encoder).
+
+        Args:
+            model_id: The ID of the model whose encoder is used
+            texts: Texts to embed
+            pipeline: Task the model is loaded for
+
+        Returns:
+            float32 array of shape (len(texts), hidden_size)
+        """
+        import torch
+
+        pipe = self.load(model_id, pipeline)
+        model, tokenizer = pipe.model, pipe.tokenizer
+        inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(model.device)
+        inputs.pop("token_type_ids", None)
+        with torch.no_grad():
+            hidden = model.base_model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return pooled.cpu().numpy().astype("float32")
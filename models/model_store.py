@@ -0,0 +1,227 @@
+"""
+Local model store for offline, memory-mapped model loading
+
+The store is a project-managed directory holding one safetensors snapshot per
+model (weights, config and tokenizer/image processor files). Once populated it
+works fully offline. Weights are memory-mapped copy-on-write and assigned to
+the model directly, so loading does not copy every tensor into RAM: pages are
+read from disk only when touched and shared with other processes mapping the
+same file.
+
+Usage:
+    python -m models.model_store populate gpt2 text-generation
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = os.getenv(
+    "HF_MODEL_STORE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_store")
+)
+
+# transformers Auto classes used for each pipeline task
+_AUTO_CLASSES = {
+    "text-classification": "AutoModelForSequenceClassification",
+    "image-classification": "AutoModelForImageClassification",
+    "text-generation": "AutoModelForCausalLM",
+}
+
+# safetensors dtype names mapped to torch dtype attribute names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8",
+    "U8": "uint8", "BOOL": "bool",
+}
+
+
+def mmap_safetensors(path: str, keep_alive: List[Any] = None) -> Dict[str, Any]:
+    """
+    Memory-map a safetensors file and return zero-copy torch tensors.
+
+    The file is mapped copy-on-write, so tensors are writable without ever
+    modifying the file on disk.
+
+    Args:
+        path: Path to a .safetensors file
+        keep_alive: Optional list that receives the mmap object
+
+    Returns:
+        Dict of tensor name to torch tensor backed by the mapping
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if keep_alive is not None:
+        keep_alive.append(mapping)
+
+    header.pop("__metadata__", None)
+    data_start = 8 + header_len
+    tensors = {}
+    for name, info in header.items():
+        dtype = getattr(torch, _DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        flat = torch.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + start)
+        tensors[name] = flat.view(info["shape"])
+    return tensors
+
+
+class ModelStore:
+    """
+    Project-managed directory of safetensors model snapshots.
+
+    Attributes:
+        root: Directory holding one sub-directory per model
+    """
+
+    def __init__(self, root: str = None):
+        """
+        Initialize the model store.
+
+        Args:
+            root: Store directory (default: $HF_MODEL_STORE or ./model_store)
+        """
+        self.root = root or DEFAULT_STORE
+        self._mappings: List[Any] = []
+
+    def path_for(self, model_id: str) -> str:
+        """Return the store directory used for a model."""
+        return os.path.join(self.root, model_id.replace("/", "--"))
+
+    def has(self, model_id: str) -> bool:
+        """Return True if the model has been saved to the store."""
+        path = self.path_for(model_id)
+        return os.path.isfile(os.path.join(path, "config.json")) and bool(self._weight_files(path))
+
+    def _weight_files(self, path: str) -> List[str]:
+        """Return the safetensors weight files in a store directory."""
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(".safetensors")
+        )
+
+    def populate(self, model_id: str, pipeline: str, token: str = None) -> str:
+        """
+        Download a model (network required) and save it to the store.
+
+        Args:
+            model_id: The ID of the model to save
+            pipeline: The transformers task the model is used for
+            token: Optional Hugging Face token
+
+        Returns:
+            The store directory of the model
+        """
+        from transformers import pipeline as hf_pipeline
+
+        path = self.path_for(model_id)
+        logger.info("Saving %s to model store at %s", model_id, path)
+        pipe = hf_pipeline(pipeline, model=model_id, token=token)
+        pipe.model.save_pretrained(path, safe_serialization=True)
+        for component in ("tokenizer", "image_processor", "feature_extractor"):
+            part = getattr(pipe, component, None)
+            if part is not None:
+                part.save_pretrained(path)
+        return path
+
+    def load_model(self, model_id: str, pipeline: str) -> Any:
+        """
+        Build a model from the store with memory-mapped weights.
+
+        The module is created without running weight initialization and the
+        mapped tensors are then assigned in place of its parameters.
+
+        Args:
+            model_id: The ID of the model to load
+            pipeline: The transformers task the model is used for
+
+        Returns:
+            The model in eval mode
+
+        Raises:
+            FileNotFoundError: If the model is not in the store
+            ValueError: If the stored weights lack parameters the model needs
+        """
+        import transformers
+        from transformers.modeling_utils import no_init_weights
+
+        path = self.path_for(model_id)
+        if not self.has(model_id):
+            raise FileNotFoundError(f"Model {model_id} is not in the model store: {path}")
+
+        config = transformers.AutoConfig.from_pretrained(path, local_files_only=True)
+        auto_class = getattr(transformers, _AUTO_CLASSES[pipeline])
+        with no_init_weights():
+            model = auto_class.from_config(config)
+
+        state_dict: Dict[str, Any] = {}
+        for weights in self._weight_files(path):
+            state_dict.update(mmap_safetensors(weights, self._mappings))
+        missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+        model.tie_weights()
+        if unexpected:
+            logger.warning("Unexpected weights in store for %s: %s", model_id, unexpected[:5])
+
+        # Tied weights now share a loaded tensor and some buffers are known to be
+        # absent from checkpoints; anything else would be left uninitialized.
+        loaded = {tensor.data_ptr() for tensor in state_dict.values()}
+        current = model.state_dict()
+        ignored = getattr(model, "_keys_to_ignore_on_load_missing", None) or []
+        uninitialized = [
+            name for name in missing
+            if current[name].data_ptr() not in loaded
+            and not any(re.search(pattern, name) for pattern in ignored)
+        ]
+        if uninitialized:
+            raise ValueError(f"Model store copy of {model_id} lacks {len(uninitialized)} weights "
+                             f"(e.g. {uninitialized[:5]}); populate it again: {path}")
+        if missing:
+            logger.debug("Weights not in store for %s (tied or buffers): %s", model_id, missing[:5])
+        return model.eval()
+
+    def load_pipeline(self, model_id: str, pipeline: str, device: int = -1) -> Any:
+        """
+        Build a transformers pipeline entirely from the store (offline).
+
+        Args:
+            model_id: The ID of the model to load
+            pipeline: The transformers task name
+            device: Torch device index, -1 for CPU
+
+        Returns:
+            The transformers pipeline object
+        """
+        from transformers import pipeline as hf_pipeline
+
+        path = self.path_for(model_id)
+        model = self.load_model(model_id, pipeline)
+        extra = {}
+        if pipeline == "image-classification":
+            extra["image_processor"] = path
+        else:
+            extra["tokenizer"] = path
+        return hf_pipeline(pipeline, model=model, device=device, **extra)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "populate":
+        print("Usage: python -m models.model_store populate <model_id> <pipeline>")
+        sys.exit(1)
+    print(ModelStore().populate(sys.argv[2], sys.argv[3]))
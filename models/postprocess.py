@@ -0,0 +1,82 @@
+"""
+Vectorized post-processing of classification logits
+
+Turns the logits matrix of a whole batch into ClassificationResult objects
+with one NumPy pass: softmax (or sigmoid for multi-label heads), top-k via
+argpartition, and a single fancy-index lookup of the label names. Only the
+final tuple conversion runs per row.
+"""
+
+from typing import Any, List, Mapping, Optional, Tuple, Type
+
+import numpy as np
+
+from models.results import ClassificationResult
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Numerically stable softmax over the last axis."""
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    np.exp(shifted, out=shifted)
+    shifted /= shifted.sum(axis=-1, keepdims=True)
+    return shifted
+
+
+def sigmoid(logits: np.ndarray) -> np.ndarray:
+    """Element-wise logistic function."""
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def top_k(probs: np.ndarray, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores of every row, sorted in descending order.
+
+    Uses argpartition so only the k selected columns are sorted.
+
+    Args:
+        probs: (batch, classes) score matrix
+        k: Number of scores to keep per row (None keeps all)
+
+    Returns:
+        (indices, scores), both of shape (batch, k)
+    """
+    classes = probs.shape[-1]
+    if k is None or k >= classes:
+        indices = np.argsort(-probs, axis=-1)
+    else:
+        indices = np.argpartition(-probs, k - 1, axis=-1)[:, :k]
+        order = np.argsort(-np.take_along_axis(probs, indices, axis=-1), axis=-1)
+        indices = np.take_along_axis(indices, order, axis=-1)
+    return indices, np.take_along_axis(probs, indices, axis=-1)
+
+
+def label_array(id2label: Mapping[int, str], classes: int) -> np.ndarray:
+    """Label names as an object array indexed by class id."""
+    return np.array([id2label.get(i, f"LABEL_{i}") for i in range(classes)], dtype=object)
+
+
+def classify_logits(logits: Any, id2label: Mapping[int, str], k: Optional[int] = None,
+                    activation: str = "softmax",
+                    result_type: Type[ClassificationResult] = ClassificationResult
+                    ) -> List[ClassificationResult]:
+    """
+    Convert a batch of logits into classification results.
+
+    Args:
+        logits: (batch, classes) array-like of raw model outputs
+        id2label: Class id to label name mapping (model.config.id2label)
+        k: Number of predictions per row (None keeps all)
+        activation: "softmax" for single-label heads, "sigmoid" for multi-label ones
+        result_type: ClassificationResult subclass to build
+
+    Returns:
+        One result per row, in batch order
+    """
+    logits = np.asarray(logits, dtype=np.float32)
+    if logits.ndim == 1:
+        logits = logits[None, :]
+    probs = sigmoid(logits) if activation == "sigmoid" else softmax(logits)
+    indices, scores = top_k(probs, k)
+    labels = label_array(id2label, probs.shape[-1])[indices]
+    return [result_type(tuple(row_labels), tuple(row_scores))
+            for row_labels, row_scores in zip(labels.tolist(), scores.tolist())]
@@ -0,0 +1,149 @@
+"""
+Prompt-prefix cache for local text generation
+
+Stores attention key/value caches for prompt prefixes so that generation
+requests sharing a long prefix (e.g. a system prompt) only run the model over
+their own suffix. Prefixes are indexed block by block with chained hashes of
+the token ids, so a cached prompt also serves every shorter prompt that shares
+one of its block boundaries. Entries are evicted least-recently-used once the
+configured memory budget is exceeded.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixCache:
+    """
+    LRU cache of past key/values keyed by token-id prefixes.
+
+    The cache itself is framework-agnostic: values are opaque objects (for
+    GPT-2 a transformers DynamicCache) and the caller reports their size.
+
+    Attributes:
+        max_bytes: Memory budget for all cached values
+        block_size: Prefix granularity in tokens
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, block_size: int = 16):
+        """
+        Initialize the prefix cache.
+
+        Args:
+            max_bytes: Maximum total size of cached values (default: 256 MiB)
+            block_size: Number of tokens per indexed block (default: 16)
+        """
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self._entries: "OrderedDict[int, Tuple[Tuple[int, ...], Any, int, List[int]]]" = OrderedDict()
+        # block hash -> keys of the entries covering that block, oldest insert first
+        self._index: Dict[int, Dict[int, None]] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def block_hashes(self, token_ids: Sequence[int]) -> List[int]:
+        """Return the chained hash of every full block prefix of token_ids."""
+        hashes = []
+        h = 0
+        for start in range(0, len(token_ids) - self.block_size + 1, self.block_size):
+            h = hash((h, tuple(token_ids[start:start + self.block_size])))
+            hashes.append(h)
+        return hashes
+
+    def lookup(self, token_ids: Sequence[int], max_tokens: int = None) -> Tuple[int, Optional[Any]]:
+        """
+        Find the longest cached prefix of token_ids.
+
+        Args:
+            token_ids: Prompt token ids
+            max_tokens: Only consider prefixes up to this many tokens
+
+        Returns:
+            (prefix_length, value). The value may cover more tokens than
+            prefix_length and must be cropped by the caller. (0, None) on a miss.
+        """
+        limit = len(token_ids) if max_tokens is None else min(max_tokens, len(token_ids))
+        hashes = self.block_hashes(token_ids[:limit])
+        prefix = tuple(token_ids[:limit])
+        with self._lock:
+            for blocks in range(len(hashes), 0, -1):
+                owners = self._index.get(hashes[blocks - 1])
+                if not owners:
+                    continue
+                key = next(reversed(owners))
+                length = blocks * self.block_size
+                entry_ids, value, _, _ = self._entries[key]
+                if entry_ids[:length] != prefix[:length]:
+                    continue  # hash collision
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return length, value
+            self._misses += 1
+        return 0, None
+
+    def insert(self, token_ids: Sequence[int], value: Any, nbytes: int) -> bool:
+        """
+        Cache a value covering token_ids (whose length should be block aligned).
+
+        Args:
+            token_ids: Prefix token ids the value was computed for
+            value: The past key/values object
+            nbytes: Memory used by value
+
+        Returns:
+            True if stored, False if the value is larger than the whole budget
+        """
+        if nbytes > self.max_bytes:
+            return False
+        hashes = self.block_hashes(token_ids)
+        if not hashes:
+            return False
+        key = hashes[-1]
+        ids = tuple(token_ids[:len(hashes) * self.block_size])
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True
+            self._entries[key] = (ids, value, nbytes, hashes)
+            self._bytes += nbytes
+            for h in hashes:
+                self._index.setdefault(h, {})[key] = None
+            while self._bytes > self.max_bytes and self._entries:
+                self._evict_oldest()
+        return True
+
+    def _evict_oldest(self) -> None:
+        """Drop the least recently used entry (caller holds the lock)."""
+        key, (_, _, nbytes, hashes) = self._entries.popitem(last=False)
+        self._bytes -= nbytes
+        for h in hashes:
+            # Entries still covering the block keep it indexed
+            owners = self._index[h]
+            del owners[key]
+            if not owners:
+                del self._index[h]
+        logger.debug("Evicted prefix cache entry of %d bytes", nbytes)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
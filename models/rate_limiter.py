@@ -0,0 +1,322 @@
+"""
+Client-side rate limiting for the hosted Inference API
+
+The Inference API limits requests per token. Instead of firing requests
+until they come back as 429 errors, HFClient takes a token from a bucket
+before each request and waits for one when the bucket is empty.
+
+- Callers are served in arrival order: each acquire reserves the next slot
+  (the bucket may go into debt) and sleeps until its slot comes up, so the
+  request rate is paced evenly instead of bursting and then blocking.
+- The rate adapts: a 429 cuts it multiplicatively and pauses the bucket for
+  Retry-After. Successes then bring it back quickly to just under the rate
+  that was throttled, and only probe above that slowly (up to max_rate), so
+  throughput holds near the limit instead of see-sawing. Quota headers
+  (X-RateLimit-Remaining / -Reset) set the rate directly.
+- A pause (Retry-After, or an exhausted quota) also moves back callers that
+  are already sleeping: on waking they recompute their slot from the end
+  of the pause, keeping their place in the queue.
+- Waits never run past the caller's deadline (utils.deadline).
+
+A RateLimiter holds one bucket for its API key plus optional per-model
+buckets; share one RateLimiter between all clients that use the same key.
+"""
+
+import email.utils
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Mapping, Optional
+
+from utils.deadline import DeadlineExceeded, remaining
+
+logger = logging.getLogger(__name__)
+
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    """Return the first of the named headers that parses as a number."""
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Parse Retry-After (seconds or an HTTP date) into seconds from now."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Adaptive token bucket with FIFO waiting.
+
+    Attributes:
+        name: Name used in logs and metrics
+        rate: Current refill rate in requests per second
+        burst: Bucket capacity (requests allowed back to back)
+        min_rate: Lower bound for the adaptive rate
+        max_rate: Upper bound for the adaptive rate
+        decrease: Factor the rate is multiplied by on a 429
+        increase: Requests/s added per second's worth of successful requests when probing
+        recovery: Fraction of the gap to the last throttled rate closed per second
+    """
+
+    def __init__(self, rate: float, burst: float = None, *, name: str = "bucket",
+                 min_rate: float = None, max_rate: float = None,
+                 decrease: float = 0.8, increase: float = 0.5, recovery: float = 1.0):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Initial refill rate in requests per second
+            burst: Bucket capacity (default: one second of requests, at least 1)
+            name: Name used in logs and metrics
+            min_rate: Lower bound for the adaptive rate (default: rate / 20)
+            max_rate: Upper bound for the adaptive rate (default: rate)
+            decrease: Factor the rate is multiplied by on a 429
+            increase: Requests/s added per second's worth of successful requests when probing
+            recovery: Fraction of the gap to the last throttled rate closed per second
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.decrease = decrease
+        self.increase = increase
+        self.recovery = recovery
+        self._ceiling: Optional[float] = None  # rate at the last 429
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._waits: deque = deque(maxlen=1000)
+        # (start, end, rate before, rate after) of the latest pause, counted by _pauses
+        self._pause: Optional[tuple] = None
+        self._pauses = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accrued since the last refill (caller holds the lock)."""
+        if now > self._last:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def _pause_until(self, now: float, until: float, rate_before: float) -> None:
+        """Stop refilling until a time; callers already sleeping catch up on waking (caller holds the lock)."""
+        # Nothing accrues during the pause; queued callers keep their order.
+        self._tokens = min(self._tokens, 0.0)
+        self._last = max(self._last, until)
+        self._pause = (now, self._last, rate_before, self.rate)
+        self._pauses += 1
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting for it in arrival order.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            DeadlineExceeded: If the token would only be available after the deadline
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            debt = max(0.0, -self._tokens)
+            wait = max(0.0, self._last + debt / self.rate - now)
+            left = remaining()
+            if left is not None and wait > left:
+                self._tokens += 1
+                raise DeadlineExceeded(f"Rate limit {self.name}: next slot in {wait:.2f}s")
+            self.acquired += 1
+            if wait <= 0:
+                self._waits.append(0.0)
+                return 0.0
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            slot, pauses = now + wait, self._pauses
+        try:
+            while True:
+                time.sleep(max(0.0, wait))
+                with self._lock:
+                    if self._pauses == pauses:
+                        break
+                    # Paused while we slept: our slot moves to the same place behind the pause
+                    pauses = self._pauses
+                    start, end, rate_before, rate_after = self._pause
+                    slot = end + max(0.0, slot - start) * rate_before / rate_after
+                    wait = slot - time.monotonic()
+                    left = remaining()
+                    if left is not None and wait > left:
+                        self._tokens += 1
+                        raise DeadlineExceeded(f"Rate limit {self.name}: paused, next slot in {wait:.2f}s")
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+        waited = time.monotonic() - now
+        self._waits.append(waited)
+        return waited
+
+    def release(self) -> None:
+        """Give back a token taken by acquire() for a request that is not sent."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self.acquired -= 1
+
+    def on_success(self) -> None:
+        """Raise the rate after a successful request (one call per request)."""
+        with self._lock:
+            target = 0.98 * self._ceiling if self._ceiling else None
+            if target and self.rate < target:
+                # Close the gap to just under the throttled rate within about a second
+                step = (target - self.rate) * min(1.0, self.recovery / self.rate)
+            else:
+                step = self.increase / self.rate
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def on_throttled(self, retry_after: Optional[float]) -> None:
+        """Multiplicative decrease after a 429, pausing for Retry-After if given."""
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            self._refill(now)
+            self._ceiling = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after:
+                self._pause_until(now, now + retry_after, self._ceiling)
+            if retry_after:
+                logger.warning("Rate limited on %s: rate now %.2f/s, paused %.1fs",
+                               self.name, self.rate, retry_after)
+            else:
+                logger.warning("Rate limited on %s: rate now %.2f/s", self.name, self.rate)
+
+    def on_quota(self, remaining_requests: float, reset_seconds: float) -> None:
+        """Pace the rest of the quota window evenly from rate-limit headers."""
+        with self._lock:
+            if reset_seconds <= 0:
+                return
+            if remaining_requests <= 0:
+                now = time.monotonic()
+                self._pause_until(now, now + reset_seconds, self.rate)
+                return
+            # Stay slightly under the quota so the window never runs dry
+            target = 0.95 * remaining_requests / reset_seconds
+            self.rate = max(self.min_rate, min(self.max_rate, target))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return rate, queue and wait-time metrics."""
+        waits = sorted(self._waits)
+        return {
+            "name": self.name,
+            "rate": self.rate,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "mean_wait_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait_ms": 1000 * waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+        }
+
+
+class RateLimiter:
+    """
+    Token buckets for one API key and, optionally, for individual models.
+
+    Usage:
+        limiter = RateLimiter(rate=5, model_rates={"gpt2": 2})
+        client = HFClient(rate_limiter=limiter)
+
+    Attributes:
+        key_bucket: Bucket shared by every request made with the key
+        model_buckets: Buckets of models with their own limit
+    """
+
+    def __init__(self, rate: float = 5.0, burst: float = None,
+                 model_rates: Dict[str, float] = None, **bucket_options: Any):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Requests per second allowed for the API key
+            burst: Bucket capacity of the key bucket
+            model_rates: Requests per second for individual models
+            **bucket_options: Extra TokenBucket options (min_rate, max_rate, decrease, increase, recovery)
+        """
+        self.key_bucket = TokenBucket(rate, burst, name="api-key", **bucket_options)
+        self.model_buckets: Dict[str, TokenBucket] = {
+            model_id: TokenBucket(model_rate, name=model_id, **bucket_options)
+            for model_id, model_rate in (model_rates or {}).items()
+        }
+
+    def _buckets(self, model_id: str):
+        model_bucket = self.model_buckets.get(model_id)
+        return (self.key_bucket,) if model_bucket is None else (model_bucket, self.key_bucket)
+
+    def acquire(self, model_id: str) -> float:
+        """
+        Wait for permission to send one request to a model.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            DeadlineExceeded: If the wait would run past the caller's deadline
+        """
+        waited = 0.0
+        taken = []
+        try:
+            for bucket in self._buckets(model_id):
+                waited += bucket.acquire()
+                taken.append(bucket)
+        except DeadlineExceeded:
+            # The request is not sent, so the tokens already taken go back
+            for bucket in taken:
+                bucket.release()
+            raise
+        return waited
+
+    def update(self, model_id: str, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adapt the rates from a response's status code and rate-limit headers."""
+        buckets = self._buckets(model_id)
+        if status_code == 429:
+            retry_after = retry_after_seconds(headers)
+            for bucket in buckets:
+                bucket.on_throttled(retry_after)
+            return
+        left = _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining")
+        reset = _header(headers, "X-RateLimit-Reset", "RateLimit-Reset")
+        if left is not None and reset is not None:
+            if reset > 1e9:  # epoch timestamp rather than seconds
+                reset -= time.time()
+            # Quota headers describe the key's limit
+            self.key_bucket.on_quota(left, reset)
+        elif status_code < 400:
+            for bucket in buckets:
+                bucket.on_success()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the metrics of every bucket keyed by bucket name."""
+        buckets = [self.key_bucket, *self.model_buckets.values()]
+        return {bucket.name: bucket.stats() for bucket in buckets}
@@ -0,0 +1,173 @@
+"""
+Compact result types for model responses
+
+Slotted classes holding model outputs as flat tuples instead of nested
+dicts. Derived views (prediction dicts, the "label (score%)" strings) are
+only built when asked for, and to_dict() returns the original dict layout
+so existing callers keep working.
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class ClassificationResult:
+    """
+    Top-k labels and scores of a classification, sorted by descending score.
+
+    Attributes:
+        labels: Tuple of labels
+        scores: Tuple of scores matching labels
+    """
+
+    __slots__ = ("labels", "scores")
+
+    def __init__(self, labels: Tuple[str, ...], scores: Tuple[float, ...]):
+        self.labels = labels
+        self.scores = scores
+
+    @classmethod
+    def from_predictions(cls, predictions: Iterable[Dict[str, Any]],
+                         k: Optional[int] = None) -> "ClassificationResult":
+        """
+        Build a result from [{"label": ..., "score": ...}, ...].
+
+        Uses a heap to select the top k without sorting the full list.
+
+        Args:
+            predictions: Prediction dicts in any order
+            k: Number of predictions to keep (None keeps all)
+        """
+        key = lambda p: p.get('score', 0)
+        if k is None:
+            top = sorted(predictions, key=key, reverse=True)
+        else:
+            top = heapq.nlargest(k, predictions, key=key)
+        if not top:
+            raise ValueError("No predictions returned")
+        return cls(tuple(p['label'] for p in top), tuple(p['score'] for p in top))
+
+    @property
+    def top_prediction(self) -> str:
+        return self.labels[0]
+
+    @property
+    def confidence(self) -> float:
+        return self.scores[0]
+
+    @property
+    def predictions(self) -> List[Dict[str, Any]]:
+        return [{"label": label, "score": score} for label, score in zip(self.labels, self.scores)]
+
+    @property
+    def all_predictions(self) -> List[str]:
+        return [f"{label} ({score:.2%})" for label, score in zip(self.labels, self.scores)]
+
+    def to_dict(self, include_all: bool = False) -> Dict[str, Any]:
+        """
+        Return the dict layout used by HFClient responses.
+
+        Args:
+            include_all: Also include the formatted all_predictions strings
+        """
+        data = {
+            "predictions": self.predictions,
+            "top_prediction": self.top_prediction,
+            "confidence": self.confidence,
+        }
+        if include_all:
+            data["all_predictions"] = self.all_predictions
+        return data
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __repr__(self) -> str:
+        return f"ClassificationResult(top={self.labels[:1]}, k={len(self.labels)})"
+
+
+class ImageClassificationResult(ClassificationResult):
+    """Classification result whose dict form includes the all_predictions strings."""
+
+    __slots__ = ()
+
+    def to_dict(self, include_all: bool = True) -> Dict[str, Any]:
+        return super().to_dict(include_all)
+
+
+class TextResult:
+    """Free-form text output (e.g. generated text)."""
+
+    __slots__ = ("output",)
+
+    def __init__(self, output: str):
+        self.output = output
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"output": self.output}
+
+    def __repr__(self) -> str:
+        return f"TextResult({self.output[:40]!r})"
+
+
+class ModelResponse:
+    """
+    Slotted response envelope that can stand in for the response dict.
+
+    Supports get(), [] and "in" for the keys "status", "data" and "message";
+    any other keys (e.g. "input_type" added by the models) are kept in a
+    small side dict that is only created when used.
+    """
+
+    __slots__ = ("status", "result", "message", "_extra")
+
+    def __init__(self, status: str, result: Any = None, message: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.message = message
+        self._extra: Optional[Dict[str, Any]] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "status":
+            return self.status
+        if key == "data":
+            return self.result.to_dict() if self.result is not None else default
+        if key == "message":
+            return self.message if self.message is not None else default
+        return self._extra.get(key, default) if self._extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "status":
+            self.status = value
+        elif key == "message":
+            self.message = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the plain response dict."""
+        response: Dict[str, Any] = {"status": self.status}
+        if self.result is not None:
+            response["data"] = self.result.to_dict()
+        if self.message is not None:
+            response["message"] = self.message
+        if self._extra:
+            response.update(self._extra)
+        return response
+
+    def __repr__(self) -> str:
+        return f"ModelResponse(status={self.status!r}, result={self.result!r})"
+
+
+_MISSING = object()
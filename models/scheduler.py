@@ -0,0 +1,284 @@
+"""
+Priority request scheduler for HIT137 Assignment 3
+
+RequestScheduler sits in front of an HFClient (or LocalClient) shared by the
+GUI and background jobs. Requests are queued by priority class and sent by a
+fixed number of dispatcher threads, which bounds the requests in flight.
+
+- Interactive requests are always dispatched before batch requests, so a
+  long batch run only uses the capacity the GUI leaves free. Some
+  dispatchers (one by default) only take interactive requests, so a click
+  is not stuck behind slow batch requests that already hold every slot.
+- Within a class, flows (tenant, model) share capacity by weighted fair
+  queuing (self-clocked virtual finish times), so one tenant or one model
+  with a deep backlog cannot starve the others.
+
+Priority and tenant are passed per call or set for a block of code with
+scheduling_scope(), which also reaches calls made inside the models. With
+codel_target_ms set, each class's queue sheds requests CoDel-style once its
+queueing delay stays above the target; shed calls return an "Overloaded"
+error dict.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models.admission import CoDel, overloaded_error
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+DEFAULT_TENANT = "default"
+
+# Flow finish times kept before idle flows are pruned (grows with the live flows)
+_PRUNE_AT = 64
+
+_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("priority", default=None)
+_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("tenant", default=None)
+
+
+@contextlib.contextmanager
+def scheduling_scope(priority: int = None, tenant: str = None) -> Iterator[None]:
+    """
+    Set the priority class and/or tenant of the requests made in a block.
+
+    Args:
+        priority: INTERACTIVE or BATCH (None keeps the enclosing value)
+        tenant: Tenant name used for fair sharing (None keeps the enclosing value)
+    """
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if tenant is not None:
+        tokens.append((_tenant, _tenant.set(tenant)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _Job:
+    """A queued call and its scheduling metadata."""
+
+    __slots__ = ("model_id", "func", "args", "kwargs", "context", "future", "priority", "enqueued")
+
+    def __init__(self, model_id, func, args, kwargs, context, priority):
+        self.model_id = model_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.context = context
+        self.future: Future = Future()
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+
+
+class RequestScheduler:
+    """
+    Priority and fair-share scheduler wrapping a client.
+
+    Usage:
+        scheduler = RequestScheduler(HFClient(), max_in_flight=4)
+        scheduler.query(model_id, text, "text-classification", priority=INTERACTIVE)
+
+    Attributes other than query/send_payload are read from the wrapped client.
+
+    Attributes:
+        client: The wrapped client
+        max_in_flight: Maximum number of requests running at once
+        interactive_reserve: Dispatchers that only run interactive requests
+    """
+
+    def __init__(self, client, *, max_in_flight: int = 4, interactive_reserve: int = 1,
+                 tenant_weights: Dict[str, float] = None,
+                 model_weights: Dict[str, float] = None,
+                 codel_target_ms: float = None, codel_interval_ms: float = 500.0):
+        """
+        Initialize the scheduler (dispatcher threads start on first use).
+
+        Args:
+            client: HFClient-compatible client to send requests through
+            max_in_flight: Maximum number of requests running at once
+            interactive_reserve: Dispatchers kept for interactive requests
+                (at most max_in_flight - 1, so batch work always has one)
+            tenant_weights: Relative share of each tenant (default 1)
+            model_weights: Relative share of each model (default 1)
+            codel_target_ms: Queueing delay target for load shedding (None disables shedding)
+            codel_interval_ms: CoDel interval in milliseconds
+        """
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.interactive_reserve = max(0, min(interactive_reserve, max_in_flight - 1))
+        self.tenant_weights = dict(tenant_weights or {})
+        self.model_weights = dict(model_weights or {})
+        self._queues: Dict[int, List[Tuple[float, int, _Job]]] = {INTERACTIVE: [], BATCH: []}
+        self._finish: Dict[Tuple[int, str, str], float] = {}
+        self._prune_at = _PRUNE_AT
+        self._virtual_time = {INTERACTIVE: 0.0, BATCH: 0.0}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self.in_flight = 0
+        self._dispatched = {INTERACTIVE: 0, BATCH: 0}
+        self._wait_total = {INTERACTIVE: 0.0, BATCH: 0.0}
+        self._codel: Optional[Dict[int, CoDel]] = None
+        if codel_target_ms is not None:
+            self._codel = {p: CoDel(codel_target_ms, codel_interval_ms) for p in PRIORITY_NAMES}
+        self._shed = {INTERACTIVE: 0, BATCH: 0}
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the scheduler itself
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _start(self) -> None:
+        """Start the dispatcher threads (caller holds the condition)."""
+        for i in range(self.max_in_flight):
+            priorities = (INTERACTIVE,) if i < self.interactive_reserve else (INTERACTIVE, BATCH)
+            thread = threading.Thread(target=self._dispatch, args=(priorities,),
+                                      name=f"scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, model_id: str, func, *args, priority: int = None,
+               tenant: str = None, **kwargs) -> Future:
+        """
+        Queue func(*args, **kwargs) as a request to model_id.
+
+        Args:
+            model_id: Model the request is for (part of the fairness flow)
+            func: Callable that sends the request
+            priority: INTERACTIVE or BATCH (default: scheduling_scope, else BATCH)
+            tenant: Tenant for fair sharing (default: scheduling_scope, else "default")
+
+        Returns:
+            Future resolved with func's return value
+        """
+        if priority is None:
+            priority = _priority.get()
+            if priority is None:
+                priority = BATCH
+        if tenant is None:
+            tenant = _tenant.get() or DEFAULT_TENANT
+        job = _Job(model_id, func, args, kwargs, contextvars.copy_context(), priority)
+        weight = self.tenant_weights.get(tenant, 1.0) * self.model_weights.get(model_id, 1.0)
+        flow = (priority, tenant, model_id)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            if not self._threads:
+                self._start()
+            # Weighted fair queuing: virtual finish time of this request in its flow
+            start = max(self._virtual_time[priority], self._finish.get(flow, 0.0))
+            finish = start + 1.0 / weight
+            self._finish[flow] = finish
+            heapq.heappush(self._queues[priority], (finish, next(self._seq), job))
+            if priority == BATCH and self.interactive_reserve:
+                # A reserved dispatcher woken for a batch job would go back to sleep with the wakeup
+                self._cond.notify_all()
+            else:
+                self._cond.notify()
+        return job.future
+
+    def _prune_flows(self) -> None:
+        """Forget flows with nothing queued past the virtual time (caller holds the condition)."""
+        # Such a flow's next request starts at the virtual time anyway
+        self._finish = {flow: finish for flow, finish in self._finish.items()
+                        if finish > self._virtual_time[flow[0]]}
+        self._prune_at = max(_PRUNE_AT, 2 * len(self._finish))
+
+    def _next_job(self, priorities: Tuple[int, ...]) -> Optional[_Job]:
+        """Pop the most urgent job of the given classes, waiting for one (None once closed)."""
+        with self._cond:
+            while True:
+                for priority in priorities:
+                    queue = self._queues[priority]
+                    while queue:
+                        finish, _, job = heapq.heappop(queue)
+                        self._virtual_time[priority] = max(self._virtual_time[priority], finish)
+                        if len(self._finish) > self._prune_at:
+                            self._prune_flows()
+                        sojourn = time.perf_counter() - job.enqueued
+                        if self._codel is not None and self._codel[priority].should_drop(sojourn):
+                            self._shed[priority] += 1
+                            if job.future.set_running_or_notify_cancel():
+                                job.future.set_result(overloaded_error(
+                                    job.model_id, f"{job.model_id} is overloaded: queued "
+                                                  f"{sojourn * 1000:.0f} ms, request shed"))
+                            continue
+                        self.in_flight += 1
+                        self._dispatched[priority] += 1
+                        self._wait_total[priority] += sojourn
+                        return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _dispatch(self, priorities: Tuple[int, ...]) -> None:
+        """Dispatcher loop: run jobs of the given classes one at a time until closed."""
+        while True:
+            job = self._next_job(priorities)
+            if job is None:
+                return
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.context.run(job.func, *job.args, **job.kwargs))
+                except BaseException as e:
+                    job.future.set_exception(e)
+            with self._cond:
+                self.in_flight -= 1
+
+    def _call(self, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Schedule a client method and wait for its result."""
+        priority = kwargs.pop("priority", None)
+        tenant = kwargs.pop("tenant", None)
+        model_id = kwargs.get("model_id", args[0] if args else None)
+        func = getattr(self.client, method)
+        return self.submit(model_id, func, *args, priority=priority, tenant=tenant, **kwargs).result()
+
+    def query(self, *args, **kwargs) -> Dict[str, Any]:
+        """client.query through the scheduler; accepts priority= and tenant=."""
+        return self._call("query", args, kwargs)
+
+    def send_payload(self, *args, **kwargs) -> Dict[str, Any]:
+        """client.send_payload through the scheduler; accepts priority= and tenant=."""
+        return self._call("send_payload", args, kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depths, requests in flight and mean queue wait per class."""
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                **{
+                    name: {
+                        "queued": len(self._queues[priority]),
+                        "dispatched": self._dispatched[priority],
+                        "shed": self._shed[priority],
+                        "mean_wait_ms": 1000 * self._wait_total[priority] / self._dispatched[priority]
+                        if self._dispatched[priority] else 0.0,
+                    }
+                    for priority, name in PRIORITY_NAMES.items()
+                },
+            }
+
+    def close(self) -> None:
+        """Stop the dispatcher threads once the queued requests are done."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,173 @@
+"""
+Semantic near-duplicate cache for text inputs
+
+Texts are normalized (Unicode, casing, whitespace, punctuation) and embedded
+with a local encoder. Embeddings live in one preallocated NumPy matrix and a
+lookup is a single matrix-vector product followed by an argmax (cosine top-1).
+Hits above the similarity threshold return the cached result without running
+the model. The least recently used entry is replaced once the cache is full.
+
+Embeddings put "the food was good" and "the food was not good" very close
+together, so a similar text is only a hit if it also passes a lexical check:
+the two texts must share most of their words and differ in no negation.
+"""
+
+import logging
+import re
+import string
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+_WHITESPACE = re.compile(r"\s+")
+
+# Words that flip a text's meaning (as left by normalize_text, apostrophes removed)
+_NEGATIONS = frozenset({
+    "no", "not", "never", "nor", "none", "nobody", "nothing", "neither", "nowhere", "without",
+    "cannot", "cant", "dont", "doesnt", "didnt", "isnt", "arent", "wasnt", "werent", "wont",
+    "wouldnt", "shouldnt", "couldnt", "hasnt", "havent", "hadnt", "aint", "hardly", "barely",
+})
+
+
+def normalize_text(text: str) -> str:
+    """Normalize Unicode, casing, punctuation and whitespace of a text."""
+    text = unicodedata.normalize("NFKC", text).lower().translate(_PUNCTUATION)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def lexically_close(a: str, b: str, min_overlap: float) -> bool:
+    """Return whether two normalized texts share enough words and differ in no negation."""
+    words_a, words_b = set(a.split()), set(b.split())
+    if (words_a ^ words_b) & _NEGATIONS:
+        return False
+    union = words_a | words_b
+    return not union or len(words_a & words_b) / len(union) >= min_overlap
+
+
+class SemanticCache:
+    """
+    Cosine-similarity cache of results keyed by text embeddings.
+
+    Attributes:
+        threshold: Minimum cosine similarity counted as a duplicate
+        min_overlap: Minimum share of words (Jaccard) a duplicate has in common
+        max_entries: Maximum number of cached results
+    """
+
+    def __init__(self, embed: Callable[[List[str]], np.ndarray],
+                 threshold: float = 0.99, min_overlap: float = 0.7, max_entries: int = 100_000):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Function mapping a list of texts to an (n, dim) array
+            threshold: Minimum cosine similarity counted as a duplicate
+            min_overlap: Minimum share of words (Jaccard) a duplicate has in common
+            max_entries: Maximum number of cached results
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.max_entries = max_entries
+        self._matrix: Optional[np.ndarray] = None
+        self._values: List[Any] = []
+        self._texts: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize a single text."""
+        vector = np.asarray(self.embed([text]), dtype=np.float32)[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, text: str) -> Tuple[Optional[np.ndarray], Optional[Tuple[float, Any]]]:
+        """
+        Find the most similar cached text.
+
+        Args:
+            text: Normalized input text
+
+        Returns:
+            (embedding of text or None for exact hits, (similarity, cached value) or None)
+        """
+        with self._lock:
+            index = self._exact.get(text)
+            if index is not None:
+                self._touch(index)
+                self.hits += 1
+                return None, (1.0, self._values[index])
+
+        embedding = self._embed_one(text)
+        with self._lock:
+            count = len(self._values)
+            if count:
+                scores = self._matrix[:count] @ embedding
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+                if similarity >= self.threshold and lexically_close(
+                        text, self._texts[best], self.min_overlap):
+                    self._touch(best)
+                    self.hits += 1
+                    return embedding, (similarity, self._values[best])
+            self.misses += 1
+        return embedding, None
+
+    def add(self, text: str, value: Any, embedding: Optional[np.ndarray] = None) -> None:
+        """
+        Cache a result for a normalized text.
+
+        Args:
+            text: Normalized input text
+            value: Result to cache
+            embedding: Embedding returned by lookup (computed if omitted)
+        """
+        if embedding is None:
+            embedding = self._embed_one(text)
+        with self._lock:
+            if text in self._exact:
+                index = self._exact[text]
+                self._values[index] = value
+                self._touch(index)
+                return
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+            if len(self._values) < self.max_entries:
+                index = len(self._values)
+                self._values.append(value)
+                self._texts.append(text)
+            else:
+                index = int(np.argmin(self._last_used))
+                del self._exact[self._texts[index]]
+                self._values[index] = value
+                self._texts[index] = text
+            self._matrix[index] = embedding
+            self._exact[text] = index
+            self._touch(index)
+
+    def _touch(self, index: int) -> None:
+        """Mark an entry as most recently used (caller holds the lock)."""
+        self._tick += 1
+        self._last_used[index] = self._tick
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate counters."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
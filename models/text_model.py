@@ -9,7 +9,13 @@ Team: Mission, Rohan, Millan, Dipak
 """
 
 from models.base_model import BaseModel
-from typing import Dict, Any
+from models.semantic_cache import SemanticCache, normalize_text
+from models.admission import admission_controlled
+from utils.decorators import with_deadline
+from utils.profiling import profiled
+from utils.tracing import traced
+from typing import Dict, Any, List, Optional, Union
+import copy
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +28,12 @@ class TextModel(BaseModel):
     Inherits from BaseModel and overrides process_input for text-specific processing.
     """
     
+    PIPELINE = "text-generation"
+    
+    @profiled
+    @traced
+    @with_deadline
+    @admission_controlled
     def process_input(self, input_text: str) -> Dict[str, Any]:
         """
         Process text input through the model.
@@ -42,18 +54,15 @@ class TextModel(BaseModel):
             }
         
         try:
-            logger.info(f"Processing text with model: {self._model_id}")
-            
-            # Prepare payload for API
-            payload = {"inputs": input_text}
+            logger.info("Processing text with model: %s", self._model_id)
             
             # Query the model through the client
-            response = self._client.query(self._model_id, payload)
+            response = self._client.query(self._model_id, input_text, self.PIPELINE)
             
             return response
             
         except Exception as e:
-            logger.error(f"Error processing text: {str(e)}")
+            logger.error("Error processing text: %s", e)
             return {
                 "status": "error",
                 "model": self._model_id,
@@ -61,6 +70,71 @@ class TextModel(BaseModel):
                 "message": str(e)
             }
 
+    
+    @traced
+    @with_deadline
+    def process_batch(self, input_texts: List[str],
+                      max_new_tokens: Union[int, List[int]] = None,
+                      stop: Union[List[str], List[List[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Process several prompts together.
+        
+        Uses the client's batched generation when it has one (LocalClient),
+        otherwise falls back to calling process_input for each prompt.
+        
+        Args:
+            input_texts: The prompts to process
+            max_new_tokens: One token limit for all prompts or one per prompt
+            stop: Stop sequences shared by all prompts or one list per prompt
+            
+        Returns:
+            List of dicts with status, model, and outputs, in input order
+        """
+        results: List[Dict[str, Any]] = [None] * len(input_texts)
+        valid = []
+        for i, text in enumerate(input_texts):
+            if self._validate_input(text):
+                valid.append(i)
+            else:
+                results[i] = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": "Invalid input",
+                    "message": "Input text cannot be empty"
+                }
+        
+        if not hasattr(self._client, "generate_batch"):
+            for i in valid:
+                results[i] = self.process_input(input_texts[i])
+            return results
+        
+        limits = max_new_tokens
+        if isinstance(limits, list):
+            limits = [limits[i] for i in valid]
+        stops = stop
+        if stops and not isinstance(stops[0], str):
+            stops = [stops[i] for i in valid]
+        
+        try:
+            logger.info("Processing batch of %d prompts with model: %s", len(valid), self._model_id)
+            responses = self._client.generate_batch(
+                self._model_id, [input_texts[i] for i in valid],
+                max_new_tokens=limits, stop=stops
+            )
+            for i, response in zip(valid, responses):
+                results[i] = response
+        except Exception as e:
+            logger.error("Error processing text batch: %s", e)
+            for i in valid:
+                results[i] = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": str(type(e).__name__),
+                    "message": str(e)
+                }
+        
+        return results
+
 
 class SentimentModel(TextModel):
     """
@@ -68,8 +142,29 @@ class SentimentModel(TextModel):
     
     Specialized text model for sentiment analysis.
     Demonstrates further inheritance and specialization.
+    
+    With a semantic cache, inputs are normalized and near-duplicates of
+    earlier texts return the cached result without inference.
     """
     
+    PIPELINE = "text-classification"
+    
+    def __init__(self, client, model_id: str, semantic_cache: Optional[SemanticCache] = None):
+        """
+        Initialize the sentiment model.
+        
+        Args:
+            client: HuggingFace API client instance
+            model_id: The model identifier from HuggingFace
+            semantic_cache: Optional near-duplicate cache consulted before querying
+        """
+        super().__init__(client, model_id)
+        self._semantic_cache = semantic_cache
+    
+    @profiled
+    @traced
+    @with_deadline
+    @admission_controlled
     def process_input(self, input_text: str) -> Dict[str, Any]:
         """
         Analyze sentiment of input text.
@@ -90,22 +185,103 @@ class SentimentModel(TextModel):
             }
         
         try:
-            logger.info(f"Analyzing sentiment with model: {self._model_id}")
+            logger.info("Analyzing sentiment with model: %s", self._model_id)
+            
+            # Near-duplicate lookup on the normalized text
+            embedding, normalized = None, None
+            if self._semantic_cache is not None:
+                normalized = normalize_text(input_text)
+                embedding, match = self._semantic_cache.lookup(normalized)
+                if match is not None:
+                    return self._cached_result(*match)
             
-            payload = {"inputs": input_text}
-            response = self._client.query(self._model_id, payload)
+            response = self._client.query(self._model_id, input_text, self.PIPELINE)
             
             # Add sentiment-specific formatting
             if response.get("status") == "success":
                 response["analysis_type"] = "sentiment"
+                if self._semantic_cache is not None:
+                    self._semantic_cache.add(normalized, copy.deepcopy(response), embedding)
             
             return response
             
         except Exception as e:
-            logger.error(f"Error in sentiment analysis: {str(e)}")
+            logger.error("Error in sentiment analysis: %s", e)
             return {
                 "status": "error",
                 "model": self._model_id,
                 "error": str(type(e).__name__),
                 "message": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def _cached_result(self, similarity: float, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of a semantic cache hit marked as cached."""
+        logger.debug("Semantic cache hit (similarity %.3f)", similarity)
+        result = copy.deepcopy(cached)
+        result["cached"] = True
+        result["similarity"] = similarity
+        return result
+    
+    @traced
+    @with_deadline
+    def process_batch(self, input_texts: List[str], top_k: int = None) -> List[Dict[str, Any]]:
+        """
+        Analyze the sentiment of several texts together.
+        
+        Uses the client's batched classification when it has one (LocalClient),
+        so the whole batch shares one forward pass and one vectorized
+        post-processing step. Otherwise falls back to process_input per text.
+        
+        Args:
+            input_texts: Texts to analyze
+            top_k: Number of labels returned per text (None keeps all)
+            
+        Returns:
+            List of dicts with sentiment analysis results, in input order
+        """
+        if not hasattr(self._client, "classify_texts"):
+            return [self.process_input(text) for text in input_texts]
+        
+        results: List[Dict[str, Any]] = [None] * len(input_texts)
+        pending = []  # (index, normalized text, embedding) of texts to classify
+        for i, text in enumerate(input_texts):
+            if not self._validate_input(text):
+                results[i] = {
+                    "status": "error",
+                    "model": self._model_id,
+                    "error": "Invalid input",
+                    "message": "Input text cannot be empty"
+                }
+                continue
+            normalized, embedding = None, None
+            if self._semantic_cache is not None:
+                normalized = normalize_text(text)
+                embedding, match = self._semantic_cache.lookup(normalized)
+                if match is not None:
+                    results[i] = self._cached_result(*match)
+                    continue
+            pending.append((i, normalized, embedding))
+        
+        if not pending:
+            return results
+        try:
+            logger.info("Analyzing sentiment of %d texts with model: %s", len(pending), self._model_id)
+            responses = self._client.classify_texts(
+                self._model_id, [input_texts[i] for i, _, _ in pending], top_k=top_k
+            )
+        except Exception as e:
+            logger.error("Error in batched sentiment analysis: %s", e)
+            responses = [{
+                "status": "error",
+                "model": self._model_id,
+                "error": str(type(e).__name__),
+                "message": str(e)
+            } for _ in pending]
+        
+        for (i, normalized, embedding), response in zip(pending, responses):
+            if response.get("status") == "success":
+                response["analysis_type"] = "sentiment"
+                if self._semantic_cache is not None:
+                    self._semantic_cache.add(normalized, copy.deepcopy(response), embedding)
+            results[i] = response
+        return results
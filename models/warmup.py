@@ -0,0 +1,202 @@
+"""
+Model warm-up and preload manager
+
+Sends a synthetic request to each configured model in the background at
+startup so the first real request does not pay for a cold load (remote) or
+weight loading and tokenizer initialization (local). Tracks per-model
+readiness and can keep remote models warm with periodic pings.
+
+A model that answers 503 (the Inference API's "model is loading") stays
+WARMING; one that fails is FAILED. Either is pinged again with exponential
+backoff until it answers, so a timeout or a slow cold start does not leave
+a model marked failed until restart.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Readiness states
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+# HTTP status of a hosted model that is still being loaded
+_LOADING_STATUS = 503
+
+
+class WarmupManager:
+    """
+    Preloads models and tracks their readiness.
+
+    Usage:
+        warmup = WarmupManager(client, AVAILABLE_MODELS)
+        warmup.start()
+        if warmup.is_ready("Sentiment Analysis"):
+            ...
+
+    Attributes:
+        keepalive_interval: Seconds between keep-alive pings (None disables them)
+        retry_interval: Seconds before the first retry of a model that is not ready
+        max_retry_interval: Longest wait between retries (the wait doubles each time)
+    """
+
+    def __init__(self, client, models: Dict[str, Dict[str, Any]],
+                 names: Iterable[str] = None, keepalive_interval: float = None,
+                 retry_interval: float = 5.0, max_retry_interval: float = 300.0):
+        """
+        Initialize the warm-up manager.
+
+        Args:
+            client: HFClient-compatible client with query(model_id, input_data, pipeline)
+            models: Model configuration in the AVAILABLE_MODELS format
+            names: Names of the models to warm up (default: all of them)
+            keepalive_interval: Re-ping ready models this often, in seconds
+            retry_interval: Seconds before the first retry of a model that is not ready
+            max_retry_interval: Longest wait between retries of one model
+        """
+        self._client = client
+        self._models = models
+        self._names = list(names) if names is not None else list(models)
+        self.keepalive_interval = keepalive_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._state: Dict[str, Dict[str, Any]] = {
+            name: {"state": PENDING, "latency": None, "error": None, "updated": None}
+            for name in self._names
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sample_image: Optional[str] = None
+
+    def start(self) -> "WarmupManager":
+        """Start warming up in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread and remove the synthetic image."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._remove_sample_image()
+
+    def _remove_sample_image(self) -> None:
+        """Delete the synthetic warm-up image if one was created."""
+        if self._sample_image and os.path.exists(self._sample_image):
+            os.remove(self._sample_image)
+        self._sample_image = None
+
+    def _run(self) -> None:
+        """Warm every model once, then retry the ones not ready and keep the others warm."""
+        due: Dict[str, float] = {}
+        backoff: Dict[str, float] = {}
+        for name in self._names:
+            if self._stop.is_set():
+                return
+            self._schedule(name, self.warm(name), due, backoff)
+        while due:
+            name = min(due, key=due.get)
+            if self._stop.wait(max(0.0, due[name] - time.monotonic())):
+                return
+            del due[name]
+            self._schedule(name, self.warm(name, keepalive=self.is_ready(name)), due, backoff)
+        self._remove_sample_image()
+
+    def _schedule(self, name: str, ok: bool, due: Dict[str, float], backoff: Dict[str, float]) -> None:
+        """Set when a model is pinged next: a keep-alive if it answered, else a retry with backoff."""
+        if ok:
+            backoff.pop(name, None)
+            if self.keepalive_interval:
+                due[name] = time.monotonic() + self.keepalive_interval
+            return
+        delay = backoff.get(name, self.retry_interval)
+        backoff[name] = min(self.max_retry_interval, delay * 2)
+        due[name] = time.monotonic() + delay
+
+    def _warmup_input(self, info: Dict[str, Any]) -> str:
+        """Return a synthetic input for a model, based on its example field."""
+        if info.get("input_type") != "image":
+            return info.get("example") or "Hello"
+        example = info.get("example")
+        if example and os.path.exists(example):
+            return example
+        if self._sample_image is None:
+            from PIL import Image
+
+            fd, path = tempfile.mkstemp(prefix="warmup_", suffix=".jpg")
+            os.close(fd)
+            Image.new("RGB", (224, 224), (128, 128, 128)).save(path, format="JPEG")
+            self._sample_image = path
+        return self._sample_image
+
+    def warm(self, name: str, keepalive: bool = False) -> bool:
+        """
+        Send one warm-up request to a model and record the outcome.
+
+        Args:
+            name: Model name (key in the models configuration)
+            keepalive: True for periodic pings of an already warm model
+
+        Returns:
+            True if the model answered successfully
+        """
+        info = self._models[name]
+        # A failed model stays usable while it is retried
+        if not keepalive and self.state(name) == PENDING:
+            self._set(name, state=WARMING)
+        start = time.time()
+        try:
+            result = self._client.query(
+                model_id=info["id"],
+                input_data=self._warmup_input(info),
+                pipeline=info["pipeline"],
+                preprocessing=info.get("preprocessing")
+            )
+            ok = result.get("status") == "success"
+            error = None if ok else result.get("message", "Unknown error")
+            loading = result.get("status_code") == _LOADING_STATUS
+        except Exception as e:
+            ok, error, loading = False, str(e), False
+        elapsed = time.time() - start
+
+        if ok:
+            logger.info("Model %s is warm (%.2fs)", name, elapsed)
+            self._set(name, state=READY, latency=elapsed, error=None)
+        elif loading:
+            logger.info("Model %s is still loading", name)
+            self._set(name, state=WARMING, latency=elapsed, error=error)
+        else:
+            logger.warning("Warm-up failed for %s: %s", name, error)
+            self._set(name, state=FAILED, latency=elapsed, error=error)
+        return ok
+
+    def _set(self, name: str, **fields) -> None:
+        """Update the readiness record of a model."""
+        with self._lock:
+            self._state[name].update(fields, updated=time.time())
+
+    def state(self, name: str) -> str:
+        """Return the readiness state of a model (ready if it is not managed)."""
+        with self._lock:
+            record = self._state.get(name)
+            return record["state"] if record else READY
+
+    def is_ready(self, name: str) -> bool:
+        """Return True if the model has answered a warm-up request."""
+        return self.state(name) == READY
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Return a copy of the readiness records of all managed models."""
+        with self._lock:
+            return {name: dict(record) for name, record in self._state.items()}
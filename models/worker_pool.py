@@ -0,0 +1,331 @@
+"""
+Process-pool execution mode for HIT137 Assignment 3
+
+The parent process loads every model once through a LocalClient and then
+forks worker processes. On fork the workers inherit the already loaded
+weights copy-on-write (and torch parameters are moved to shared memory
+first), so N workers cost roughly one copy of resnet-50/gpt2 instead of N.
+
+Requests are sent to the worker with the fewest outstanding requests and the
+pool exposes the same query interface as HFClient. Each worker answers on its
+own pipe, so a worker that dies mid-send cannot wedge the others. The result
+collector also watches the worker processes: when one dies (crash, OOM kill)
+its pending requests fail and a replacement is forked, up to MAX_RESTARTS
+times per worker before that worker is dropped.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+
+from models.local_client import LocalClient
+
+logger = logging.getLogger(__name__)
+
+# Client inherited by forked workers. Set by the parent right before forking.
+_WORKER_CLIENT: Optional[LocalClient] = None
+
+# Replacements started for one worker slot before it is dropped
+MAX_RESTARTS = 3
+# Seconds between checks of the worker list by the collector
+_WATCH_INTERVAL = 0.5
+
+
+def _limit_threads(threads: int) -> None:
+    """Cap torch's intra-op thread pool in this process.
+
+    OMP_NUM_THREADS and friends are read when torch initializes its thread
+    pools, which has already happened in a forked worker, so only
+    torch.set_num_threads() takes effect here.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _worker_main(index: int, tasks, results, threads: int,
+                 models: List[Tuple[str, str]], device: int) -> None:
+    """Worker loop: run queries from the task queue until a None sentinel, answering on the results pipe."""
+    _limit_threads(threads)
+    client = _WORKER_CLIENT
+    if client is None:
+        # Spawn start method: nothing was inherited, load our own copy.
+        client = LocalClient(device=device)
+        for model_id, pipeline in models:
+            client.load(model_id, pipeline)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, model_id, input_data, pipeline, preprocessing = task
+        try:
+            result = client.query(model_id, input_data, pipeline, preprocessing=preprocessing)
+        except Exception as e:
+            result = {
+                "status": "error",
+                "message": f"Worker {index} failed: {str(e)}"
+            }
+        results.send((request_id, index, result))
+
+
+class WorkerPoolClient:
+    """
+    Least-loaded pool of local inference worker processes.
+
+    Usage:
+        with WorkerPoolClient([("gpt2", "text-generation")], workers=4) as pool:
+            pool.query("gpt2", "Once upon a time", "text-generation")
+
+    Attributes:
+        workers: Number of worker processes
+        threads_per_worker: Torch/OpenMP threads given to each worker
+    """
+
+    def __init__(self, models: List[Tuple[str, str]], *, workers: int = None,
+                 threads_per_worker: int = None, device: int = -1,
+                 client: LocalClient = None):
+        """Initialize the pool (workers are started by start()).
+
+        Args:
+            models: (model_id, pipeline) pairs to preload in the parent
+            workers: Number of worker processes (default: cpu count // 4, at least 1)
+            threads_per_worker: Threads per worker (default: cpu count // workers)
+            device: Torch device index, -1 for CPU
+            client: Optional LocalClient whose loaded models should be shared
+        """
+        cpus = os.cpu_count() or 1
+        self.models = list(models)
+        self.workers = workers or max(1, cpus // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        self.device = device
+        self._client = client or LocalClient(device=device)
+
+        self._ctx = None
+        self._forking = False
+        # None marks a worker slot dropped after too many restarts
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._task_queues: List[Any] = []
+        self._result_pipes: List[Any] = []
+        self._restarts: List[int] = []
+        self._collector: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+
+        self._lock = threading.Lock()
+        self._outstanding: List[int] = []
+        # request ID -> (worker index, future)
+        self._futures: Dict[int, Tuple[int, Future]] = {}
+        self._ids = itertools.count()
+        self._started = False
+
+    def start(self) -> "WorkerPoolClient":
+        """Load the models in the parent and fork the worker processes."""
+        if self._started:
+            return self
+
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._forking = self._ctx.get_start_method() == "fork"
+        if self._forking:
+            for model_id, pipeline in self.models:
+                pipe = self._client.load(model_id, pipeline)
+                model = getattr(pipe, "model", None)
+                if hasattr(model, "share_memory"):
+                    model.share_memory()
+        else:
+            logger.warning("fork is unavailable; each worker will load its own model copy")
+
+        self._outstanding = [0] * self.workers
+        self._restarts = [0] * self.workers
+        self._closing.clear()
+        for index in range(self.workers):
+            tasks, results, process = self._spawn(index)
+            self._task_queues.append(tasks)
+            self._result_pipes.append(results)
+            self._processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        self._started = True
+        logger.info("Started %d workers with %d threads each", self.workers, self.threads_per_worker)
+        return self
+
+    def _spawn(self, index: int) -> Tuple[Any, Any, multiprocessing.Process]:
+        """Start the worker process for a slot and return (its task queue, its results pipe, the process)."""
+        global _WORKER_CLIENT
+        tasks = self._ctx.Queue()
+        results, worker_end = self._ctx.Pipe(duplex=False)
+        if self._forking:
+            _WORKER_CLIENT = self._client
+        try:
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(index, tasks, worker_end, self.threads_per_worker,
+                      self.models, self.device),
+                daemon=True,
+            )
+            process.start()
+        finally:
+            _WORKER_CLIENT = None
+            worker_end.close()
+        return tasks, results, process
+
+    def _collect(self) -> None:
+        """Resolve pending futures as results arrive and replace workers that die."""
+        while True:
+            with self._lock:
+                slots = {}
+                for index, process in enumerate(self._processes):
+                    if process is not None:
+                        slots[self._result_pipes[index]] = index
+                        slots[process.sentinel] = index
+            if not slots:
+                return
+            ready = multiprocessing.connection.wait(list(slots), timeout=_WATCH_INTERVAL)
+            # Pipes first, so a worker's last answers are delivered before its exit is handled
+            for handle in sorted(ready, key=lambda handle: isinstance(handle, int)):
+                index = slots[handle]
+                if isinstance(handle, int):
+                    self._drain(index)
+                    self._replace(index)
+                elif self._result_pipes[index] is handle:
+                    self._drain(index)
+
+    def _drain(self, index: int) -> None:
+        """Deliver the results waiting on a worker's pipe."""
+        pipe = self._result_pipes[index]
+        try:
+            while pipe.poll():
+                request_id, _, result = pipe.recv()
+                with self._lock:
+                    # Absent if the request was already failed because its worker died
+                    entry = self._futures.pop(request_id, None)
+                    if entry is not None:
+                        self._outstanding[index] -= 1
+                if entry is not None:
+                    entry[1].set_result(result)
+        except (EOFError, OSError):
+            # The worker died mid-send; its exit is handled through its sentinel
+            pass
+
+    def _replace(self, index: int) -> None:
+        """Fail the requests held by a dead worker and start a new one (or drop the slot)."""
+        dead = self._processes[index]
+        dead.join()
+        closing = self._closing.is_set()
+        drop = closing or self._restarts[index] >= MAX_RESTARTS
+        tasks, results, process = (None, None, None) if drop else self._spawn(index)
+        with self._lock:
+            lost = [request_id for request_id, (worker, _) in self._futures.items() if worker == index]
+            futures = [self._futures.pop(request_id)[1] for request_id in lost]
+            self._outstanding[index] = 0
+            old_tasks, old_results = self._task_queues[index], self._result_pipes[index]
+            self._task_queues[index] = tasks
+            self._result_pipes[index] = results
+            self._processes[index] = process
+            if not closing:
+                self._restarts[index] += 1
+        if process is not None:
+            logger.warning("Worker %d exited with code %s; started a replacement (pid %s)",
+                           index, dead.exitcode, process.pid)
+        elif not closing:
+            logger.error("Worker %d exited with code %s after %d restarts; dropping it",
+                         index, dead.exitcode, MAX_RESTARTS)
+        for future in futures:
+            future.set_result({
+                "status": "error",
+                "message": f"Worker {index} exited (code {dead.exitcode}) before answering"
+            })
+        old_tasks.cancel_join_thread()
+        old_tasks.close()
+        old_results.close()
+
+    def _least_loaded(self) -> Optional[int]:
+        """Return the index of the live worker with the fewest outstanding requests (None if none)."""
+        live = [index for index, process in enumerate(self._processes) if process is not None]
+        return min(live, key=self._outstanding.__getitem__) if live else None
+
+    def submit(self, model_id: str, input_data: Any, pipeline: str,
+               preprocessing: Optional[Dict[str, Any]] = None) -> Future:
+        """Dispatch a query to the least-loaded worker and return a Future."""
+        if not self._started:
+            self.start()
+        future: Future = Future()
+        with self._lock:
+            index = self._least_loaded()
+            if index is None:
+                future.set_result({"status": "error", "message": "No worker processes left in the pool"})
+                return future
+            request_id = next(self._ids)
+            self._outstanding[index] += 1
+            self._futures[request_id] = (index, future)
+            # Under the lock so a worker being replaced never gets the task on its old queue
+            self._task_queues[index].put((request_id, model_id, input_data, pipeline, preprocessing))
+        return future
+
+    def query(self, model_id: str, input_data: Any, pipeline: str,
+              preprocessing: Optional[Dict[str, Any]] = None,
+              timeout: float = None) -> Dict[str, Any]:
+        """Run a query on the pool and wait for its structured response.
+
+        Args:
+            model_id: The ID of the model to use
+            input_data: The input text or image path
+            pipeline: The type of pipeline to use
+            preprocessing: Optional image preprocessing profile from AVAILABLE_MODELS
+            timeout: Optional seconds to wait for the result
+
+        Returns:
+            Dict containing the response with proper formatting
+        """
+        try:
+            return self.submit(model_id, input_data, pipeline, preprocessing).result(timeout=timeout)
+        except Exception as e:
+            logger.error("Worker pool query failed: %s", e)
+            return {
+                "status": "error",
+                "message": f"Worker pool query failed: {str(e)}"
+            }
+
+    def outstanding(self) -> List[int]:
+        """Return the number of outstanding requests per worker."""
+        with self._lock:
+            return list(self._outstanding)
+
+    def close(self) -> None:
+        """Stop the workers and the result collector."""
+        if not self._started:
+            return
+        # Workers finish their queued requests; the collector retires each one as it exits
+        self._closing.set()
+        with self._lock:
+            processes = [process for process in self._processes if process is not None]
+            for tasks in self._task_queues:
+                if tasks is not None:
+                    tasks.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=5)
+        with self._lock:
+            for _, future in self._futures.values():
+                future.set_result({"status": "error", "message": "Worker pool closed"})
+            self._futures.clear()
+        self._processes.clear()
+        self._task_queues.clear()
+        self._result_pipes.clear()
+        self._started = False
+
+    def __enter__(self) -> "WorkerPoolClient":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
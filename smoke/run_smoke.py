@@ -8,10 +8,32 @@ This script performs basic integration tests to verify:
 4. Basic workflows complete successfully
 
 Run this before submitting to ensure everything works!
+
+With --perf it runs a fixed benchmark set instead (mock client, a local
+stand-in HTTP server and the image pipeline) and compares the results with
+a stored baseline, exiting non-zero when throughput, p99 latency, import
+time or peak memory regressed beyond the metric's tolerance (exit 1), or
+when a benchmark could not run at all (exit 3):
+
+    python smoke/run_smoke.py --perf                    # check against the baseline
+    python smoke/run_smoke.py --perf --update-baseline  # record a new baseline
+
+Baselines are machine specific: record one on the machine that runs the gate.
 """
 
+import argparse
+import json
+import platform
+import statistics
+import subprocess
 import sys
 import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # Add parent directory to path so we can import our modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -208,7 +230,7 @@ def test_mock_workflow():
         from models.hf_client import HFClient
         
         client = HFClient(api_key="test", mock_mode=True)
-        response = client.query("test-model", {"inputs": "Hello"})
+        response = client.query("test-model", "Hello", "text-classification")
         
         if response and "status" in response:
             print_test("Mock HFClient query", True, "Returns structured response")
@@ -308,6 +330,281 @@ def test_init_files():
     return tests_passed, total_tests
 
 
+# ---------------------------------------------------------------------------
+# Performance regression mode
+# ---------------------------------------------------------------------------
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "perf_baseline.json")
+
+# Metric name -> (direction, default tolerance). "higher" metrics regress when
+# they drop below baseline * (1 - tolerance), "lower" ones when they rise above
+# baseline * (1 + tolerance).
+PERF_METRICS = {
+    "import_time_ms": ("lower", 0.25),
+    "mock_query_per_s": ("higher", 0.20),
+    "mock_query_p99_ms": ("lower", 0.50),
+    "http_query_per_s": ("higher", 0.20),
+    "http_query_p99_ms": ("lower", 0.50),
+    "format_results_per_s": ("higher", 0.20),
+    "image_batch_per_s": ("higher", 0.20),
+    "image_batch_peak_kib": ("lower", 0.15),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Inference API: answers every POST with a classification."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps([{"label": "POSITIVE", "score": 0.9},
+                           {"label": "NEGATIVE", "score": 0.1}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _p99(latencies):
+    """99th percentile of a list of latencies."""
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def perf_import_time():
+    """Milliseconds to import the application in a fresh interpreter (best of 3)."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = ("import time; t = time.perf_counter(); "
+            "import models.hf_client, models.text_model, models.image_model, models.scheduler; "
+            "print((time.perf_counter() - t) * 1000)")
+    runs = []
+    for _ in range(3):
+        child = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+        if child.returncode != 0:
+            lines = child.stderr.strip().splitlines()
+            raise RuntimeError(f"import failed: {lines[-1] if lines else f'exit code {child.returncode}'}")
+        runs.append(float(child.stdout))
+    return {"import_time_ms": min(runs)}
+
+
+def perf_mock_query(calls=3000):
+    """HFClient.query in mock mode: the decorator and logging path without I/O."""
+    from models.hf_client import HFClient
+    
+    client = HFClient(api_key="perf", mock_mode=True)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        t = time.perf_counter()
+        client.query("perf-model", "Hello", "text-classification")
+        latencies.append((time.perf_counter() - t) * 1000)
+    wall = time.perf_counter() - start
+    return {"mock_query_per_s": calls / wall, "mock_query_p99_ms": _p99(latencies)}
+
+
+def perf_http_query(url, calls=800, threads=4):
+    """HFClient.query against the local stand-in server from several threads."""
+    from models.endpoint_pool import EndpointPool
+    from models.hf_client import HFClient
+    
+    client = HFClient(api_key="perf", endpoint_pools={"perf-model": EndpointPool([url])})
+    
+    def timed(_):
+        t = time.perf_counter()
+        response = client.query("perf-model", "Hello", "text-classification")
+        if response.get("status") != "success":
+            raise RuntimeError(f"Stand-in query failed: {response.get('message')}")
+        return (time.perf_counter() - t) * 1000
+    
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(timed, range(threads * 5)))  # warm up connections
+        start = time.perf_counter()
+        latencies = list(executor.map(timed, range(calls)))
+        wall = time.perf_counter() - start
+    return {"http_query_per_s": calls / wall, "http_query_p99_ms": _p99(latencies)}
+
+
+def perf_format_results(count=200, classes=1000, rounds=5):
+    """Formatting of 1000-class image-classification responses (median of rounds)."""
+    import random
+    from models.hf_client import HFClient
+    
+    rng = random.Random(0)
+    labels = [f"class_{i}" for i in range(classes)]
+    responses = [[{"label": label, "score": rng.random()} for label in labels] for _ in range(count)]
+    client = HFClient(api_key="perf")
+    rates = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for response in responses:
+            client._format_image_output(response)
+        rates.append(count / (time.perf_counter() - start))
+    return {"format_results_per_s": statistics.median(rates)}
+
+
+def perf_image_batch(url, image_dir, count=16):
+    """ImageModel.process_batch (read, encode, upload pipeline) against the stand-in server."""
+    from PIL import Image
+    from models.endpoint_pool import EndpointPool
+    from models.hf_client import HFClient
+    from models.image_model import ImageModel
+    
+    paths = []
+    for i in range(count):
+        path = os.path.join(image_dir, f"perf_{i}.jpg")
+        if not os.path.exists(path):
+            Image.new("RGB", (1280, 960), (i * 15 % 256, 120, 200)).save(path, quality=90)
+        paths.append(path)
+    client = HFClient(api_key="perf", endpoint_pools={"perf-model": EndpointPool([url])})
+    model = ImageModel(client, "perf-model", cache_size=0)
+    
+    start = time.perf_counter()
+    results = model.process_batch(paths)
+    wall = time.perf_counter() - start
+    failed = [r for r in results if r.get("status") != "success"]
+    if failed:
+        raise RuntimeError(f"Image batch failed: {failed[0].get('message')}")
+    
+    # Peak Python memory in a separate pass (tracemalloc slows the code it traces)
+    tracemalloc.start()
+    try:
+        model.process_batch(paths)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"image_batch_per_s": count / wall, "image_batch_peak_kib": peak / 1024}
+
+
+def run_benchmarks(repeat=3):
+    """
+    Run the benchmark set repeat times.
+    
+    A benchmark that raises is not retried and its metrics are left out.
+    
+    Returns:
+        (median of each measured metric, {benchmark name: error message})
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/models/{{model_id}}"
+    runs = {name: [] for name in PERF_METRICS}
+    errors = {}
+    try:
+        with tempfile.TemporaryDirectory() as image_dir:
+            benchmarks = [
+                ("import_time", perf_import_time),
+                ("mock_query", perf_mock_query),
+                ("http_query", lambda: perf_http_query(url)),
+                ("format_results", perf_format_results),
+                ("image_batch", lambda: perf_image_batch(url, image_dir)),
+            ]
+            for _ in range(repeat):
+                for name, benchmark in benchmarks:
+                    if name in errors:
+                        continue
+                    try:
+                        results = benchmark()
+                    except Exception as e:
+                        errors[name] = f"{type(e).__name__}: {e}"
+                        continue
+                    for metric, value in results.items():
+                        runs[metric].append(value)
+    finally:
+        server.shutdown()
+    return {name: statistics.median(values) for name, values in runs.items() if values}, errors
+
+
+def _machine():
+    """Description of the machine and interpreter the numbers come from."""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare_to_baseline(current, baseline):
+    """
+    Compare metrics with a baseline.
+    
+    Returns:
+        (report lines, number of regressions)
+    """
+    lines = []
+    regressions = 0
+    for name, (direction, default_tolerance) in PERF_METRICS.items():
+        entry = baseline.get("metrics", {}).get(name)
+        if name not in current:
+            lines.append(f"⛔ {name:<24} {'not measured':>12}")
+            continue
+        if entry is None:
+            lines.append(f"   {name:<24} {current[name]:>12.4g}   (no baseline)")
+            continue
+        base, tolerance = entry["value"], entry.get("tolerance", default_tolerance)
+        change = (current[name] - base) / base if base else 0.0
+        regressed = change < -tolerance if direction == "higher" else change > tolerance
+        regressions += regressed
+        status = "❌ REGRESSION" if regressed else "✅"
+        lines.append(f"{status} {name:<24} {current[name]:>12.4g} vs {base:>12.4g}  "
+                     f"({change:+.1%}, tolerance {tolerance:.0%}, {direction} is better)")
+    return lines, regressions
+
+
+def run_perf(baseline_path, update_baseline=False, repeat=3):
+    """Perf-regression mode: benchmark, then compare with (or record) the baseline."""
+    print("\n" + "="*50)
+    print("PERFORMANCE REGRESSION CHECK")
+    print("="*50)
+    current, errors = run_benchmarks(repeat)
+    if errors:
+        for name, message in errors.items():
+            print(f"⛔ Benchmark {name} failed: {message}")
+        if update_baseline:
+            print("\nBaseline not updated.")
+            return 3
+    
+    if update_baseline:
+        previous = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                previous = json.load(f).get("metrics", {})
+        baseline = {
+            "machine": _machine(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "metrics": {
+                name: {"value": float(f"{current[name]:.4g}"),
+                       # Keep tolerances that were tuned by hand
+                       "tolerance": previous.get(name, {}).get("tolerance", tolerance)}
+                for name, (_, tolerance) in PERF_METRICS.items()
+            },
+        }
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        for name in PERF_METRICS:
+            print(f"   {name:<24} {current[name]:>12.4g}")
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+    
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; record one with --perf --update-baseline")
+        return 2
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}) != _machine():
+        print(f"⚠️  Baseline was recorded on a different machine: {baseline.get('machine')}")
+    lines, regressions = compare_to_baseline(current, baseline)
+    print("\n".join(lines))
+    if errors:
+        print(f"\n⛔ {len(errors)} benchmark(s) could not run.")
+        return 3
+    if regressions:
+        print(f"\n⚠️  {regressions} metric(s) regressed beyond tolerance.")
+        return 1
+    print("\n🎉 No performance regressions.")
+    return 0
+
+
 def main():
     """Run all smoke tests."""
     print("\n" + "🔥"*25)
@@ -355,4 +652,14 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HIT137 Assignment 3 smoke tests")
+    parser.add_argument("--perf", action="store_true",
+                        help="Run the performance regression check instead of the smoke tests")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Record the current results as the baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (median is used)")
+    args = parser.parse_args()
+    if args.perf:
+        sys.exit(run_perf(args.baseline, args.update_baseline, args.repeat))
     sys.exit(main())
\ No newline at end of file
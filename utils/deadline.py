@@ -0,0 +1,82 @@
+"""
+Per-call deadlines carried in a context variable.
+
+A deadline is set once at the entry point of a call (BaseModel.process_input
+via the with_deadline decorator) and read wherever time is spent: the retry
+decorator stops retrying once the deadline cannot be met, and HFClient caps
+each HTTP timeout at the time that is left. Nested scopes can only tighten
+the deadline, never extend it.
+
+Example:
+    with deadline_scope(2.0):
+        client.query(...)          # HTTP timeout is at most ~2 s
+"""
+
+import contextlib
+import contextvars
+import time
+from typing import Iterator, Optional
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call runs out of time before (re)trying an operation."""
+
+
+def current_deadline() -> Optional[float]:
+    """Return the active deadline as a time.monotonic() value, or None."""
+    return _deadline.get()
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds left until the active deadline.
+
+    Args:
+        default: Value returned when no deadline is set
+
+    Returns:
+        Seconds left (may be negative once expired), or default
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return deadline - time.monotonic()
+
+
+def timeout_for(limit: float) -> float:
+    """
+    Timeout for one blocking operation: limit, capped by the time left.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return min(limit, left)
+
+
+@contextlib.contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Run a block with a deadline timeout seconds from now.
+
+    The effective deadline is the earlier of this one and any enclosing one.
+    A timeout of None keeps the enclosing deadline (if any).
+
+    Yields:
+        The effective deadline (time.monotonic() value) or None
+    """
+    deadline = _deadline.get()
+    if timeout is not None:
+        new = time.monotonic() + timeout
+        deadline = new if deadline is None else min(deadline, new)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
@@ -7,16 +7,33 @@ Demonstrates the use of multiple decorators as per assignment requirements.
 
 import time
 import functools
-from typing import Callable, Any, Dict
+import reprlib
+from typing import Callable, Any, Dict, Optional
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from utils.deadline import DeadlineExceeded, deadline_scope, remaining
+from utils.tracing import add_event, set_attribute, span
+
+# Handlers and levels are set by the application (utils.logging_setup)
 logger = logging.getLogger(__name__)
 
+# Shortens logged arguments such as base64 image payloads
+_arg_repr = reprlib.Repr()
+_arg_repr.maxstring = 80
+_arg_repr.maxother = 80
+
+
+class _ShortRepr:
+    """Defers the truncated repr of a value until the log record is formatted."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return _arg_repr.repr(self.value)
+
 
 def api_call_logger(func: Callable) -> Callable:
     """
@@ -27,6 +44,8 @@ def api_call_logger(func: Callable) -> Callable:
         - Execution time
         - Success or failure status
     
+    The call also runs in a tracing span named after the function.
+    
     Example:
         @api_call_logger
         def fetch_data(model_id):
@@ -35,19 +54,23 @@ def api_call_logger(func: Callable) -> Callable:
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         func_name = func.__name__
-        logger.info(f"🔵 Starting API call: {func_name}")
-        logger.debug(f"   Args: {args}, Kwargs: {kwargs}")
+        logger.info("🔵 Starting API call: %s", func_name)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("   Args: %s, Kwargs: %s", _ShortRepr(args), _ShortRepr(kwargs))
         
         start_time = time.time()
-        try:
-            result = func(*args, **kwargs)
-            elapsed = time.time() - start_time
-            logger.info(f"✅ API call {func_name} completed in {elapsed:.2f}s")
-            return result
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ API call {func_name} failed after {elapsed:.2f}s: {str(e)}")
-            raise
+        with span(func.__qualname__) as call_span:
+            try:
+                result = func(*args, **kwargs)
+                elapsed = time.time() - start_time
+                if isinstance(result, dict) and result.get("status") == "error":
+                    call_span.set_error(str(result.get("message", "")))
+                logger.info("✅ API call %s completed in %.2fs", func_name, elapsed)
+                return result
+            except Exception as e:
+                elapsed = time.time() - start_time
+                logger.error("❌ API call %s failed after %.2fs: %s", func_name, elapsed, e)
+                raise
     
     return wrapper
 
@@ -78,11 +101,13 @@ def simple_cache(max_size: int = 128) -> Callable:
             
             # Check if result is cached
             if cache_key in cache:
-                logger.debug(f"💾 Cache hit for {func.__name__}")
+                logger.debug("💾 Cache hit for %s", func.__name__)
+                set_attribute("cache.hit", True)
                 return cache[cache_key]
             
             # Compute result
-            logger.debug(f"🔄 Cache miss for {func.__name__}, computing...")
+            logger.debug("🔄 Cache miss for %s, computing...", func.__name__)
+            set_attribute("cache.hit", False)
             result = func(*args, **kwargs)
             
             # Store in cache with LRU eviction
@@ -93,7 +118,7 @@ def simple_cache(max_size: int = 128) -> Callable:
             if len(cache) > max_size:
                 oldest_key = cache_order.pop(0)
                 del cache[oldest_key]
-                logger.debug(f"🗑️ Evicted oldest cache entry for {func.__name__}")
+                logger.debug("🗑️ Evicted oldest cache entry for %s", func.__name__)
             
             return result
         
@@ -124,6 +149,11 @@ def retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0) -> Ca
         def unstable_api_call():
             return requests.get("https://api.example.com")
     
+    Retries stop early when the active deadline (utils.deadline) would
+    expire during the backoff delay. Each failed attempt is recorded as a
+    "retry" event on the active tracing span and each backoff sleep as a
+    "retry.backoff" span.
+    
     Returns:
         The successful result or raises the last exception encountered.
     """
@@ -135,20 +165,28 @@ def retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0) -> Ca
             
             for attempt in range(1, max_attempts + 1):
                 try:
-                    logger.debug(f"🔄 Attempt {attempt}/{max_attempts} for {func.__name__}")
+                    logger.debug("🔄 Attempt %d/%d for %s", attempt, max_attempts, func.__name__)
                     return func(*args, **kwargs)
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
                     last_exception = e
+                    add_event("retry", attempt=attempt, error=type(e).__name__, message=str(e))
+                    left = remaining()
+                    if attempt < max_attempts and left is not None and left <= current_delay:
+                        logger.error("❌ No time left before the deadline to retry %s", func.__name__)
+                        break
                     if attempt < max_attempts:
                         logger.warning(
-                            f"⚠️ Attempt {attempt} failed for {func.__name__}: {str(e)}. "
-                            f"Retrying in {current_delay:.1f}s..."
+                            "⚠️ Attempt %d failed for %s: %s. Retrying in %.1fs...",
+                            attempt, func.__name__, e, current_delay
                         )
-                        time.sleep(current_delay)
+                        with span("retry.backoff", attempt=attempt, delay_s=current_delay):
+                            time.sleep(current_delay)
                         current_delay *= backoff
                     else:
                         logger.error(
-                            f"❌ All {max_attempts} attempts failed for {func.__name__}"
+                            "❌ All %d attempts failed for %s", max_attempts, func.__name__
                         )
             
             # Raise the last exception after all retries exhausted
@@ -174,6 +212,34 @@ def log_call(func: Callable) -> Callable:
     return api_call_logger(func)
 
 
+def with_deadline(func: Callable) -> Callable:
+    """
+    Run a model method under a per-call deadline.
+    
+    The decorated method accepts an extra timeout keyword argument (seconds);
+    without it the instance's default timeout (BaseModel.set_timeout) is used.
+    Everything the call does (retries, HTTP requests) sees the deadline,
+    and the timeout is recorded on the active tracing span.
+    
+    Example:
+        @with_deadline
+        def process_input(self, input_text):
+            ...
+        
+        model.process_input("Hello", timeout=2.0)
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, timeout: Optional[float] = None, **kwargs):
+        if timeout is None:
+            timeout = getattr(self, "_timeout", None)
+        if timeout is not None:
+            set_attribute("deadline.timeout_s", timeout)
+        with deadline_scope(timeout):
+            return func(self, *args, **kwargs)
+    
+    return wrapper
+
+
 def retry_on_failure(func: Callable = None, *, retries: int = 3, delay: float = 1.0) -> Callable:
     """Alias for retry decorator with configurable parameters.
     
@@ -211,9 +277,10 @@ def timing_decorator(func: Callable) -> Callable:
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start = time.time()
-        result = func(*args, **kwargs)
+        with span(func.__qualname__):
+            result = func(*args, **kwargs)
         elapsed = time.time() - start
-        logger.info(f"⏱️ {func.__name__} took {elapsed:.4f}s")
+        logger.info("⏱️ %s took %.4fs", func.__name__, elapsed)
         return result
     
     return wrapper
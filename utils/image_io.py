@@ -0,0 +1,255 @@
+"""
+Image decoding and resizing helpers.
+
+Decodes an image file once, directly at (or near) the model input
+resolution, into a NumPy array. JPEG files use the decoder's DCT scaling
+(PIL draft mode) so large photos are never fully decoded.
+
+ImageInput memory-maps large files so that hashing, encoding and decoding
+all work on the same mapped buffer instead of private copies.
+
+Also holds the preprocessing profiles used to size images before upload.
+A profile is a dict declared per model in AVAILABLE_MODELS:
+    size:    target edge length in pixels
+    mode:    "thumbnail" (fit inside size x size), "shortest_edge" (scale the
+             shortest edge to size) or "center_crop" (shortest edge, then a
+             size x size center crop)
+    format:  encode format ("JPEG", "PNG" or "WEBP")
+    quality: encoder quality for lossy formats
+"""
+
+import hashlib
+import io
+import mmap
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Profile matching the original fixed behaviour (fit in 1024 px, PIL default quality)
+DEFAULT_IMAGE_PROFILE: Dict[str, Any] = {
+    "size": 1024,
+    "mode": "thumbnail",
+    "format": "JPEG",
+    "quality": 75,
+}
+
+
+class ImageInput:
+    """
+    Read-only view of an image file with a streaming content hash.
+
+    Files of at least mmap_threshold bytes are memory-mapped; smaller ones are
+    read into a single bytes object. Either way the data is held once and
+    exposed as a memoryview, so hashing and decoding never copy it.
+
+    Usage:
+        with ImageInput("photo.tiff") as image:
+            key = image.content_hash
+            upload = encode_for_profile(image.reader(), profile)
+    """
+
+    MMAP_THRESHOLD = 1024 * 1024
+    HASH_CHUNK = 1024 * 1024
+
+    def __init__(self, path: str, mmap_threshold: int = None):
+        """
+        Open an image file.
+
+        Args:
+            path: Path to the image file
+            mmap_threshold: Minimum size in bytes for memory mapping
+        """
+        self.path = path
+        threshold = self.MMAP_THRESHOLD if mmap_threshold is None else mmap_threshold
+        self._map: Optional[mmap.mmap] = None
+        self._data: Optional[bytes] = None
+        self._hash: Optional[str] = None
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size and size >= threshold:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._data = f.read()
+        self._view = memoryview(self._map if self._map is not None else self._data)
+
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes."""
+        return len(self._view)
+
+    @property
+    def buffer(self) -> memoryview:
+        """Zero-copy view of the file contents."""
+        return self._view
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 hex digest of the contents, computed once in chunks."""
+        if self._hash is None:
+            digest = hashlib.sha256()
+            for start in range(0, len(self._view), self.HASH_CHUNK):
+                digest.update(self._view[start:start + self.HASH_CHUNK])
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    def reader(self) -> Any:
+        """Return a binary file-like object over the contents, positioned at 0."""
+        if self._map is not None:
+            self._map.seek(0)
+            return self._map
+        return io.BytesIO(self._data)
+
+    def close(self) -> None:
+        """Release the buffer and the memory map."""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._data = None
+
+    def __enter__(self) -> "ImageInput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def decode_to_array(source: Any, resize_short: int, crop: Tuple[int, int],
+                    resample: int = Image.BILINEAR) -> np.ndarray:
+    """
+    Decode an image into an RGB uint8 array of shape (height, width, 3).
+
+    The shortest edge is resized to resize_short and the result is center
+    cropped to crop.
+
+    Args:
+        source: File path or binary file-like object
+        resize_short: Target length of the shortest edge before cropping
+        crop: (height, width) of the returned array
+        resample: PIL resampling filter
+
+    Returns:
+        The decoded image as a contiguous uint8 array
+    """
+    crop_h, crop_w = crop
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale while decoding (no-op for other formats)
+        img.draft("RGB", (resize_short, resize_short))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        width, height = img.size
+        scale = resize_short / min(width, height)
+        new_w = max(crop_w, round(width * scale))
+        new_h = max(crop_h, round(height * scale))
+        left = (new_w - crop_w) // 2
+        top = (new_h - crop_h) // 2
+        # Resize and crop in one resampling pass
+        box = (left / scale, top / scale, (left + crop_w) / scale, (top + crop_h) / scale)
+        img = img.resize((crop_w, crop_h), resample=resample, box=box)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def image_geometry(processor: Any, default: int = 224) -> Tuple[int, Tuple[int, int]]:
+    """
+    Read the resize/crop geometry from a transformers image processor.
+
+    Args:
+        processor: transformers image processor (or None)
+        default: Input size used when the processor does not specify one
+
+    Returns:
+        (resize_short, (crop_height, crop_width))
+    """
+    size = dict(getattr(processor, "size", None) or {})
+    crop_size = dict(getattr(processor, "crop_size", None) or {})
+    if "height" in size and "width" in size:
+        target = (size["height"], size["width"])
+        resize_short = min(target)
+    else:
+        edge = size.get("shortest_edge", default)
+        target = (edge, edge)
+        crop_pct = getattr(processor, "crop_pct", None)
+        resize_short = int(edge / crop_pct) if crop_pct and edge < 384 else edge
+    if getattr(processor, "do_center_crop", False) and crop_size:
+        target = (crop_size["height"], crop_size["width"])
+    return resize_short, target
+
+
+def image_resample(processor: Any, default: int = Image.BILINEAR) -> int:
+    """
+    Read the resampling filter from a transformers image processor.
+
+    Args:
+        processor: transformers image processor (or None)
+        default: PIL filter used when the processor does not specify one
+
+    Returns:
+        The PIL resampling filter (PILImageResampling values match PIL's)
+    """
+    resample = getattr(processor, "resample", None)
+    return default if resample is None else int(resample)
+
+
+def resize_for_profile(img: Image.Image, profile: Dict[str, Any]) -> Image.Image:
+    """
+    Resize an RGB image according to a preprocessing profile.
+
+    Images are only ever scaled down.
+
+    Args:
+        img: Image to resize
+        profile: Preprocessing profile (see module docstring)
+
+    Returns:
+        The resized image (may be img itself)
+    """
+    size = profile.get("size", DEFAULT_IMAGE_PROFILE["size"])
+    mode = profile.get("mode", DEFAULT_IMAGE_PROFILE["mode"])
+    if mode == "thumbnail":
+        if max(img.size) > size:
+            img.thumbnail((size, size))
+        return img
+
+    width, height = img.size
+    scale = min(1.0, size / min(width, height))
+    new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+    if mode == "center_crop":
+        crop = min(size, new_w, new_h)
+        left, top = (new_w - crop) // 2, (new_h - crop) // 2
+        box = (left / scale, top / scale, (left + crop) / scale, (top + crop) / scale)
+        return img.resize((crop, crop), resample=Image.BILINEAR, box=box)
+    if scale < 1.0:
+        return img.resize((new_w, new_h), resample=Image.BILINEAR)
+    return img
+
+
+def encode_for_profile(source: Any, profile: Dict[str, Any] = None) -> bytes:
+    """
+    Decode, resize and re-encode an image for upload.
+
+    Args:
+        source: File path or binary file-like object
+        profile: Preprocessing profile (default: DEFAULT_IMAGE_PROFILE)
+
+    Returns:
+        The encoded image bytes
+    """
+    profile = {**DEFAULT_IMAGE_PROFILE, **(profile or {})}
+    # Pillow only knows the format as "JPEG"
+    fmt = profile["format"].upper()
+    fmt = "JPEG" if fmt == "JPG" else fmt
+    with Image.open(source) as img:
+        if fmt == "JPEG":
+            img.draft("RGB", (profile["size"], profile["size"]))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img = resize_for_profile(img, profile)
+        buffer = io.BytesIO()
+        options = {}
+        if fmt in ("JPEG", "WEBP"):
+            options["quality"] = profile["quality"]
+        img.save(buffer, format=fmt, **options)
+        return buffer.getvalue()
@@ -0,0 +1,229 @@
+"""
+Application-owned logging setup with a queue-backed handler.
+
+Library modules only create loggers (logging.getLogger(__name__)) and log
+with %-style arguments, so a message that is filtered out is never
+formatted. The application calls setup_logging() once at startup:
+
+- The root logger gets a QueueHandler. A call that logs only puts the
+  record on an in-memory queue; a QueueListener thread formats it and does
+  the I/O, so request threads never block on stderr or a file. When the
+  queue is full, records are dropped and counted instead of blocking.
+- Messages are formatted on the listener thread. Records whose arguments
+  are mutable objects are formatted when they are queued, so a later change
+  to the object cannot alter the message.
+- Output is plain text or one JSON object per line (JsonFormatter) with the
+  level, logger, thread, any extra= fields and the active tracing span's
+  trace_id/span_id.
+- Per-logger sampling (SamplingFilter) keeps a fraction of the INFO and
+  DEBUG records of chatty loggers; warnings and errors are always kept.
+
+Environment (used for arguments left as None):
+    HF_LOG_LEVEL: Root level (default INFO)
+    HF_LOG_FORMAT: "text" (default) or "json"
+    HF_LOG_SAMPLE: Sampling rates, e.g. "utils.decorators=0.1,models=0.5"
+
+Example:
+    setup_logging(level="INFO", json_format=True, sample_rates={"utils.decorators": 0.1})
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from utils.tracing import current_span
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "trace_id", "span_id"}
+
+# Argument types that cannot change between queueing and formatting
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["LazyQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id is not None:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the INFO and DEBUG records of selected loggers.
+
+    A rate applies to the named logger and its children; the most specific
+    name wins. WARNING and above always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        """
+        Initialize the filter.
+
+        Args:
+            rates: Share of records kept (0 to 1) per logger name
+        """
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats every record on the logging thread before
+    queueing it. This one only formats records with mutable arguments, adds
+    the active trace and span IDs, and drops records when the queue is full.
+    It uses a SimpleQueue (bounded by checking its size), which is much
+    cheaper to put to than queue.Queue.
+
+    Attributes:
+        max_size: Records buffered before new ones are dropped
+        dropped: Records dropped because the queue was full
+    """
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args and not all(isinstance(arg, _IMMUTABLE) for arg in (
+                record.args.values() if isinstance(record.args, dict) else record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        span = current_span()
+        if span:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    """Parse "name=rate,name=rate" into a dict."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name] = float(rate)
+    return rates
+
+
+def setup_logging(level: Optional[str] = None, json_format: Optional[bool] = None,
+                  sample_rates: Optional[Dict[str, float]] = None,
+                  stream: Optional[TextIO] = None, filename: Optional[str] = None,
+                  queue_size: int = 10000) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background listener thread.
+
+    Calling it again replaces the previous setup (its queued records are
+    written first). Arguments left as None are read from the environment.
+
+    Args:
+        level: Root logger level name or number (default HF_LOG_LEVEL or INFO)
+        json_format: Write JSON lines instead of text (default HF_LOG_FORMAT == "json")
+        sample_rates: Share of INFO/DEBUG records kept per logger (default HF_LOG_SAMPLE)
+        stream: Stream written to (default sys.stderr; ignored when filename is given)
+        filename: Append to this file instead of a stream
+        queue_size: Records buffered before new ones are dropped
+
+    Returns:
+        The started QueueListener
+    """
+    global _listener, _handler
+    if level is None:
+        level = os.getenv("HF_LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("HF_LOG_FORMAT", "text").lower() == "json"
+    if sample_rates is None:
+        sample_rates = _parse_rates(os.getenv("HF_LOG_SAMPLE", ""))
+
+    shutdown_logging()
+    output = logging.FileHandler(filename, encoding="utf-8") if filename else logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    _handler = LazyQueueHandler(queue_size)
+    if sample_rates:
+        _handler.addFilter(SamplingFilter(sample_rates))
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write the queued records and remove the handler installed by setup_logging."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Return the number of records dropped because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,202 @@
+"""
+Perceptual image hashes and a Hamming-distance dedup cache.
+
+Byte-level hashes miss re-encoded or resized copies of the same picture.
+The 64-bit perceptual hashes here (aHash, dHash, pHash) change only a few
+bits for such copies, so near-duplicates are found by Hamming distance.
+
+PerceptualHashCache stores results in a multi-index hash table: each hash is
+split into `chunks` substrings and indexed once per substring. By the
+pigeonhole principle a hash within distance r of the query has at least one
+substring within distance r // chunks of the query's substring, so only
+those few buckets need to be probed.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def _load_gray(source: Any, size: Tuple[int, int]) -> np.ndarray:
+    """Decode an image to a small grayscale float array of the given (width, height)."""
+    with Image.open(source) as img:
+        img.draft("L", (size[0] * 4, size[1] * 4))
+        img = img.convert("L").resize(size, resample=Image.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a boolean array of 64 bits into an int."""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def average_hash(source: Any) -> int:
+    """aHash: 8x8 grayscale pixels compared with their mean."""
+    pixels = _load_gray(source, (8, 8))
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(source: Any) -> int:
+    """dHash: sign of the horizontal gradient on a 9x8 grayscale image."""
+    pixels = _load_gray(source, (9, 8))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix of size n x n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(source: Any) -> int:
+    """pHash: low-frequency 8x8 DCT coefficients of a 32x32 image compared with their median."""
+    pixels = _load_gray(source, (32, 32))
+    coefficients = (_DCT32 @ pixels @ _DCT32.T)[:8, :8]
+    median = np.median(coefficients.ravel()[1:])  # the DC term would dominate
+    return _bits_to_int(coefficients > median)
+
+
+HASH_FUNCTIONS: Dict[str, Callable[[Any], int]] = {
+    "ahash": average_hash,
+    "dhash": difference_hash,
+    "phash": phash,
+}
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+class PerceptualHashCache:
+    """
+    LRU cache of results keyed by perceptual hash, matched within a Hamming radius.
+
+    Attributes:
+        threshold: Maximum Hamming distance counted as a duplicate
+        max_entries: Maximum number of cached results
+        method: Hash function name ("ahash", "dhash" or "phash")
+    """
+
+    def __init__(self, threshold: int = 6, max_entries: int = 100_000,
+                 method: str = "phash", chunks: int = 4):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Maximum Hamming distance counted as a duplicate
+            max_entries: Maximum number of cached results
+            method: Hash function name ("ahash", "dhash" or "phash")
+            chunks: Number of substrings the hash is indexed by
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.method = method
+        self.hash_image = HASH_FUNCTIONS[method]
+        self._chunks = chunks
+        self._chunk_bits = HASH_BITS // chunks
+        self._chunk_mask = (1 << self._chunk_bits) - 1
+        self._radius = threshold // chunks
+        self._probes = self._probe_masks(self._chunk_bits, self._radius)
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(chunks)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _probe_masks(bits: int, radius: int) -> List[int]:
+        """All bit masks of up to radius set bits within a chunk."""
+        masks = [0]
+        for r in range(1, radius + 1):
+            for positions in itertools.combinations(range(bits), r):
+                masks.append(sum(1 << p for p in positions))
+        return masks
+
+    def _substrings(self, value: int) -> List[int]:
+        """Split a hash into its chunk substrings."""
+        return [(value >> (i * self._chunk_bits)) & self._chunk_mask for i in range(self._chunks)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup_hash(self, value: int) -> Optional[Tuple[int, Any]]:
+        """
+        Find the closest cached entry within the threshold.
+
+        Args:
+            value: Perceptual hash to look up
+
+        Returns:
+            (distance, cached value) or None
+        """
+        best: Optional[Tuple[int, int]] = None
+        with self._lock:
+            seen: Set[int] = set()
+            for table, substring in zip(self._tables, self._substrings(value)):
+                for mask in self._probes:
+                    bucket = table.get(substring ^ mask)
+                    if not bucket:
+                        continue
+                    for candidate in bucket - seen:
+                        seen.add(candidate)
+                        distance = (candidate ^ value).bit_count()
+                        if distance <= self.threshold and (best is None or distance < best[0]):
+                            best = (distance, candidate)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            return best[0], self._entries[best[1]]
+
+    def add_hash(self, value: int, result: Any) -> None:
+        """Cache a result under a perceptual hash, evicting the oldest entries if full."""
+        with self._lock:
+            if value not in self._entries:
+                for table, substring in zip(self._tables, self._substrings(value)):
+                    table.setdefault(substring, set()).add(value)
+            self._entries[value] = result
+            self._entries.move_to_end(value)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                for table, substring in zip(self._tables, self._substrings(old)):
+                    bucket = table[substring]
+                    bucket.discard(old)
+                    if not bucket:
+                        del table[substring]
+
+    def lookup(self, source: Any) -> Tuple[int, Optional[Tuple[int, Any]]]:
+        """
+        Hash an image and look it up.
+
+        Args:
+            source: Image file path or binary file-like object
+
+        Returns:
+            (hash, (distance, cached value) or None)
+        """
+        value = self.hash_image(source)
+        return value, self.lookup_hash(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate counters."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,248 @@
+"""
+Streaming multi-stage pipeline with bounded queues.
+
+Each stage runs a function over items with its own number of worker threads
+(optionally backed by a process pool for CPU-bound work). Stages are
+connected by bounded queues, so a slow stage applies backpressure to the
+ones before it and memory stays flat no matter how many items are fed in.
+Per-stage busy/blocked time is recorded to show where the bottleneck is,
+and each item's pass through a stage is traced as a "pipeline.<stage>" span.
+
+Example:
+    pipeline = StreamingPipeline([
+        Stage("read", read_file, workers=2),
+        Stage("decode", decode_image, workers=4, processes=True),
+        Stage("upload", send, workers=8),
+    ], queue_size=16)
+    for index, result in pipeline.run(paths):
+        ...
+"""
+
+import contextvars
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.tracing import span
+
+_DONE = object()
+
+
+class StageError:
+    """Result placeholder for an item whose stage function raised."""
+
+    def __init__(self, stage: str, error: Exception):
+        self.stage = stage
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"StageError(stage={self.stage!r}, error={self.error!r})"
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline stage.
+
+    Attributes:
+        name: Stage name used in the statistics
+        func: Function applied to each item
+        workers: Number of items processed concurrently
+        processes: Run func in a process pool (func and items must be picklable)
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    processes: bool = False
+    busy: float = field(default=0.0, init=False)
+    blocked_put: float = field(default=0.0, init=False)
+    waiting_get: float = field(default=0.0, init=False)
+    items: int = field(default=0, init=False)
+
+
+class StreamingPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Items that fail in a stage skip the remaining stages and are yielded as
+    StageError instances, so one bad input never stops the stream.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 8):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages in processing order
+            queue_size: Capacity of each inter-stage queue
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self._wall = 0.0
+
+    def run(self, items: Iterable[Any], ordered: bool = True) -> Iterator[Tuple[int, Any]]:
+        """
+        Stream items through the stages.
+
+        Args:
+            items: Input items (consumed lazily)
+            ordered: Yield results in input order (otherwise as they finish)
+
+        Yields:
+            (input index, result or StageError)
+
+        Raises:
+            Exception: Whatever the items iterator raised, once the items
+                read before the error have been yielded
+        """
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        executors = [
+            ProcessPoolExecutor(max_workers=stage.workers) if stage.processes else None
+            for stage in self.stages
+        ]
+        threads = []
+        stop = threading.Event()
+        for stage in self.stages:
+            stage.busy = stage.blocked_put = stage.waiting_get = 0.0
+            stage.items = 0
+        start = time.perf_counter()
+        feed_error: List[BaseException] = []
+        # Items read but not yet yielded: enough to fill every queue and worker. In
+        # ordered mode this also bounds the results held back behind a slow item.
+        slots = threading.Semaphore(sum(stage.workers for stage in self.stages)
+                                    + len(queues) * self.queue_size)
+
+        def feed():
+            try:
+                iterator = iter(items)
+                for index in itertools.count():
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    queues[0].put((index, item))
+            except Exception as e:
+                feed_error.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        def work(position: int):
+            stage, executor = self.stages[position], executors[position]
+            inbox, outbox = queues[position], queues[position + 1]
+            while True:
+                t0 = time.perf_counter()
+                message = inbox.get()
+                t1 = time.perf_counter()
+                if message is _DONE:
+                    with lock:
+                        remaining[position] -= 1
+                        last = remaining[position] == 0
+                    if last:
+                        downstream = (self.stages[position + 1].workers
+                                      if position + 1 < len(self.stages) else 1)
+                        for _ in range(downstream):
+                            outbox.put(_DONE)
+                    return
+                index, item = message
+                if not isinstance(item, StageError):
+                    with span(f"pipeline.{stage.name}", index=index) as stage_span:
+                        try:
+                            if executor is not None:
+                                item = executor.submit(stage.func, item).result()
+                            else:
+                                item = stage.func(item)
+                        except Exception as e:
+                            stage_span.record_exception(e)
+                            item = StageError(stage.name, e)
+                t2 = time.perf_counter()
+                outbox.put((index, item))
+                t3 = time.perf_counter()
+                with lock:
+                    stage.waiting_get += t1 - t0
+                    stage.busy += t2 - t1
+                    stage.blocked_put += t3 - t2
+                    stage.items += 1
+
+        # Workers run in copies of the caller's context so context variables
+        # (e.g. the per-call deadline, the active tracing span) reach the stage functions.
+        threads.append(threading.Thread(target=feed, daemon=True))
+        for position, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=contextvars.copy_context().run,
+                                                args=(work, position), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        pending: Dict[int, Any] = {}
+        next_index = 0
+        finished = False
+        try:
+            while True:
+                message = queues[-1].get()
+                if message is _DONE:
+                    finished = True
+                    break
+                index, result = message
+                if not ordered:
+                    slots.release()
+                    yield index, result
+                    continue
+                pending[index] = result
+                while next_index in pending:
+                    slots.release()
+                    yield next_index, pending.pop(next_index)
+                    next_index += 1
+            for index in sorted(pending):
+                yield index, pending[index]
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            stop.set()
+            slots.release()  # in case feed is waiting for a slot
+            # If the consumer stopped early, drain the output so the stages can wind down
+            while not finished:
+                finished = queues[-1].get() is _DONE
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown()
+            self._wall = time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return per-stage statistics of the last run.
+
+        utilization is the share of the stage's worker time spent working;
+        blocked is the share spent waiting on a full downstream queue. The
+        stage with the highest utilization is the bottleneck.
+        """
+        report = {}
+        for stage in self.stages:
+            capacity = (self._wall or 1e-9) * stage.workers
+            report[stage.name] = {
+                "items": stage.items,
+                "workers": stage.workers,
+                "busy_s": stage.busy,
+                "utilization": stage.busy / capacity,
+                "blocked": stage.blocked_put / capacity,
+                "starved": stage.waiting_get / capacity,
+            }
+        return report
+
+    def bottleneck(self) -> Optional[str]:
+        """Return the name of the most utilized stage of the last run."""
+        stats = self.stats()
+        return max(stats, key=lambda name: stats[name]["utilization"]) if stats else None
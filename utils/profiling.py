@@ -0,0 +1,379 @@
+"""
+On-demand profiling of requests.
+
+A profiling session records the next N requests made through the functions
+decorated with @profiled (HFClient.query/send_payload, LocalClient.query and
+the model process_input methods), then writes its results and switches
+itself off. Nested profiled calls count as one request.
+
+- "cprofile" mode runs cProfile in each thread while it serves a request and
+  writes the combined statistics as a .prof file (pstats format: snakeviz,
+  flameprof or gprof2dot turn it into a flame graph or call graph) plus a
+  text summary sorted by cumulative time.
+- "sample" mode runs a sampling profiler instead: a background thread
+  records the stacks of the threads serving requests every few milliseconds
+  and writes them as collapsed stacks (.folded) for flamegraph.pl or
+  speedscope. It costs far less than cProfile and does not skew the timing
+  of small functions.
+- With memory=True, tracemalloc snapshots are taken around image
+  preprocessing (track_memory) and the allocation sites that grew the most
+  are written to a memory report.
+
+Sessions are started with start_profiling(), from the environment
+(configure_from_env: HF_PROFILE, HF_PROFILE_REQUESTS, HF_PROFILE_DIR,
+HF_PROFILE_MEMORY), with the GUI's --profile flag or from its Tools menu.
+When no session is running the decorator and track_memory cost one global
+lookup.
+
+Example:
+    start_profiling("sample", requests=100, output_dir="profiles")
+    ...                     # run the workload
+    paths = stop_profiling()  # or let it stop after 100 requests
+"""
+
+import contextlib
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+MODES = (CPROFILE, SAMPLE)
+
+DEFAULT_REQUESTS = 50
+DEFAULT_OUTPUT_DIR = "profiles"
+
+
+class _MemoryStats:
+    """tracemalloc results accumulated for one track_memory label."""
+
+    def __init__(self):
+        self.calls = 0
+        self.peak = 0
+        self.net = 0
+        self.sites: Counter = Counter()
+
+
+class ProfileSession:
+    """
+    Profiles the next requests and writes the results when done.
+
+    Attributes:
+        mode: "cprofile" or "sample"
+        requests: Number of requests to profile
+        output_dir: Directory the result files are written to
+        memory: Take tracemalloc snapshots around image preprocessing
+        interval: Seconds between stack samples in "sample" mode
+        completed: Requests profiled so far
+        paths: Files written once the session has finished
+    """
+
+    def __init__(self, mode: str = CPROFILE, requests: int = DEFAULT_REQUESTS,
+                 output_dir: str = DEFAULT_OUTPUT_DIR, memory: bool = False,
+                 interval: float = 0.005):
+        """
+        Initialize the session (call start() to begin).
+
+        Args:
+            mode: "cprofile" or "sample"
+            requests: Number of requests to profile
+            output_dir: Directory the result files are written to
+            memory: Take tracemalloc snapshots around image preprocessing
+            interval: Seconds between stack samples in "sample" mode
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode} (expected one of {', '.join(MODES)})")
+        if requests < 1:
+            raise ValueError("Requests must be at least 1")
+        self.mode = mode
+        self.requests = requests
+        self.output_dir = output_dir
+        self.memory = memory
+        self.interval = interval
+        self.completed = 0
+        self.paths: List[str] = []
+        self._accepting = False
+        self._in_flight = 0
+        self._finished = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._active_threads: Set[int] = set()
+        self._stacks: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._memory: Dict[str, _MemoryStats] = {}
+        self._started_tracemalloc = False
+        self._stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    @property
+    def active(self) -> bool:
+        """True while the session still accepts requests."""
+        return self._accepting
+
+    def start(self) -> "ProfileSession":
+        """Begin profiling; returns self."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+        if self.mode == SAMPLE:
+            self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+        self._accepting = True
+        logger.info("Profiling the next %d requests (%s)", self.requests, self.mode)
+        return self
+
+    def enter(self) -> bool:
+        """
+        Start profiling a request on the calling thread.
+
+        Returns:
+            True if the call is profiled (exit() must then be called)
+        """
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth:
+            local.depth = depth + 1
+            return True
+        with self._lock:
+            if not self._accepting:
+                return False
+            self._in_flight += 1
+        local.depth = 1
+        if self.mode == CPROFILE:
+            profile = getattr(local, "profile", None)
+            if profile is None:
+                profile = local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            profile.enable()
+        else:
+            with self._lock:
+                self._active_threads.add(threading.get_ident())
+        return True
+
+    def exit(self) -> None:
+        """Finish profiling a request started with enter()."""
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        if self.mode == CPROFILE:
+            local.profile.disable()
+        with self._lock:
+            self._active_threads.discard(threading.get_ident())
+            self._in_flight -= 1
+            self.completed += 1
+            if self.completed >= self.requests:
+                self._accepting = False
+            done = not self._accepting and not self._in_flight and not self._finished
+            if done:
+                self._finished = True
+        if done:
+            self._finish()
+
+    def stop(self) -> List[str]:
+        """
+        Stop accepting requests and write the results.
+
+        Requests already running are still recorded; if there are any, the
+        last one to finish writes the results instead.
+
+        Returns:
+            Paths of the files written (empty if requests are still running)
+        """
+        with self._lock:
+            self._accepting = False
+            done = not self._in_flight and not self._finished
+            if done:
+                self._finished = True
+        if done:
+            self._finish()
+        return self.paths
+
+    def _sample(self) -> None:
+        """Sampler thread: record the stacks of the threads serving requests."""
+        while not self._stop_sampling.wait(self.interval):
+            with self._lock:
+                idents = list(self._active_threads)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self._stacks[";".join(reversed(stack))] += 1
+
+    def track_memory(self, label: str) -> Iterator[None]:
+        """Take tracemalloc snapshots around a block (see the module-level track_memory)."""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        before = tracemalloc.take_snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            # The session may have finished (and stopped tracemalloc) meanwhile
+            if tracemalloc.is_tracing():
+                self._record_memory(label, before, current)
+
+    def _record_memory(self, label: str, before: tracemalloc.Snapshot, start: int) -> None:
+        """Add the growth since the before snapshot to a label's statistics."""
+        current, peak = tracemalloc.get_traced_memory()
+        # Leave out the snapshots' own allocations
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        growth = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+            before.filter_traces(ignore), "lineno")
+        with self._lock:
+            stats = self._memory.setdefault(label, _MemoryStats())
+            stats.calls += 1
+            stats.peak = max(stats.peak, peak - start)
+            stats.net += current - start
+            for diff in growth[:50]:
+                if diff.size_diff > 0:
+                    frame = diff.traceback[0]
+                    stats.sites[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+
+    def _finish(self) -> None:
+        """Write the result files."""
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{self._stamp}-{self.mode}")
+        paths = []
+        if self.mode == CPROFILE and self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(base + ".prof")
+            summary = io.StringIO()
+            pstats.Stats(base + ".prof", stream=summary).sort_stats("cumulative").print_stats(40)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(summary.getvalue())
+            paths += [base + ".prof", base + ".txt"]
+        elif self.mode == SAMPLE:
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(base + ".folded")
+        if self._memory:
+            path = os.path.join(self.output_dir, f"memory-{self._stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                for label, stats in self._memory.items():
+                    f.write(f"{label}: {stats.calls} calls, peak {stats.peak / 1024:.1f} KiB above start, "
+                            f"net {stats.net / max(1, stats.calls) / 1024:.1f} KiB per call\n")
+                    for site, size in stats.sites.most_common(15):
+                        f.write(f"  {size / max(1, stats.calls) / 1024:10.1f} KiB/call  {site}\n")
+                    f.write("\n")
+            paths.append(path)
+        self.paths = paths
+        logger.info("Profiled %d requests: %s", self.completed, ", ".join(paths) or "no output")
+
+
+_session: Optional[ProfileSession] = None
+
+
+def start_profiling(mode: str = CPROFILE, requests: int = DEFAULT_REQUESTS,
+                    output_dir: str = DEFAULT_OUTPUT_DIR, memory: bool = False,
+                    interval: float = 0.005) -> ProfileSession:
+    """
+    Profile the next requests, replacing any running session.
+
+    See ProfileSession for the arguments.
+
+    Returns:
+        The started session
+    """
+    global _session
+    if _session is not None:
+        _session.stop()
+    _session = ProfileSession(mode, requests, output_dir, memory, interval).start()
+    return _session
+
+
+def stop_profiling() -> List[str]:
+    """
+    Stop the running session and write its results.
+
+    Returns:
+        Paths of the files written (empty if nothing was running)
+    """
+    session = _session
+    return session.stop() if session is not None else []
+
+
+def current_session() -> Optional[ProfileSession]:
+    """Return the most recent session (running or finished), if any."""
+    return _session
+
+
+def configure_from_env() -> Optional[ProfileSession]:
+    """Start a session if HF_PROFILE is set to "cprofile" or "sample"."""
+    mode = os.getenv("HF_PROFILE", "").lower()
+    if not mode:
+        return None
+    return start_profiling(
+        mode,
+        requests=int(os.getenv("HF_PROFILE_REQUESTS", DEFAULT_REQUESTS)),
+        output_dir=os.getenv("HF_PROFILE_DIR", DEFAULT_OUTPUT_DIR),
+        memory=os.getenv("HF_PROFILE_MEMORY", "0").lower() in ("1", "true", "yes"),
+    )
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Count a function as a request for the running profiling session.
+
+    Example:
+        @profiled
+        def query(self, model_id, input_data, pipeline):
+            ...
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _session
+        if session is None or not session.active or not session.enter():
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.exit()
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def track_memory(label: str) -> Iterator[None]:
+    """
+    Take tracemalloc snapshots around a block while a memory session runs.
+
+    Example:
+        with track_memory("image_preprocess"):
+            encoded = encode_for_profile(path, profile)
+    """
+    session = _session
+    if session is None or not session.memory or not session.active:
+        yield
+        return
+    yield from session.track_memory(label)
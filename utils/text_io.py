@@ -0,0 +1,106 @@
+"""
+Streaming reads of large text files.
+
+Text files are read in fixed-size chunks through the incremental decoder of
+a text-mode file, so a multi-megabyte file is never held in memory (or
+handed to a Tk widget) in one piece. Undecodable bytes are replaced rather
+than failing the whole file.
+
+iter_units() splits a file into inputs for a text model:
+    "line":  each non-empty line (lines longer than max_chars are split)
+    "chunk": consecutive pieces of at most max_chars characters, cut at a
+             line break or space where possible so words stay whole
+"""
+
+from typing import Iterator, List, Tuple
+
+LINE = "line"
+CHUNK = "chunk"
+UNIT_MODES = (LINE, CHUNK)
+
+# Characters per read
+DEFAULT_READ_CHARS = 16 * 1024
+# Characters per model input; sentiment models see ~512 tokens
+DEFAULT_UNIT_CHARS = 2000
+
+
+def read_chunks(path: str, chunk_chars: int = DEFAULT_READ_CHARS,
+                encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Yield a text file in chunks of up to chunk_chars characters.
+
+    Args:
+        path: Text file path
+        chunk_chars: Characters per chunk
+        encoding: File encoding (undecodable bytes are replaced)
+    """
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _cut(text: str, start: int, max_chars: int) -> int:
+    """End of the next piece of text starting at start: a line break or space if there is one."""
+    end = start + max_chars
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, start + 1, end)
+        if cut != -1:
+            return cut + 1
+    return end
+
+
+def _split(text: str, max_chars: int) -> List[str]:
+    """Split text into stripped, non-empty pieces of at most max_chars characters."""
+    pieces, start = [], 0
+    while len(text) - start > max_chars:
+        end = _cut(text, start, max_chars)
+        pieces.append(text[start:end].strip())
+        start = end
+    pieces.append(text[start:].strip())
+    return [piece for piece in pieces if piece]
+
+
+def iter_units(path: str, mode: str = LINE, max_chars: int = DEFAULT_UNIT_CHARS,
+               encoding: str = "utf-8") -> Iterator[Tuple[int, str]]:
+    """
+    Yield a text file as model inputs, reading it in chunks.
+
+    Args:
+        path: Text file path
+        mode: "line" or "chunk"
+        max_chars: Longest input yielded
+        encoding: File encoding (undecodable bytes are replaced)
+
+    Yields:
+        (line number or chunk number, text), numbered from 1
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in UNIT_MODES:
+        raise ValueError(f"Unknown unit mode: {mode} (expected one of {', '.join(UNIT_MODES)})")
+    if mode == LINE:
+        with open(path, "r", encoding=encoding, errors="replace") as f:
+            for number, line in enumerate(f, 1):
+                for piece in _split(line, max_chars):
+                    yield number, piece
+        return
+
+    number, buffer = 0, ""
+    for block in read_chunks(path, encoding=encoding):
+        buffer += block
+        start = 0
+        while len(buffer) - start > max_chars:
+            end = _cut(buffer, start, max_chars)
+            piece = buffer[start:end].strip()
+            start = end
+            if piece:
+                number += 1
+                yield number, piece
+        buffer = buffer[start:]
+    piece = buffer.strip()
+    if piece:
+        yield number + 1, piece
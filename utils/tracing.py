@@ -0,0 +1,497 @@
+"""
+Lightweight request tracing with nested spans.
+
+A span times one step of a request (a model call, reading an image, a retry
+backoff, the HTTP request) and records attributes and events on it. Spans
+started while another span is active become its children, so a request from
+the GUI down to the HTTP call shows up as one tree. The active span lives in
+a context variable:
+
+- asyncio tasks copy the context when they are created, so spans started in
+  a task are children of the span that created it.
+- Threads do not: run the target in a copy of the context (as
+  StreamingPipeline, HFClient hedging and RequestScheduler already do), or
+  wrap it with propagate(). asyncio.to_thread copies the context as well.
+
+Tracing is off until configure() (or configure_from_env()) installs an
+exporter; until then span() returns a shared no-op span and costs well
+under a microsecond. Sampling is decided once per trace at the root span,
+and children follow the root's decision. Finished spans are buffered and
+written in batches as JSON lines, either one span per line (JsonlExporter)
+or as OTLP/JSON ExportTraceServiceRequest lines (OtlpJsonExporter) that the
+OpenTelemetry Collector's otlpjsonfile receiver can read.
+
+Example:
+    configure(JsonlExporter("traces.jsonl"), sample_rate=0.1)
+
+    with span("gui.run_model", model=model_id):
+        client.query(...)      # HFClient spans nest under gui.run_model
+
+Environment (configure_from_env):
+    HF_TRACE_FILE: Output file; tracing stays off when unset
+    HF_TRACE_FORMAT: "jsonl" (default) or "otlp"
+    HF_TRACE_SAMPLE_RATE: Share of traces recorded, 0 to 1 (default 1)
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed step of a trace.
+
+    Use it as a context manager (span() does this for you); it becomes the
+    active span inside the block and ends when the block exits. An exception
+    leaving the block marks the span as an error.
+
+    Attributes:
+        name: Operation name, e.g. "HFClient.query"
+        trace_id: 32 hex digit ID shared by every span of the trace
+        span_id: 16 hex digit ID of this span
+        parent_id: span_id of the parent, None for a root span
+        start_ns: Start time in nanoseconds since the epoch
+        end_ns: End time in nanoseconds since the epoch (None while running)
+        attributes: Key/value details of the operation
+        events: (time_ns, name, attributes) tuples recorded during the span
+        status: "ok" or "error"
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "events", "status", "message", "_tracer", "_t0", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.events: List[tuple] = []
+        self.status = "ok"
+        self.message: Optional[str] = None
+        self.end_ns: Optional[int] = None
+        self._tracer = tracer
+        self._token = None
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Duration in milliseconds, or None while the span is running."""
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set one attribute."""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        """Record a point-in-time event, e.g. a retry."""
+        self.events.append((time.time_ns(), name, attributes))
+
+    def set_error(self, message: str) -> None:
+        """Mark the span as failed."""
+        self.status = "error"
+        self.message = message
+
+    def record_exception(self, error: BaseException) -> None:
+        """Mark the span as failed by an exception and record it as an event."""
+        self.set_error(str(error))
+        self.add_event("exception", type=type(error).__name__, message=str(error))
+
+    def end(self) -> None:
+        """End the span and hand it to the tracer (only the first call counts)."""
+        if self.end_ns is None:
+            # Monotonic duration; the wall clock may step while the span runs
+            self.end_ns = self.start_ns + time.perf_counter_ns() - self._t0
+            self._tracer._finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None:
+            self.record_exception(exc)
+        _current.reset(self._token)
+        self.end()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span as a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "message": self.message,
+            "attributes": self.attributes,
+            "events": [{"time_ns": t, "name": name, "attributes": attrs}
+                       for t, name, attrs in self.events],
+        }
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, trace={self.trace_id[:8]}, span={self.span_id[:8]})"
+
+
+class _NoopSpan:
+    """Span stand-in used when tracing is off or the trace is not sampled (it is falsy)."""
+
+    __slots__ = ("_token",)
+
+    def __init__(self):
+        self._token = None
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _UnsampledSpan(_NoopSpan):
+    """Marks an unsampled trace as active so its children are skipped as well."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_UnsampledSpan":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+class JsonlExporter:
+    """Appends finished spans to a file, one JSON object (Span.to_dict) per line."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the exporter.
+
+        Args:
+            path: File to append to (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        """Write a batch of spans."""
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Convert an attribute value to an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpJsonExporter:
+    """
+    Appends finished spans to a file in the OTLP/JSON format.
+
+    Each batch is one ExportTraceServiceRequest per line, which is what the
+    OpenTelemetry Collector's otlpjsonfile receiver reads; the same JSON can
+    be POSTed to an OTLP/HTTP endpoint's /v1/traces.
+    """
+
+    def __init__(self, path: str, service_name: str = "hit137-ai-gui"):
+        """
+        Initialize the exporter.
+
+        Args:
+            path: File to append to (created if missing)
+            service_name: service.name resource attribute
+        """
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [{"timeUnixNano": str(t), "name": name, "attributes": _otlp_attributes(attrs)}
+                       for t, name, attrs in span.events],
+            "status": {"code": 2, "message": span.message or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        return record
+
+    def export(self, spans: List[Span]) -> None:
+        """Write a batch of spans as one ExportTraceServiceRequest."""
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._span(s) for s in spans],
+                }],
+            }]
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request, default=str) + "\n")
+
+
+class MemoryExporter:
+    """Keeps finished spans in a list (for benchmarks and interactive inspection)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+
+class Tracer:
+    """
+    Creates spans, samples traces and batches finished spans to an exporter.
+
+    Attributes:
+        exporter: Object with export(spans), or None to disable tracing
+        sample_rate: Share of traces recorded (decided at the root span)
+        batch_size: Finished spans buffered before they are exported
+    """
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0, batch_size: int = 64):
+        """
+        Initialize the tracer.
+
+        Args:
+            exporter: Object with export(spans), or None to disable tracing
+            sample_rate: Share of traces recorded, 0 to 1
+            batch_size: Finished spans buffered before they are exported
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Sample rate must be between 0 and 1")
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, **attributes: Any):
+        """
+        Start a span as a child of the active one (use it in a with block).
+
+        Returns:
+            A Span, or a no-op span when tracing is off or the trace is not sampled
+        """
+        if self.exporter is None:
+            return _NOOP
+        parent = _current.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledSpan()
+            return Span(self, name, f"{random.getrandbits(128):032x}", None, attributes)
+        if not parent:
+            return _NOOP
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def _finish(self, span: Span) -> None:
+        """Buffer a finished span, exporting the buffer once it is full."""
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        exporter = self.exporter
+        if exporter is None or not batch:
+            return
+        try:
+            exporter.export(batch)
+        except Exception as e:
+            logger.warning("Failed to export %d spans: %s", len(batch), e)
+
+    def flush(self) -> None:
+        """Export the buffered spans now."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self._export(batch)
+
+
+_tracer = Tracer()
+atexit.register(lambda: _tracer.flush())
+
+
+def configure(exporter=None, sample_rate: float = 1.0, batch_size: int = 64) -> Tracer:
+    """
+    Install the process-wide tracer (exporter=None turns tracing off).
+
+    Spans buffered by the previous tracer are exported first.
+
+    Returns:
+        The new tracer
+    """
+    global _tracer
+    previous, _tracer = _tracer, Tracer(exporter, sample_rate, batch_size)
+    previous.flush()
+    return _tracer
+
+
+def configure_from_env() -> Tracer:
+    """Configure tracing from HF_TRACE_FILE, HF_TRACE_FORMAT and HF_TRACE_SAMPLE_RATE."""
+    path = os.getenv("HF_TRACE_FILE")
+    if not path:
+        return _tracer
+    fmt = os.getenv("HF_TRACE_FORMAT", "jsonl").lower()
+    exporter = OtlpJsonExporter(path) if fmt == "otlp" else JsonlExporter(path)
+    sample_rate = float(os.getenv("HF_TRACE_SAMPLE_RATE", "1"))
+    logger.info("Tracing to %s (%s, sample rate %g)", path, fmt, sample_rate)
+    return configure(exporter, sample_rate)
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def span(name: str, **attributes: Any):
+    """
+    Start a span on the process-wide tracer.
+
+    Example:
+        with span("image_model.read", path=image_path) as s:
+            ...
+            s.set_attribute("bytes", size)
+    """
+    tracer = _tracer
+    if tracer.exporter is None:
+        return _NOOP
+    return tracer.start_span(name, **attributes)
+
+
+def current_span():
+    """Return the active span (a no-op span when there is none)."""
+    return _current.get() or _NOOP
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    """Record an event on the active span, if any."""
+    active = _current.get()
+    if active:
+        active.add_event(name, **attributes)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the active span, if any."""
+    active = _current.get()
+    if active:
+        active.attributes[key] = value
+
+
+def flush() -> None:
+    """Export buffered spans of the process-wide tracer."""
+    _tracer.flush()
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind func to a copy of the current context, for use as a thread target.
+
+    Example:
+        threading.Thread(target=propagate(worker)).start()
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+def traced(func: Callable = None, *, name: str = None) -> Callable:
+    """
+    Run each call of a function in a span.
+
+    The span is named after the function's qualified name unless name is
+    given. For methods of objects with a _model_id (the model classes) the
+    model is recorded as an attribute, and a returned error dict marks the
+    span as failed. Can be used with or without parameters.
+
+    Example:
+        @traced
+        def process_input(self, input_text):
+            ...
+
+        @traced(name="gui.save_output")
+        def save(...):
+            ...
+    """
+    if func is None:
+        return lambda f: traced(f, name=name)
+    span_name = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _tracer.exporter is None:
+            return func(*args, **kwargs)
+        with _tracer.start_span(span_name) as s:
+            if s and args:
+                model_id = getattr(args[0], "_model_id", None)
+                if model_id is not None:
+                    s.attributes["model"] = model_id
+            result = func(*args, **kwargs)
+            if s and isinstance(result, dict) and result.get("status") == "error":
+                s.set_error(str(result.get("message", "")))
+            return result
+
+    return wrapper